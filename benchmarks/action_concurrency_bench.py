@@ -0,0 +1,80 @@
+"""Turn throughput with N concurrent conversations, blocking vs. async upstream calls.
+
+Each "turn" is one flight-offers search, the slowest thing a flight action does.
+The blocking variant calls FlightService.get_flight_offers from a coroutine, the
+way the sync actions used to block the action server's event loop. The async
+variant awaits FlightService.get_flight_offers_async. Upstream is the local
+upstream stub answering after a fixed delay. Every conversation searches a
+different date so neither the response cache nor single-flight hides the calls.
+
+    python benchmarks/action_concurrency_bench.py --latency 0.2 --conversations 1 10 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("IATA_CACHE_PATH", "")
+os.environ.setdefault("AMADEUS_DEFAULT_RPS", "10000")
+os.environ.setdefault("AMADEUS_FLIGHT_OFFERS_RPS", "10000")
+
+from upstream_stub import StubConfig, start_stub
+
+FIRST_DATE = date.today() + timedelta(days=30)
+_searches = 0
+
+
+def next_search():
+    global _searches
+    _searches += 1
+    departure_date = (FIRST_DATE + timedelta(days=_searches)).isoformat()
+    return dict(departure="JFK", destination="LHR", departure_date=departure_date, num_adults="1")
+
+
+async def blocking_turn(flight_service):
+    return flight_service.get_flight_offers(**next_search())
+
+
+async def async_turn(flight_service):
+    return await flight_service.get_flight_offers_async(**next_search())
+
+
+async def run_level(turn, flight_service, conversations):
+    # Warm up: the async client is created per event loop
+    await turn(flight_service)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(turn(flight_service) for _ in range(conversations)))
+    elapsed = time.perf_counter() - start
+    assert all(result["success"] for result in results), results[0]
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2, help="upstream delay in seconds")
+    parser.add_argument("--conversations", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    stub = start_stub(StubConfig(latency_ms=args.latency * 1000))
+    os.environ.update(stub.environment())
+    os.environ.setdefault("AMADEUS_CLIENT_ID", "bench")
+    os.environ.setdefault("AMADEUS_CLIENT_SECRET", "bench")
+    from services.flight_service import FlightService
+    flight_service = FlightService()
+    flight_service.amadeus_service.get_access_token()
+
+    print(f"upstream latency {args.latency * 1000:.0f} ms")
+    print(f"{'conversations':>13}{'blocking turns/s':>18}{'async turns/s':>15}")
+    for conversations in args.conversations:
+        blocking = asyncio.run(run_level(blocking_turn, flight_service, conversations))
+        concurrent = asyncio.run(run_level(async_turn, flight_service, conversations))
+        print(f"{conversations:>13}{conversations / blocking:>18.1f}{conversations / concurrent:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""End-to-end latency of the Rasa actions against the local upstream stub.
+
+Each action is constructed once, like the action server does, and run with a
+synthetic Tracker and a fresh CollectingDispatcher per turn. For every action
+and concurrency level this reports p50/p95/p99 turn latency, throughput and
+upstream calls per turn (counted by the stub) and the JSON size of the events
+a turn returns, which end up in the tracker. A separate sequential pass
+under tracemalloc reports allocation peak and retained memory per turn, so
+tracing does not distort the latency numbers.
+
+Every turn uses different dates, airlines etc. so caches and single-flight do
+not hide upstream calls; pass --warm to repeat the same slots instead.
+Results are written as JSON (by default to benchmarks/results/, which is not
+tracked); --baseline compares p95 against an earlier run and exits non-zero on
+regressions.
+
+Run from the repository root:
+
+    python benchmarks/action_latency_bench.py --latency-ms 150 --jitter 0.3 --concurrency 1 10 50
+    python benchmarks/action_latency_bench.py --baseline benchmarks/results/action_latency.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("IATA_CACHE_PATH", "")
+# The bench measures the actions, not the client-side rate limits
+for endpoint in ("DEFAULT", "FLIGHT_OFFERS", "FLIGHT_DESTINATIONS", "FLIGHT_DATES", "LOCATIONS"):
+    os.environ.setdefault(f"AMADEUS_{endpoint}_RPS", "10000")
+
+from upstream_stub import StubConfig, start_stub
+
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "action_latency.json")
+FIRST_DATE = date.today() + timedelta(days=30)
+
+
+def _day(offset):
+    return (FIRST_DATE + timedelta(days=offset % 300)).isoformat()
+
+
+def destinations_slots(turn, context):
+    return {"departure_city": "New York", "destination": None, "duration": None, "maxPrice": None,
+            "travel_budget": "1200", "oneWay": None, "travel_timeframe": _day(turn)}
+
+
+def search_slots(turn, context):
+    return {"departure_city": "New York", "destination": "London", "departureDate": _day(turn),
+            "returnDate": _day(turn + 7), "number_of_pax": "1", "travel_class": "economy", "maxPrice": "1500"}
+
+
+def book_slots(turn, context):
+    return {"flight_offers": context["flight_offers"], "selected_flight_index": str(turn % 3 + 1), "user_id": 1}
+
+
+def budget_slots(turn, context):
+    return {}
+
+
+def lost_baggage_slots(turn, context):
+    return {"airport": "JFK", "airline": f"Airline {turn}"}
+
+
+# name -> (module, action class, slot factory)
+SCENARIOS = {
+    "get_destinations": ("actions.get_cheapest_flights", "ActionGetDestinations", destinations_slots),
+    "search_flights": ("actions.book_flight", "ActionSearchFlights", search_slots),
+    "book_flight": ("actions.book_flight", "ActionBookFlight", book_slots),
+    "get_travel_budget": ("actions.get_budget", "ActionGetTravelBudget", budget_slots),
+    "lost_baggage": ("actions.lost_baggage_actions", "ActionProvideLostBaggageInfo", lost_baggage_slots),
+}
+
+
+def make_tracker(turn, slots):
+    from rasa_sdk import Tracker
+    return Tracker(sender_id=f"bench-{turn}", slots=slots, latest_message={}, events=[], paused=False,
+                   followup_action=None, active_loop={}, latest_action_name="action_listen")
+
+
+async def run_turn(action, turn, slot_factory, context):
+    from rasa_sdk.executor import CollectingDispatcher
+    dispatcher = CollectingDispatcher()
+    events = action.run(dispatcher, make_tracker(turn, slot_factory(turn, context)), {})
+    if inspect.isawaitable(events):
+        events = await events
+    return events
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-fraction * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_level(action, slot_factory, context, concurrency, turns, warm):
+    latencies = []
+    errors = 0
+    next_turn = iter(range(turns))
+
+    async def worker():
+        nonlocal errors
+        for turn in next_turn:
+            start = time.perf_counter()
+            try:
+                await run_turn(action, 0 if warm else turn + context["turn_offset"], slot_factory, context)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  first error: {e!r}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    context["turn_offset"] += turns
+    latencies.sort()
+    return {
+        "turns": turns,
+        "errors": errors,
+        "throughput_per_s": round(turns / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def measure_allocations(action, slot_factory, context, turns, warm):
+    """Mean tracemalloc peak and retained KiB per sequential turn"""
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for turn in range(turns):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await run_turn(action, 0 if warm else turn + context["turn_offset"], slot_factory, context)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    context["turn_offset"] += turns
+    return {
+        "alloc_peak_kib": round(sum(peaks) / len(peaks) / 1024, 1),
+        "alloc_retained_kib": round(sum(retained) / len(retained) / 1024, 1),
+    }
+
+
+async def prepare_context(stub):
+    """Offers for the booking scenario, fetched once up front"""
+    from services.flight_service import FlightService
+    from services.flight_models import FlightOffer
+    from services.result_store import ResultPages, result_store
+    result = await FlightService().get_flight_offers_async("JFK", "LHR", _day(0), 1, return_date=_day(7))
+    if not result.get("data"):
+        raise RuntimeError(f"Could not fetch flight offers from the stub: {result.get('message')}")
+    pages = ResultPages(FlightOffer.from_response(result["data"]))
+    return {"flight_offers": result_store.put("flight-offers", pages), "turn_offset": 1000}
+
+
+async def run_all(args, stub):
+    import importlib
+    context = await prepare_context(stub)
+    results = []
+    for name in args.actions:
+        module_name, class_name, slot_factory = SCENARIOS[name]
+        action = getattr(importlib.import_module(module_name), class_name)()
+        # Warm up connections, token and lazily built indexes
+        events = await run_turn(action, 0, slot_factory, context)
+        event_bytes = len(json.dumps(events, separators=(",", ":"), default=str))
+        for concurrency in args.concurrency:
+            turns = max(args.turns, concurrency * 4)
+            stub.reset_stats()
+            level = await run_level(action, slot_factory, context, concurrency, turns, args.warm)
+            calls = stub.stats()["calls"]
+            level["upstream_calls_per_turn"] = {route: round(count / turns, 3) for route, count in sorted(calls.items())}
+            results.append({"action": name, "concurrency": concurrency, "event_bytes": event_bytes, **level})
+            print(f"{name:<18}{concurrency:>6}{level['p50_ms']:>10.1f}{level['p95_ms']:>10.1f}{level['p99_ms']:>10.1f}"
+                  f"{level['throughput_per_s']:>10.1f}{sum(calls.values()) / turns:>8.2f}{level['errors']:>7}")
+        allocations = await measure_allocations(action, slot_factory, context, args.alloc_turns, args.warm)
+        for result in results:
+            if result["action"] == name:
+                result.update(allocations)
+        print(f"{'':<18}{'alloc peak':>16} {allocations['alloc_peak_kib']:.1f} KiB/turn, "
+              f"retained {allocations['alloc_retained_kib']:.1f} KiB/turn, events {event_bytes} B/turn")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print p95 changes against a baseline run; returns True if any got slower than the tolerance"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["action"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressed = False
+    print(f"\np95 vs {baseline_path}")
+    for result in results:
+        before = baseline.get((result["action"], result["concurrency"]))
+        if not before or not before["p95_ms"]:
+            continue
+        change = result["p95_ms"] / before["p95_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            flag, regressed = "  REGRESSION", True
+        print(f"{result['action']:<18}{result['concurrency']:>6}{before['p95_ms']:>10.1f} ->{result['p95_ms']:>9.1f}"
+              f"{change:>+9.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--turns", type=int, default=100, help="turns per level (at least 4 per worker)")
+    parser.add_argument("--alloc-turns", type=int, default=20)
+    parser.add_argument("--warm", action="store_true", help="repeat identical slots so caches are hit")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="earlier results to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase before failing")
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, retry_after=0.2, seed=args.seed)
+    stub = start_stub(config)
+    os.environ.update(stub.environment())
+    for name, value in {"AMADEUS_CLIENT_ID": "bench", "AMADEUS_CLIENT_SECRET": "bench", "OPENAI_API_KEY": "bench",
+                        "YNAB_ACCESS_TOKEN": "bench", "YNAB_BUDGET_ID": "bench", "YNAB_TRAVEL_CATEGORY": "bench"}.items():
+        os.environ.setdefault(name, value)
+
+    # Bookings go to a scratch copy of the user database
+    scratch = tempfile.mkdtemp(prefix="action-bench-")
+    database = os.path.join(scratch, "database.json")
+    shutil.copy(os.path.join(ROOT, "src", "db", "database.json"), database)
+    import actions.db
+    actions.db.DATABASE_PATH = database
+
+    print(f"stub latency {args.latency_ms:.0f} ms (sigma {args.jitter}), errors {args.error_rate:.0%}, "
+          f"429s {args.throttle_rate:.0%}{', warm' if args.warm else ''}")
+    print(f"{'action':<18}{'conc':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'turns/s':>10}{'calls':>8}{'errors':>7}")
+    try:
+        results = asyncio.run(run_all(args, stub))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "warm": args.warm,
+            "turns": args.turns,
+            "stub": {"latency_ms": args.latency_ms, "jitter": args.jitter, "error_rate": args.error_rate,
+                     "throttle_rate": args.throttle_rate, "seed": args.seed},
+        },
+        "results": results,
+    }
+    regressed = compare(results, args.baseline, args.tolerance) if args.baseline else False
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nwrote {args.output}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
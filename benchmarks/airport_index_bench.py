@@ -0,0 +1,78 @@
+"""Lookup latency and memory footprint of the offline airport index, and the
+latency of "airports near" queries used to search every airport of a city.
+
+Run from the repository root:
+
+    python benchmarks/airport_index_bench.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("IATA_CACHE_PATH", "")
+
+# (case, query, lookup): resolve answers exact names and codes; suggest, the
+# guess made once Amadeus misses too, answers prefixes and typos
+QUERIES = [
+    ("exact city", "New York", "resolve"),
+    ("city code", "NYC", "resolve"),
+    ("airport code", "lhr", "resolve"),
+    ("accented", "Zürich", "resolve"),
+    ("miss", "Ouagadougou", "resolve"),
+    ("prefix", "San Fran", "suggest"),
+    ("typo", "new yrok", "suggest"),
+    ("miss", "Ouagadougou", "suggest"),
+]
+
+NEAR = ["NYC", "LON", "JFK", "TYO", "XXX"]
+RADIUS_KM = 80
+
+
+def time_lookups(lookup, query, rounds=2000):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = lookup(query)
+    elapsed = (time.perf_counter() - start) / rounds
+    return result, elapsed * 1e6
+
+
+def time_near(index, code, rounds=2000):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = index.airports_near(code, RADIUS_KM)
+    elapsed = (time.perf_counter() - start) / rounds
+    return result, elapsed * 1e6
+
+
+def main():
+    tracemalloc.start()
+    start = time.perf_counter()
+    from services.airport_index import AirportIndex
+    index = AirportIndex()
+    build_ms = (time.perf_counter() - start) * 1000
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"airports: {len(index)}  keys: {len(index._keys)}")
+    print(f"build (incl. import): {build_ms:.1f} ms  retained: {current / 1024:.0f} KiB  peak: {peak / 1024:.0f} KiB")
+    try:
+        import psutil
+        print(f"process RSS: {psutil.Process().memory_info().rss / 1024 / 1024:.1f} MiB")
+    except ImportError:
+        pass
+    print()
+    print(f"{'case':<14}{'query':<16}{'lookup':<9}{'result':<8}{'us/lookup':>10}")
+    for case, query, lookup in QUERIES:
+        result, micros = time_lookups(getattr(index, lookup), query)
+        print(f"{case:<14}{query:<16}{lookup:<9}{str(result):<8}{micros:>10.1f}")
+    print()
+    print(f"{'near':<8}{'airports within ' + str(RADIUS_KM) + ' km':<30}{'us/query':>10}")
+    for code in NEAR:
+        result, micros = time_near(index, code)
+        print(f"{code:<8}{' '.join(result) or '-':<30}{micros:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Memory and CPU of the FlightOffer/Destination models against raw Amadeus dicts.
+
+For a flight-offers response of N offers (the stub fixtures, repeated) this
+reports:
+
+- parse: json.loads alone (dict path) vs json.loads plus FlightOffer.from_response
+- retained: memory kept per response once parsed (tracemalloc), i.e. what a
+  result store holds per conversation
+- format: formatting the three offers shown per search turn
+- book: turning the selected offer into the stored booking record
+
+The dict path is the code as it was before the models: every turn walks
+the nested dicts and parses the ISO timestamps again.
+
+Run from the repository root (needs rasa_sdk for the actions):
+
+    python benchmarks/flight_models_bench.py --offers 5 50 250
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from actions import db
+from actions.book_flight import ActionSearchFlights
+from services.flight_models import Destination, FlightOffer
+
+FIXTURES = os.path.join(ROOT, "upstream_stub", "fixtures")
+
+
+def dict_format_offer(offer, index, emoji=ActionSearchFlights().get_time_emoji):
+    """format_flight_offer before the models"""
+    price = offer.get("price", {}).get("total", "N/A")
+    currency = offer.get("price", {}).get("currency", "USD")
+    itineraries = offer.get("itineraries", [])
+    parts = []
+    for itinerary in itineraries[:2]:
+        segments = itinerary.get("segments", [])
+        if not segments:
+            break
+        first, last = segments[0], segments[-1]
+        departure = datetime.fromisoformat(first.get("departure", {}).get("at", "").replace("Z", "+00:00"))
+        arrival = datetime.fromisoformat(last.get("arrival", {}).get("at", "").replace("Z", "+00:00"))
+        stops = len(segments) - 1
+        stops_text = "Direct" if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}"
+        duration = itinerary.get("duration", "").replace("PT", "").replace("H", "h ").replace("M", "m")
+        parts.append(
+            f"✈️ {first.get('departure', {}).get('iataCode', '')} → {last.get('arrival', {}).get('iataCode', '')}, "
+            f"🛑 {stops_text}\n📅 {departure.strftime('%b %d, %Y')}\n"
+            f"⏰ {emoji(departure.hour)} {departure.strftime('%H:%M')} → {emoji(arrival.hour)} "
+            f"{arrival.strftime('%H:%M')} ({duration})"
+        )
+    if not parts:
+        return f"Option {index}: No flight details available"
+    message = f"Option {index}\n{parts[0]}"
+    if len(parts) > 1:
+        message += f"\n🔄 Return: \n{parts[1]}"
+    return f"{message}\n💰 {currency} {price}"
+
+
+def dict_booking_segment(offer, itinerary_index):
+    """_extract_flight_segment before the models"""
+    itineraries = offer.get("itineraries", [])
+    if itinerary_index >= len(itineraries) or not itineraries[itinerary_index].get("segments"):
+        return None
+    segment = itineraries[itinerary_index]["segments"][0]
+    return {
+        "departureAirport": segment.get("departure", {}).get("iataCode"),
+        "departureTerminal": segment.get("departure", {}).get("terminal"),
+        "departureTime": segment.get("departure", {}).get("at"),
+        "arrivalAirport": segment.get("arrival", {}).get("iataCode"),
+        "arrivalTerminal": segment.get("arrival", {}).get("terminal"),
+        "arrivalTime": segment.get("arrival", {}).get("at"),
+        "flightNumber": f"{segment.get('carrierCode')}{segment.get('number')}",
+        "duration": segment.get("duration"),
+        "stops": segment.get("numberOfStops", 0),
+    }
+
+
+def make_response(name, count):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        response = json.load(f)
+    fixtures = response["data"]
+    response["data"] = []
+    for i in range(count):
+        item = copy.deepcopy(fixtures[i % len(fixtures)])
+        item["id"] = str(i + 1)
+        response["data"].append(item)
+    return json.dumps(response)
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def retained(fn, copies=20):
+    """Mean bytes still allocated per call while ``copies`` results are kept alive"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [fn() for _ in range(copies)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (after - before) / copies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, nargs="+", default=[5, 50, 250])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    action = ActionSearchFlights()
+    print(f"{'kind':<14}{'items':>6}{'path':>7}{'parse us':>10}{'retained KiB':>14}{'format us':>11}{'book us':>9}")
+    for count in args.offers:
+        text = make_response("flight_offers.json", count)
+        dicts = json.loads(text)["data"]
+        models = FlightOffer.from_response(dicts)
+        rounds = max(5, args.rounds * 5 // count)
+        rows = {
+            "dict": (
+                timed(lambda: json.loads(text)["data"], rounds),
+                retained(lambda: json.loads(text)["data"]),
+                timed(lambda: [dict_format_offer(offer, i + 1) for i, offer in enumerate(dicts[:3])], args.rounds),
+                timed(lambda: (dict_booking_segment(dicts[0], 0), dict_booking_segment(dicts[0], 1)), args.rounds),
+            ),
+            "model": (
+                timed(lambda: FlightOffer.from_response(json.loads(text)["data"]), rounds),
+                retained(lambda: FlightOffer.from_response(json.loads(text)["data"])),
+                timed(lambda: [action.format_flight_offer(offer, i + 1) for i, offer in enumerate(models[:3])],
+                      args.rounds),
+                timed(lambda: (db._extract_flight_segment(models[0].outbound),
+                               db._extract_flight_segment(models[0].inbound)), args.rounds),
+            ),
+        }
+        for path, (parse, kept, format_, book) in rows.items():
+            print(f"{'flight-offers':<14}{count:>6}{path:>7}{parse * 1e6:>10.1f}{kept / 1024:>14.1f}"
+                  f"{format_ * 1e6:>11.1f}{book * 1e6:>9.1f}")
+
+        text = make_response("flight_destinations.json", count)
+        rounds = max(5, args.rounds * 5 // count)
+        for path, parse in (("dict", lambda: json.loads(text)["data"]),
+                            ("model", lambda: Destination.from_response(json.loads(text)["data"]))):
+            print(f"{'destinations':<14}{count:>6}{path:>7}{timed(parse, rounds) * 1e6:>10.1f}"
+                  f"{retained(parse) / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
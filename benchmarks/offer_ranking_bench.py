@@ -0,0 +1,96 @@
+"""CPU cost of ranking flight offers with services.offer_ranking.
+
+For N offers (the stub fixtures, repeated with varied prices, departure
+times and airlines, as a flexible-dates fan-out returns them) this reports,
+per call and per 100 offers:
+
+- features: building the OfferFeatures arrays from the FlightOffer models
+- score: the weighted score over the arrays
+- top-k: argpartition selection of one page against a full argsort, and
+  against sorting the models in Python by a key function
+- rank: rank_offers end to end (features, score, top-k and reordering)
+
+Run from the repository root:
+
+    python benchmarks/offer_ranking_bench.py --offers 100 1000 10000
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from services.flight_models import FlightOffer
+from services.offer_ranking import OfferFeatures, rank_offers, score_offers, top_k
+
+FIXTURES = os.path.join(ROOT, "upstream_stub", "fixtures")
+AIRLINES = ["BA", "AA", "VS", "UA", "DL", "IB"]
+
+
+def make_offers(count, seed=1):
+    with open(os.path.join(FIXTURES, "flight_offers.json"), encoding="utf-8") as f:
+        fixtures = FlightOffer.from_response(json.load(f)["data"])
+    rng = random.Random(seed)
+    offers = []
+    for i in range(count):
+        offer = copy.deepcopy(fixtures[i % len(fixtures)])
+        offer.id = str(i + 1)
+        offer.total = (offer.total * Decimal(rng.uniform(0.7, 1.5))).quantize(Decimal("0.01"))
+        offer.validating_airlines = (rng.choice(AIRLINES),)
+        shift = timedelta(minutes=rng.randrange(-12 * 60, 12 * 60, 5))
+        for segment in offer.outbound.segments:
+            segment.departure_at += shift
+            segment.arrival_at += shift
+        offers.append(offer)
+    return offers
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--k", type=int, default=3, help="offers per page")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    preferences = {"airlines": ["BA"], "departure_time": "morning"}
+    print(f"{'offers':>7}{'features us':>13}{'score us':>10}{'top-k us':>10}{'argsort us':>12}"
+          f"{'sorted us':>11}{'rank us':>10}{'rank us/100':>13}")
+    for count in args.offers:
+        offers = make_offers(count)
+        rounds = max(20, args.rounds * 100 // count)
+        features = OfferFeatures(offers)
+        scores = score_offers(features, **preferences)
+        # the selection must agree with a full sort
+        assert list(top_k(scores, args.k)) == list(np.argsort(scores, kind="stable")[:args.k])
+
+        row = (
+            timed(lambda: OfferFeatures(offers), rounds),
+            timed(lambda: score_offers(features, **preferences), rounds),
+            timed(lambda: top_k(scores, args.k), rounds),
+            timed(lambda: np.argsort(scores, kind="stable")[:args.k], rounds),
+            timed(lambda: sorted(range(count), key=scores.__getitem__)[:args.k], rounds),
+            timed(lambda: rank_offers(offers, k=args.k, **preferences), rounds),
+        )
+        features_us, score_us, top_us, argsort_us, sorted_us, rank_us = (value * 1e6 for value in row)
+        print(f"{count:>7}{features_us:>13.1f}{score_us:>10.1f}{top_us:>10.1f}{argsort_us:>12.1f}"
+              f"{sorted_us:>11.1f}{rank_us:>10.1f}{rank_us * 100 / count:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Read and write latency of the JSON and SQLite user database backends.
+
+Builds a synthetic database of N users (every fourth one with a booking) for
+each size, then times through the actions.db functions:
+
+- load: first lookup after start-up (JSON parses and indexes the whole file)
+- get_user_by_id / get_user_by_name: random existing users
+- get_flights_in_window: departures from one airport in a 6 hour window
+- add_flight_to_user: one booking written
+
+Run from the repository root (1M users needs a few GB of RAM for the JSON path):
+
+    python benchmarks/user_db_bench.py --users 1000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from actions import db
+
+CITIES = ["New York", "London", "Paris", "Berlin", "Madrid", "Tokyo", "Sydney", "Toronto"]
+AIRPORTS = ["EWR", "JFK", "LHR", "CDG", "MIA"]
+FIRST_DEPARTURE = datetime(2025, 6, 1)
+
+BOOKING = {
+    "bookingDate": "2025-05-01",
+    "status": "confirmed",
+    "flightDetails": {
+        "price": {"currency": "USD", "total": "412.20"},
+        "validatingAirlineCodes": ["BA"],
+        "itineraries": [
+            {"segments": [{"departure": {"iataCode": "JFK", "at": "2025-06-01T18:30:00"},
+                           "arrival": {"iataCode": "LHR", "at": "2025-06-02T06:35:00"},
+                           "carrierCode": "BA", "number": "178", "duration": "PT7H5M"}]},
+            {"segments": [{"departure": {"iataCode": "LHR", "at": "2025-06-08T11:20:00"},
+                           "arrival": {"iataCode": "JFK", "at": "2025-06-08T14:30:00"},
+                           "carrierCode": "BA", "number": "177", "duration": "PT8H10M"}]},
+        ],
+    },
+}
+
+
+def make_users(count):
+    for user_id in range(1, count + 1):
+        user = {
+            "id": user_id,
+            "name": {"firstName": f"First{user_id}", "lastName": f"Last{user_id % 1000}"},
+            "preferredDepartureCity": CITIES[user_id % len(CITIES)],
+            "preferredDepartureCountry": "USA",
+            "preferredSeat": "Window",
+        }
+        if user_id % 4 == 0:
+            # spread over a year so window queries match a realistic share of bookings
+            departure = FIRST_DEPARTURE + timedelta(minutes=user_id * 7919 % (365 * 24 * 60))
+            user["flights"] = [{
+                "id": 1, "bookingDate": "2025-04-01", "status": "confirmed",
+                "totalPrice": {"amount": "206.96", "currency": "USD"},
+                "outboundFlight": {"departureAirport": AIRPORTS[user_id % len(AIRPORTS)],
+                                   "departureTime": departure.isoformat(),
+                                   "arrivalAirport": "MIA", "arrivalTime": (departure + timedelta(hours=3)).isoformat(),
+                                   "flightNumber": "UA2295"},
+                "returnFlight": None, "airline": "UA", "tripType": "ONE_WAY",
+            }]
+        yield user
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def bench_backend(users, store_factory, lookups, writes):
+    rng = random.Random(1)
+    ids = [rng.randint(1, users) for _ in range(lookups)]
+    start = time.perf_counter()
+    db._store = store_factory()
+    db.get_user_by_id(1)
+    load = time.perf_counter() - start
+
+    id_iter = iter(ids)
+    by_id = timed(lambda: db.get_user_by_id(next(id_iter)), lookups)
+    name_iter = iter(ids)
+    by_name = timed(lambda: db.get_user_by_name(f"First{next(name_iter)}"), lookups)
+    # the first query builds the JSON store's window index; time the ones after it
+    db.get_flights_in_window(6, "EWR", start=FIRST_DEPARTURE)
+    starts = iter([FIRST_DEPARTURE + timedelta(hours=rng.randint(0, 364 * 24)) for _ in range(lookups)])
+    window = timed(lambda: db.get_flights_in_window(6, "EWR", start=next(starts)), lookups)
+    write_iter = iter(ids)
+    write = timed(lambda: db.add_flight_to_user(next(write_iter), dict(BOOKING)), writes)
+    return {"load_ms": load * 1000, "by_id_us": by_id * 1e6, "by_name_us": by_name * 1e6, "window_us": window * 1e6,
+            "write_ms": write * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=50, help="bookings per backend (fewer for large JSON files)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="user-db-bench-")
+    print(f"{'users':>9}{'backend':>9}{'file MB':>9}{'load ms':>10}{'by id us':>10}{'by name us':>12}{'window us':>11}{'write ms':>10}")
+    try:
+        for users in args.users:
+            json_path = os.path.join(workdir, f"users-{users}.json")
+            sqlite_path = os.path.join(workdir, f"users-{users}.sqlite")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({"users": list(make_users(users))}, f)
+            db.migrate_json_to_sqlite(json_path, sqlite_path)
+
+            db.DATABASE_PATH = json_path
+            # every JSON booking rewrites the whole file
+            json_writes = max(3, min(args.writes, 50_000_000 // (users * 100)))
+            backends = [
+                ("json", db.JSONUserStore, json_path, json_writes),
+                ("sqlite", lambda: db.SQLiteUserStore(sqlite_path), sqlite_path, args.writes),
+            ]
+            for name, factory, path, writes in backends:
+                result = bench_backend(users, factory, args.lookups, writes)
+                size = os.path.getsize(path) / 1024 / 1024
+                print(f"{users:>9}{name:>9}{size:>9.1f}{result['load_ms']:>10.1f}{result['by_id_us']:>10.1f}"
+                      f"{result['by_name_us']:>12.1f}{result['window_us']:>11.1f}{result['write_ms']:>10.2f}")
+                db._store = None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+from services.destination_snapshot import destination_snapshot
+
+# Refreshing the destination snapshot calls Amadeus in the background, so it is opt-in
+if destination_snapshot.enabled:
+    from .get_cheapest_flights import start_destination_refresh
+    start_destination_refresh()
@@ -1,10 +1,33 @@
-from typing import Any, Text, Dict, List
+import re
+from typing import Any, Text, Dict, List, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 from datetime import datetime  
-from services.flight_service import FlightService
-from actions.db import add_flight_to_user
+from services.flight_service import FlightService, flexible_date_pairs
+from services.flight_models import FlightOffer
+from services.offer_ranking import rank_offers
+from services.result_store import PAGE_SIZE, ResultPages, fetch_page, prefetch_page, result_store
+from actions.db import add_flight_to_user, get_user_by_id
+
+# Spelled-out option numbers the LLM may leave in selected_flight_index; not "one", as in "the second one"
+OPTION_WORDS = {
+    "first": 1, "second": 2, "two": 2, "third": 3, "three": 3, "fourth": 4, "four": 4,
+    "fifth": 5, "five": 5, "sixth": 6, "six": 6, "seventh": 7, "seven": 7, "eighth": 8, "eight": 8,
+    "ninth": 9, "nine": 9, "tenth": 10, "ten": 10,
+}
+
+
+def parse_option_number(value: Any) -> Optional[int]:
+    """The option number in selected_flight_index ("2", "option 2", "the second one"), or None"""
+    text = str(value if value is not None else "").strip().lower()
+    numbers = re.findall(r"-?\d+(?:\.\d+)?", text)
+    if numbers:
+        number = float(numbers[0])
+        return int(number) if len(numbers) == 1 and number.is_integer() else None
+    words = [OPTION_WORDS[word] for word in re.findall(r"[a-z]+", text) if word in OPTION_WORDS]
+    return words[0] if len(words) == 1 else None
+
 
 class ActionSearchFlights(Action):
     def name(self) -> Text:
@@ -18,115 +41,132 @@ class ActionSearchFlights(Action):
         else:  # Nighttime (7pm-5am)
             return "🌙"
     
-    def format_flight_offer(self, offer, index):
+    def format_duration(self, duration):
+        # PT7H5M -> "7h 5m"
+        return (duration or "").replace('PT', '').replace('H', 'h ').replace('M', 'm')
+
+    def format_itinerary(self, itinerary):
         """
-        Format a flight offer into a user-friendly message
+        Route, stops, date and times of one journey of an offer
         """
-        price = offer.get("price", {}).get("total", "N/A")
-        currency = offer.get("price", {}).get("currency", "USD")
-        
-        # Extract flight details
-        itineraries = offer.get("itineraries", [])
-        outbound = itineraries[0] if itineraries else {}
-        inbound = itineraries[1] if len(itineraries) > 1 else None
-        
-        # Format outbound journey
-        outbound_segments = outbound.get("segments", [])
-        if not outbound_segments:
-            return f"Option {index}: No flight details available"
-            
-        # Get departure and arrival details for outbound
-        first_segment = outbound_segments[0]
-        last_segment = outbound_segments[-1]
-        
-        departure_iata = first_segment.get("departure", {}).get("iataCode", "")
-        arrival_iata = last_segment.get("arrival", {}).get("iataCode", "")
-        
-        # Format departure and arrival times
-        departure_datetime = datetime.fromisoformat(first_segment.get("departure", {}).get("at", "").replace('Z', '+00:00'))
-        arrival_datetime = datetime.fromisoformat(last_segment.get("arrival", {}).get("at", "").replace('Z', '+00:00'))
-        
-        dep_time = departure_datetime.strftime("%H:%M")
-        arr_time = arrival_datetime.strftime("%H:%M")
+        first_segment = itinerary.departure
+        last_segment = itinerary.arrival
+        departure_datetime = first_segment.departure_at
+        arrival_datetime = last_segment.arrival_at
         
         # Add emoji based on time
-        dep_hour = departure_datetime.hour
-        arr_hour = arrival_datetime.hour
-                
-        dep_emoji = self.get_time_emoji(dep_hour)
-        arr_emoji = self.get_time_emoji(arr_hour)
-
-        # Format date
-        formatted_date = departure_datetime.strftime("%b %d, %Y")
+        dep_emoji = self.get_time_emoji(departure_datetime.hour)
+        arr_emoji = self.get_time_emoji(arrival_datetime.hour)
         
         # Get stops information
-        stops = len(outbound_segments) - 1
+        stops = itinerary.stops
         stops_text = "Direct" if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}"
         
-        # Format duration
-        duration = outbound.get("duration", "").replace('PT', '').replace('H', 'h ').replace('M', 'm')
-                # Add price information
-        price_msg = f"\n💰 {currency} {price}"
-        # Create the outbound message
-        outbound_msg = (
-            f"Option {index}\n"
-            f"✈️ {departure_iata} → {arrival_iata}, 🛑 {stops_text}\n"
-            f"📅 {formatted_date}\n"
-            f"⏰ {dep_emoji} {dep_time} → {arr_emoji} {arr_time} ({duration})"
+        return (
+            f"✈️ {first_segment.departure_airport or ''} → {last_segment.arrival_airport or ''}, 🛑 {stops_text}\n"
+            f"📅 {departure_datetime.strftime('%b %d, %Y')}\n"
+            f"⏰ {dep_emoji} {departure_datetime.strftime('%H:%M')} → {arr_emoji} {arrival_datetime.strftime('%H:%M')} "
+            f"({self.format_duration(itinerary.duration)})"
         )
+    
+    def format_flight_offer(self, offer, index):
+        """
+        Format a flight offer (a FlightOffer) into a user-friendly message
+        """
+        outbound = offer.outbound
+        if outbound is None or not outbound.segments:
+            return f"Option {index}: No flight details available"
+        
+        # Create the outbound message
+        outbound_msg = f"Option {index}\n{self.format_itinerary(outbound)}"
         
         # Add return journey if it exists
         return_msg = ""
-        if inbound:
-            inbound_segments = inbound.get("segments", [])
-            if inbound_segments:
-                # Get departure and arrival details for inbound
-                first_return_segment = inbound_segments[0]
-                last_return_segment = inbound_segments[-1]
-                
-                return_departure_iata = first_return_segment.get("departure", {}).get("iataCode", "")
-                return_arrival_iata = last_return_segment.get("arrival", {}).get("iataCode", "")
-                
-                # Format departure and arrival times
-                return_departure_datetime = datetime.fromisoformat(first_return_segment.get("departure", {}).get("at", "").replace('Z', '+00:00'))
-                return_arrival_datetime = datetime.fromisoformat(last_return_segment.get("arrival", {}).get("at", "").replace('Z', '+00:00'))
-                
-                ret_dep_time = return_departure_datetime.strftime("%H:%M")
-                ret_arr_time = return_arrival_datetime.strftime("%H:%M")
-                
-                # Add emoji based on time
-                ret_dep_hour = return_departure_datetime.hour
-                ret_arr_hour = return_arrival_datetime.hour
-                
-                ret_dep_emoji = self.get_time_emoji(ret_dep_hour)
-                ret_arr_emoji = self.get_time_emoji(ret_arr_hour)
-                
-                # Format date
-                ret_formatted_date = return_departure_datetime.strftime("%b %d, %Y")
-                
-                # Get stops information
-                ret_stops = len(inbound_segments) - 1
-                ret_stops_text = "Direct" if ret_stops == 0 else f"{ret_stops} stop{'s' if ret_stops > 1 else ''}"
-                
-                # Format duration
-                ret_duration = inbound.get("duration", "").replace('PT', '').replace('H', 'h ').replace('M', 'm')
-                
-                return_msg = (
-                    f"\n🔄 Return: \n"
-                    f"✈️ {return_departure_iata} → {return_arrival_iata}, 🛑 {ret_stops_text}\n"
-                    f"📅 {ret_formatted_date}\n"
-                    f"⏰ {ret_dep_emoji} {ret_dep_time} → {ret_arr_emoji} {ret_arr_time} ({ret_duration})"
-                )
+        inbound = offer.inbound
+        if inbound is not None and inbound.segments:
+            return_msg = f"\n🔄 Return: \n{self.format_itinerary(inbound)}"
+        
+        # Add price information
+        price_msg = f"\n💰 {offer.currency} {offer.total if offer.total is not None else 'N/A'}"
         
         # Combine all parts
         full_message = f"{outbound_msg}{return_msg}{price_msg}"
         
         return full_message
+
+    def format_page(self, start, offers):
+        """One message per offer, numbered from ``start + 1``"""
+        return [self.format_flight_offer(offer, start + i + 1) for i, offer in enumerate(offers)]
+
+    def format_price_calendar(self, calendar):
+        """
+        Cheapest price per departure day of a flexible-dates search
+        """
+        cheapest = calendar.cheapest()
+        lines = ["📆 Cheapest price per departure day:"]
+        for day in calendar.sorted_days():
+            marker = " ⭐" if day is cheapest else ""
+            return_text = f" → {day.return_date.strftime('%a %b %d')}" if day.return_date else ""
+            lines.append(f"{day.departure_date.strftime('%a %b %d')}{return_text}: "
+                         f"💰 {day.offer.currency} {day.total}{marker}")
+        if not calendar.complete:
+            lines.append(f"(Searched {calendar.searched} of {calendar.planned} date combinations in time; "
+                         f"other days may be cheaper.)")
+        return "\n".join(lines)
+
+    async def search_flexible_dates(self, dispatcher, flight_service, departure_city, destination, date_pairs,
+                                    pax, travel_class, max_price, preferences):
+        """
+        Search every date pair in the travel window and show the cheapest option per day
+        """
+        flight_result = await flight_service.search_flexible_dates_async(
+            departure=departure_city,
+            destination=destination,
+            date_pairs=date_pairs,
+            num_adults=pax,
+            travel_class=travel_class,
+            max_price=max_price
+        )
+        if not flight_result["success"]:
+            return [SlotSet("flight_offers", None), SlotSet("return_value", "no_flights_found")]
+
+        calendar = flight_result["data"]
+        # The best offer of each day, ranked like any other search result, can be booked from here
+        pages = ResultPages(calendar.offers())
+        handle = result_store.put("flight-offers", pages)
+        dispatcher.utter_message(response="utter_flights_found")
+        dispatcher.utter_message(text=self.format_price_calendar(calendar))
+        self.show_page(dispatcher, flight_service, handle, pages, 0, preferences)
+        return [SlotSet("flight_offers", handle), SlotSet("flight_offers_page", 0),
+                SlotSet("return_value", "success")]
+
+    def ranking_preferences(self, tracker):
+        """
+        The user's airline and departure time preferences, for rank_offers
+        """
+        user = get_user_by_id(tracker.get_slot("user_id")) if tracker.get_slot("user_id") else None
+        if not user:
+            return {}
+        return {"airlines": user.preferred_airlines, "departure_time": user.preferred_departure_time}
+
+    def show_page(self, dispatcher, flight_service, handle, pages, page, preferences):
+        """Show a page of offers and start fetching the one after it"""
+        ranked = str(page) not in pages.rendered
+        if ranked:
+            # Pick the best offers not shown yet for this page; the ones shown keep their numbers
+            start = pages.start(page)
+            pages.items[start:] = rank_offers(pages.items[start:], k=pages.page_size, **preferences)
+        for message in pages.render(page, self.format_page):
+            dispatcher.utter_message(text=message)
+        if ranked:
+            # Booking (maybe on another action server) must find the offers in the order they were shown
+            result_store.update(handle, pages)
+        prefetch_page(handle, pages, page + 1, flight_service.fetch_more_offers_async)
     
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Get slots
         departure_city = tracker.get_slot("departure_city")
@@ -137,6 +177,11 @@ class ActionSearchFlights(Action):
         travel_class = tracker.get_slot("travel_class")
         maxPrice = int(tracker.get_slot("maxPrice") or tracker.get_slot("travel_budget"))
         
+        # A travel window and trip length instead of exact dates: search the dates in between
+        date_pairs = []
+        if not departure_date:
+            date_pairs = flexible_date_pairs(tracker.get_slot("travel_timeframe"), tracker.get_slot("duration"))
+
         if not departure_date or not return_date:
             travel_timeframe = tracker.get_slot("travel_timeframe")
             if travel_timeframe:
@@ -163,29 +208,38 @@ class ActionSearchFlights(Action):
             
             # Get number of passengers
             pax = int(number_of_pax) if number_of_pax else 1
+
+            if len(date_pairs) > 1:
+                return await self.search_flexible_dates(dispatcher, flight_service, departure_city, destination,
+                                                        date_pairs, pax, travel_class, maxPrice,
+                                                        self.ranking_preferences(tracker))
             
             # Search for flights using the flight service
-            flight_result = flight_service.get_flight_offers(
+            flight_result = await flight_service.get_flight_offers_async(
                 departure=departure_city,
                 destination=destination,
                 departure_date=formatted_departure_date,
                 return_date=formatted_return_date,
                 num_adults=int(pax),
                 travel_class=travel_class,
-                max_price=maxPrice
+                max_price=maxPrice,
+                # the first page, and one more to know whether there is a next one
+                max_results=PAGE_SIZE + 1
             )
             
             if flight_result and "data" in flight_result and flight_result["data"]:
-                flight_offers = flight_result["data"]
+                # Parsed once; formatting and booking work on the models from here on
+                flight_offers = FlightOffer.from_response(flight_result["data"])
+                # Further pages are fetched from upstream only if the user asks for them
+                pages = ResultPages(flight_offers, query=flight_result["query"],
+                                    exhausted=flight_result["exhausted"])
                 # Store flight offers in a slot for later use
+                handle = result_store.put("flight-offers", pages)
                 dispatcher.utter_message(response="utter_flights_found")
+                self.show_page(dispatcher, flight_service, handle, pages, 0, self.ranking_preferences(tracker))
                 
-                # Format and display flight options using the new formatting function
-                for i, offer in enumerate(flight_offers[:3]):  # Show top 3 offers
-                    formatted_message = self.format_flight_offer(offer, i+1)
-                    dispatcher.utter_message(text=formatted_message)
-                
-                return [SlotSet("flight_offers", flight_offers), SlotSet("return_value", "success")]
+                return [SlotSet("flight_offers", handle), SlotSet("flight_offers_page", 0),
+                        SlotSet("return_value", "success")]
             else:
                 #dispatcher.utter_message(text="I couldn't find any flights matching your criteria. Would you like to try different dates or destinations?")
                 return [SlotSet("flight_offers", None), SlotSet("return_value", "no_flights_found")]
@@ -195,6 +249,63 @@ class ActionSearchFlights(Action):
             return [SlotSet("return_value", "error")]
 
 
+class ActionShowMoreFlightOffers(ActionSearchFlights):
+    def name(self) -> Text:
+        return "action_show_more_flight_offers"
+
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        handle = tracker.get_slot("flight_offers")
+        pages = result_store.get(handle)
+        next_page = int(tracker.get_slot("flight_offers_page") or 0) + 1
+
+        if not pages:
+            dispatcher.utter_message(text="I don't have any flight offers to show you. Let's search for flights first.")
+            return [SlotSet("selected_flight_index", None)]
+
+        flight_service = FlightService()
+        try:
+            # Usually prefetched while the user was reading the previous page
+            await fetch_page(handle, pages, next_page, flight_service.fetch_more_offers_async)
+        except Exception as e:
+            print(f"Error fetching more flight offers: {e}")
+
+        if not pages.page(next_page):
+            dispatcher.utter_message(text="There are no more flight offers available.")
+            return [SlotSet("selected_flight_index", None)]
+
+        self.show_page(dispatcher, flight_service, handle, pages, next_page, self.ranking_preferences(tracker))
+        return [SlotSet("flight_offers_page", next_page), SlotSet("selected_flight_index", None)]
+
+
+class ActionAskSelectedFlightIndex(Action):
+    def name(self) -> Text:
+        return "action_ask_selected_flight_index"
+
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        pages = result_store.get(tracker.get_slot("flight_offers"))
+        page = int(tracker.get_slot("flight_offers_page") or 0)
+
+        # One button per option on the page shown
+        buttons = []
+        if pages:
+            start = pages.start(page)
+            for i in range(start, start + len(pages.page(page))):
+                buttons.append({"title": str(i + 1), "payload": f"/SetSlots(selected_flight_index={i + 1})"})
+            if pages.has_page(page + 1):
+                buttons.append({"title": "See More Options", "payload": "/SetSlots(selected_flight_index=see_more)"})
+        buttons.append({"title": "Modify my search", "payload": "/SetSlots(selected_flight_index=modify)"})
+
+        dispatcher.utter_message(text="Which flight option would you like to book? Please select a number.",
+                                 buttons=buttons)
+        return []
+
+
 class ActionConfirmFlightDetails(Action):
     def name(self) -> Text:
         return "action_confirm_flight_details"
@@ -231,17 +342,22 @@ class ActionBookFlight(Action):
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        # Get flight offers from slot
-        flight_offers = tracker.get_slot("flight_offers")
+        # Get flight offers from the result store (None once they have expired)
+        pages = result_store.get(tracker.get_slot("flight_offers"))
         selected_flight_index = tracker.get_slot("selected_flight_index")
         user_id = tracker.get_slot("user_id")
 
-        if not flight_offers:
+        if not pages:
             dispatcher.utter_message(text="I don't have any flight offers to book. Let's search for flights first.")
             return []
-           # Get the selected flight (assuming the first one for simplicity)
-        # In a real implementation, you would get the user's selection
-        selected_flight = flight_offers[int(selected_flight_index)-1]
+
+        # Only the options shown so far can be picked, numbered from 1 across pages
+        shown = min(len(pages.items), pages.start(int(tracker.get_slot("flight_offers_page") or 0) + 1))
+        option = parse_option_number(selected_flight_index)
+        if option is None or not 1 <= option <= shown:
+            dispatcher.utter_message(text=f"Please pick one of the options shown, from 1 to {shown}.")
+            return [SlotSet("selected_flight_index", None), SlotSet("return_value", "invalid_selection")]
+        selected_flight = pages.items[option - 1]
         
         # Get user information (assuming user ID 1 for simplicity)
         # In a real implementation, you would identify the user from the conversation
@@ -250,11 +366,7 @@ class ActionBookFlight(Action):
         # Extract flight details for saving
         flight_data = {
             "bookingDate": datetime.now().strftime("%Y-%m-%d"),
-            "flightDetails": {
-                "price": selected_flight.get("price", {}),
-                "itineraries": selected_flight.get("itineraries", []),
-                "validatingAirlineCodes": selected_flight.get("validatingAirlineCodes", [])
-            },
+            "flightDetails": selected_flight,
             "status": "confirmed"
         }
         
@@ -270,7 +382,7 @@ class ActionBookFlight(Action):
             dispatcher.utter_message(text="I couldn't save your booking. Please try again later.")
    
         # Clear flight offers slot after booking
-        return [SlotSet("flight_offers", None)]
+        return [SlotSet("flight_offers", None), SlotSet("return_value", "success" if success else "failure")]
 
 
 class ActionResetFlightBooking(Action):
@@ -289,11 +401,12 @@ class ActionResetFlightBooking(Action):
             SlotSet("returnDate", None),
             SlotSet("number_of_pax", "1"),
             SlotSet("flight_offers", None),
+            SlotSet("flight_offers_page", 0),
             SlotSet("return_value", None),
             SlotSet("flight_search_type", None),
             SlotSet("travel_timeframe", None),
             SlotSet("duration", None),
-            SlotSet("flight_suggestions", []),
+            SlotSet("flight_suggestions", None),
             SlotSet("destination_index", None),
             SlotSet("selected_destination", None)
         ]
@@ -1,12 +1,26 @@
 import os
+import bisect
+import copy
 import json
-from typing import Any, Dict, List, Optional
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 from rasa.shared.utils.io import read_json_file
-from rasa.nlu.utils import write_json_to_file
+
+from services.flight_models import FlightOffer, Itinerary
 
 # Define the database path
 DATABASE_PATH = "db/database.json"
+# "json" (DATABASE_PATH) or "sqlite" (SQLITE_DATABASE_PATH, migrate with `python -m actions.db migrate`)
+DATABASE_BACKEND = os.getenv("USER_DB_BACKEND", "json")
+SQLITE_DATABASE_PATH = os.getenv("USER_DB_SQLITE_PATH", "db/database.sqlite")
 
 class User:
     """Class representing a user in the database."""
@@ -17,120 +31,1023 @@ class User:
         self.last_name = name_data.get("lastName")
         self.preferred_departure_city = user_data.get("preferredDepartureCity")
         self.preferred_departure_country = user_data.get("preferredDepartureCountry")
+        # Optional; used to rank flight offers
+        self.preferred_airlines = user_data.get("preferredAirlines") or []
+        self.preferred_departure_time = user_data.get("preferredDepartureTime")
         self._raw_data = user_data
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert user object back to dictionary."""
+        """Convert user object back to dictionary (shared with the user store, don't modify it)."""
         return self._raw_data
 
-def read_database() -> Dict[str, Any]:
-    """Read the database file."""
+def normalize_name(name: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a first or last name."""
+    return " ".join((name or "").split()).casefold()
+
+def _full_name_key(user: "User") -> Tuple[str, str]:
+    """Key of the (first name, last name) index"""
+    return normalize_name(user.first_name), normalize_name(user.last_name)
+
+def _merge_user(user: Dict[str, Any], updated_data: Dict[str, Any]) -> None:
+    """Apply update_user's changes to a user record in place."""
+    # Update only the fields provided in updated_data
+    for key, value in updated_data.items():
+        if key == "name" and isinstance(value, dict):
+            # Handle nested name object
+            if "name" not in user:
+                user["name"] = {}
+            for name_key, name_value in value.items():
+                user["name"][name_key] = name_value
+        else:
+            user[key] = value
+
+def _next_id(records: List[Dict[str, Any]]) -> int:
+    max_id = 0
+    for record in records:
+        if record.get("id", 0) > max_id:
+            max_id = record.get("id")
+    return max_id + 1
+
+class Journal:
+    """Append-only JSON-lines file of changes, with group commit.
+
+    ``append`` queues a record and returns a Future. A committer thread writes
+    everything queued within ``GROUP_COMMIT_WINDOW`` in one write and one fsync,
+    then resolves the Futures, so concurrent bookings share an fsync.
+    """
+
+    GROUP_COMMIT_WINDOW = float(os.getenv("USER_DB_GROUP_COMMIT_MS", "2")) / 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        # Held while a batch is written and while the file is rotated away
+        self.file_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+        # Bytes in the file that this process knows about (loaded or written)
+        self.size = 0
+        self.records = 0
+        self.batches = 0
+        # set when the file ends in a torn record, so the next batch starts on a new line
+        self.torn_tail = False
+
+    def append(self, record: Dict[str, Any]) -> Future:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        future = Future()
+        with self._cond:
+            self._pending.append((line, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="user-db-journal", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            if self.GROUP_COMMIT_WINDOW:
+                time.sleep(self.GROUP_COMMIT_WINDOW)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            data = b"".join(line for line, _ in batch)
+            with self.file_lock:
+                if self.torn_tail:
+                    data, self.torn_tail = b"\n" + data, False
+                try:
+                    with open(self.path, "ab") as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self.size += len(data)
+                except OSError as e:
+                    print(f"Error writing database journal: {e}")
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+                self.records += len(batch)
+                self.batches += 1
+            for _, future in batch:
+                future.set_result(True)
+
+    def rotate(self, to_path: str) -> None:
+        """Move the journal aside; later records start a new file"""
+        with self.file_lock:
+            if os.path.exists(self.path):
+                os.replace(self.path, to_path)
+            self.size = self.records = 0
+
+    @staticmethod
+    def ends_with_newline(path: str) -> bool:
+        try:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) == b"\n"
+        except OSError:
+            return True
+
+    @staticmethod
+    def read(path: str) -> List[Dict[str, Any]]:
+        """Records in a journal file, ignoring a torn last line"""
+        try:
+            with open(path, "rb") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for number, line in enumerate(lines, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                if number != len(lines):
+                    print(f"Skipping corrupt record {number} in {path}")
+        return records
+
+def _write_snapshot(path: str, data: Dict[str, Any]) -> None:
+    """Write the database to a temporary file and atomically rename it over ``path``, keeping its permissions"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
     try:
-        return read_json_file(DATABASE_PATH)
-    except Exception as e:
-        print(f"Error reading database: {e}")
-        return {"users": []}
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # mkstemp creates the file 0600
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    try:
+        # make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
 
-def write_database(data: Dict[str, Any]) -> None:
-    """Write data to the database file."""
+class JSONUserStore:
+    """The JSON user database, kept in memory and changed through a journal.
+
+    ``database.json`` is the last snapshot and ``database.json.journal`` holds
+    every change since, one JSON record per line. Loading applies the journal
+    on top of the snapshot. Users are indexed by id, by normalized first
+    name and by normalized (first name, last name). Each lookup checks the snapshot's mtime and size and the journal's
+    size, and reloads if another process changed them.
+
+    A write appends one record and waits for its group-committed fsync, so a
+    booking costs O(size of the user) rather than O(size of the database),
+    and a crash can at worst lose the torn last record. Once the journal holds
+    ``COMPACT_RECORDS`` records a background thread folds it into a new
+    snapshot with an atomic rename.
+
+    User records are never changed in place: a change replaces the record,
+    which is what lets compaction snapshot the users without blocking writers.
+    Replaying a record twice is harmless, so a compaction interrupted between
+    the rename and removing the old journal loses nothing.
+    """
+
+    JOURNAL_SUFFIX = ".journal"
+    COMPACTING_SUFFIX = ".journal.compacting"
+    COMPACT_RECORDS = int(os.getenv("USER_DB_COMPACT_RECORDS", "1000"))
+
+    def __init__(self):
+        # Held while changes are applied and queued, so they reach the journal in order
+        self.lock = threading.RLock()
+        # Taken before ``lock`` by anything that replaces the snapshot file
+        self._snapshot_lock = threading.Lock()
+        self._path = None
+        self._snapshot_signature = None
+        self._journal = None
+        self._compacting = False
+        self._data = {"users": []}
+        self._users = []
+        self._positions = {}
+        self._by_first_name = {}
+        self._by_full_name = {}
+        self._max_id = 0
+        # position -> (flights list it was built from, departure times, flights in that order)
+        self._flight_indexes = {}
+        # segments of every booking by departure/arrival time, built on the first window query
+        self._window_index = None
+        self.loads = 0
+        self.compactions = 0
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _is_current(self, path: str) -> bool:
+        if path != self._path or self._stat(path) != self._snapshot_signature:
+            return False
+        journal_size = self._stat(self._journal.path)
+        # our own appends may be in flight; only growth beyond them is someone else's
+        return (journal_size[1] if journal_size else 0) <= self._journal.size
+
+    @staticmethod
+    def _apply(data: Dict[str, Any], positions: Dict[Any, int], record: Dict[str, Any]) -> Optional[int]:
+        """Apply one journal record; returns the position of the user it changed, if any"""
+        users = data.setdefault("users", [])
+        op = record.get("op")
+        if op == "add_user":
+            user = record["user"]
+            if user.get("id") in positions:
+                return None
+            users.append(user)
+            positions[user.get("id")] = len(users) - 1
+            return len(users) - 1
+        position = positions.get(record.get("user_id"))
+        if position is None:
+            return None
+        if op == "update_user":
+            user = copy.deepcopy(users[position])
+            _merge_user(user, record["changes"])
+        elif op == "add_flight":
+            flight = record["flight"]
+            flights = users[position].get("flights") or []
+            if any(existing.get("id") == flight.get("id") for existing in flights):
+                return None
+            user = dict(users[position])
+            user["flights"] = flights + [flight]
+        elif op == "cancel_flight":
+            user = dict(users[position])
+            user["flights"] = [
+                dict(flight, status="cancelled") if flight.get("id") == record["flight_id"] else flight
+                for flight in users[position].get("flights") or []
+            ]
+        else:
+            print(f"Skipping unknown database journal record: {op}")
+            return None
+        users[position] = user
+        return position
+
+    def _index(self, data: Dict[str, Any]) -> None:
+        users = [User(user_data) for user_data in data.get("users", [])]
+        positions, by_first_name, by_full_name = {}, {}, {}
+        for position, user in enumerate(users):
+            positions.setdefault(user.id, position)
+            by_first_name.setdefault(normalize_name(user.first_name), []).append(position)
+            by_full_name.setdefault(_full_name_key(user), []).append(position)
+        self._data, self._users, self._positions = data, users, positions
+        self._by_first_name, self._by_full_name = by_first_name, by_full_name
+        self._max_id = max((user.id for user in users if isinstance(user.id, int)), default=0)
+        self._flight_indexes = {}
+        self._window_index = None
+
+    def _flight_index(self, position: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """A user's bookings ordered by departure time, built on first use"""
+        flights = self._data["users"][position].get("flights") or []
+        cached = self._flight_indexes.get(position)
+        if cached is not None and cached[0] is flights:
+            return cached[1], cached[2]
+        ordered = sorted(flights, key=lambda flight: flight_departure_time(flight) or "")
+        departures = [flight_departure_time(flight) or "" for flight in ordered]
+        self._flight_indexes[position] = (flights, departures, ordered)
+        return departures, ordered
+
+    def _index_new_flight(self, position: int) -> None:
+        """Insert the booking just appended for a user into their flight index, if it was built"""
+        flights = self._data["users"][position].get("flights") or []
+        cached = self._flight_indexes.get(position)
+        if cached is None or len(cached[0]) + 1 != len(flights):
+            self._flight_indexes.pop(position, None)
+            return
+        departures, ordered = list(cached[1]), list(cached[2])
+        departure = flight_departure_time(flights[-1]) or ""
+        at = bisect.bisect_right(departures, departure)
+        departures.insert(at, departure)
+        ordered.insert(at, flights[-1])
+        self._flight_indexes[position] = (flights, departures, ordered)
+
+    def _reindex(self, position: int) -> None:
+        """Refresh the indexes for the user record at ``position``"""
+        user = User(self._data["users"][position])
+        old = None
+        if position < len(self._users):
+            old = self._users[position]
+            self._users[position] = user
+        else:
+            self._users.append(user)
+            self._positions.setdefault(user.id, position)
+            if isinstance(user.id, int):
+                self._max_id = max(self._max_id, user.id)
+        for index, key in ((self._by_first_name, lambda user: normalize_name(user.first_name)),
+                           (self._by_full_name, _full_name_key)):
+            if old is not None:
+                if key(old) == key(user):
+                    continue
+                index[key(old)].remove(position)
+            bisect.insort(index.setdefault(key(user), []), position)
+
+    def _load(self, path: str) -> None:
+        """Read the snapshot and apply the journal(s) on top. Caller holds ``self.lock``."""
+        if self._journal is None or self._journal.path != path + self.JOURNAL_SUFFIX:
+            self._journal = Journal(path + self.JOURNAL_SUFFIX)
+        with self._journal.file_lock:
+            signature = self._stat(path)
+            try:
+                data = read_json_file(path) if signature else {"users": []}
+            except Exception as e:
+                print(f"Error reading database: {e}")
+                data = {"users": []}
+            positions = {}
+            for position, user in enumerate(data.get("users", [])):
+                positions.setdefault(user.get("id"), position)
+            records = 0
+            for journal_path in (path + self.COMPACTING_SUFFIX, self._journal.path):
+                for record in Journal.read(journal_path):
+                    self._apply(data, positions, record)
+                    records += 1
+            journal_size = self._stat(self._journal.path)
+            self._journal.size = journal_size[1] if journal_size else 0
+            self._journal.torn_tail = self._journal.size > 0 and not Journal.ends_with_newline(self._journal.path)
+            self._journal.records = records
+        self._index(data)
+        self._path, self._snapshot_signature = path, signature
+        self.loads += 1
+
+    def _fresh(self) -> "JSONUserStore":
+        path = DATABASE_PATH
+        if self._journal is not None and self._is_current(path):
+            return self
+        with self.lock:
+            if self._journal is None or not self._is_current(path):
+                self._load(path)
+        return self
+
+    def _commit(self, record: Dict[str, Any]) -> bool:
+        """Apply a change in memory, journal it and wait for the fsync. Caller holds ``self.lock``."""
+        position = self._apply(self._data, self._positions, record)
+        if position is not None:
+            self._reindex(position)
+            if record["op"] == "add_flight":
+                self._index_new_flight(position)
+            if self._window_index is not None:
+                self._window_index.set_user(position, self._data["users"][position])
+        future = self._journal.append(record)
+        self.lock.release()
+        try:
+            future.result()
+        except OSError:
+            # memory is ahead of the disk now; reload from what was actually written
+            with self.lock:
+                self._snapshot_signature = None
+            return False
+        finally:
+            self.lock.acquire()
+        if self._journal.records >= self.COMPACT_RECORDS and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="user-db-compaction", daemon=True).start()
+        return True
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot"""
+        try:
+            with self._snapshot_lock:
+                with self.lock:
+                    self._fresh()
+                    path = self._path
+                    compacting_path = path + self.COMPACTING_SUFFIX
+                    # Left over from an interrupted compaction, its records are in memory
+                    # as well; keep it until the snapshot below includes them
+                    if not os.path.exists(compacting_path):
+                        self._journal.rotate(compacting_path)
+                    snapshot = dict(self._data)
+                    snapshot["users"] = list(self._data["users"])
+                # Writers carry on meanwhile; their records go to the new journal
+                _write_snapshot(path, snapshot)
+                with self.lock:
+                    if path == self._path:
+                        self._snapshot_signature = self._stat(path)
+                    os.remove(compacting_path)
+            self.compactions += 1
+        except OSError as e:
+            print(f"Error compacting database: {e}")
+        finally:
+            self._compacting = False
+
+    def read_all(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._fresh()._data)
+
+    def write_all(self, data: Dict[str, Any]) -> bool:
+        with self._snapshot_lock, self.lock:
+            self._fresh()
+            path = self._path
+            try:
+                with self._journal.file_lock:
+                    _write_snapshot(path, data)
+                    for journal_path in (path + self.COMPACTING_SUFFIX, self._journal.path):
+                        if os.path.exists(journal_path):
+                            os.remove(journal_path)
+                    self._journal.size = self._journal.records = 0
+            except OSError as e:
+                print(f"Error writing to database: {e}")
+                return False
+            self._index(copy.deepcopy(data))
+            self._snapshot_signature = self._stat(path)
+            return True
+
+    def users(self) -> List[User]:
+        return list(self._fresh()._users)
+
+    def by_id(self, user_id: int) -> Optional[User]:
+        store = self._fresh()
+        position = store._positions.get(user_id)
+        return store._users[position] if position is not None else None
+
+    def by_name(self, first_name: str, last_name: str = None) -> Optional[User]:
+        store = self._fresh()
+        if last_name is None:
+            positions = store._by_first_name.get(normalize_name(first_name))
+        else:
+            positions = store._by_full_name.get((normalize_name(first_name), normalize_name(last_name)))
+        return store._users[positions[0]] if positions else None
+
+    def upcoming_flights(self, user_id: int, now: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        store = self._fresh()
+        position = store._positions.get(user_id)
+        if position is None:
+            return []
+        with self.lock:
+            departures, ordered = self._flight_index(position)
+        upcoming = []
+        for flight in ordered[bisect.bisect_left(departures, now):]:
+            if flight.get("status") != "cancelled":
+                upcoming.append(flight)
+                if limit is not None and len(upcoming) >= limit:
+                    break
+        return upcoming
+
+    def flights_in_window(self, start: str, end: str, airport: Optional[str] = None,
+                          event: str = "departure") -> List[Dict[str, Any]]:
+        self._fresh()
+        with self.lock:
+            if self._window_index is None:
+                index = FlightWindowIndex()
+                for position, user in enumerate(self._data["users"]):
+                    index.set_user(position, user)
+                self._window_index = index
+            return self._window_index.window(start, end, airport, event)
+
+    def add_user(self, user_data: Dict[str, Any]) -> bool:
+        with self.lock:
+            self._fresh()
+            # Generate a new ID if not provided
+            if "id" not in user_data:
+                user_data["id"] = self._max_id + 1
+            if user_data["id"] in self._positions:
+                return False
+            return self._commit({"op": "add_user", "user": copy.deepcopy(user_data)})
+
+    def update_user(self, user_id: int, updated_data: Dict[str, Any]) -> bool:
+        with self.lock:
+            if user_id not in self._fresh()._positions:
+                return False
+            return self._commit({"op": "update_user", "user_id": user_id, "changes": copy.deepcopy(updated_data)})
+
+    def add_flight(self, user_id: int, flight: Dict[str, Any]) -> bool:
+        with self.lock:
+            position = self._fresh()._positions.get(user_id)
+            if position is None:
+                return False
+            if flight.get("id") is None:
+                flight["id"] = _next_id(self._data["users"][position].get("flights") or [])
+            return self._commit({"op": "add_flight", "user_id": user_id, "flight": copy.deepcopy(flight)})
+
+    def cancel_flight(self, user_id: int, flight_id: int) -> bool:
+        with self.lock:
+            position = self._fresh()._positions.get(user_id)
+            if position is None:
+                return False
+            flights = self._data["users"][position].get("flights") or []
+            if not any(flight.get("id") == flight_id for flight in flights):
+                return False
+            return self._commit({"op": "cancel_flight", "user_id": user_id, "flight_id": flight_id})
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    first_name_key TEXT NOT NULL DEFAULT '',
+    last_name_key TEXT NOT NULL DEFAULT '',
+    preferred_departure_city TEXT,
+    preferred_departure_country TEXT,
+    profile TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_name ON users (first_name_key, last_name_key);
+CREATE TABLE IF NOT EXISTS flights (
+    row_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    flight_id INTEGER,
+    status TEXT,
+    booking_date TEXT,
+    departure_time TEXT,
+    departure_airport TEXT,
+    arrival_airport TEXT,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flights_user ON flights (user_id, flight_id);
+CREATE INDEX IF NOT EXISTS flights_user_departure ON flights (user_id, departure_time);
+CREATE INDEX IF NOT EXISTS flights_departure ON flights (departure_time);
+CREATE INDEX IF NOT EXISTS flights_status ON flights (status, departure_time);
+CREATE TABLE IF NOT EXISTS flight_segments (
+    flight_row_id INTEGER NOT NULL REFERENCES flights (row_id) ON DELETE CASCADE,
+    departure_airport TEXT,
+    departure_time TEXT,
+    arrival_airport TEXT,
+    arrival_time TEXT,
+    flight_number TEXT
+);
+CREATE INDEX IF NOT EXISTS flight_segments_flight ON flight_segments (flight_row_id);
+CREATE INDEX IF NOT EXISTS flight_segments_departure ON flight_segments (departure_time);
+CREATE INDEX IF NOT EXISTS flight_segments_departure_airport ON flight_segments (departure_airport, departure_time);
+CREATE INDEX IF NOT EXISTS flight_segments_arrival ON flight_segments (arrival_time);
+CREATE INDEX IF NOT EXISTS flight_segments_arrival_airport ON flight_segments (arrival_airport, arrival_time);
+"""
+# Bumped with PRAGMA user_version when existing databases need a backfill
+SQLITE_SCHEMA_VERSION = 1
+
+def _flight_columns(flight: Dict[str, Any]) -> Tuple[Any, ...]:
+    """(flight_id, status, booking_date, departure_time, departure_airport, arrival_airport) of a booking.
+
+    Handles both the simplified layout written by add_flight_to_user and the
+    full Amadeus offer kept under ``flightDetails`` by older bookings.
+    """
+    outbound = flight.get("outboundFlight")
+    if outbound:
+        departure = (outbound.get("departureTime"), outbound.get("departureAirport"), outbound.get("arrivalAirport"))
+    else:
+        try:
+            segments = flight["flightDetails"]["itineraries"][0]["segments"]
+            departure = (segments[0]["departure"].get("at"), segments[0]["departure"].get("iataCode"),
+                         segments[-1]["arrival"].get("iataCode"))
+        except (KeyError, IndexError, TypeError):
+            departure = (None, None, None)
+    return (flight.get("id"), flight.get("status"), flight.get("bookingDate")) + departure
+
+def flight_departure_time(flight: Dict[str, Any]) -> Optional[str]:
+    """ISO departure time of a booking's outbound flight, in either booking layout."""
+    return _flight_columns(flight)[3]
+
+def flight_summary(flight: Dict[str, Any]) -> Dict[str, Any]:
+    """Departure time, airports and flight number of a booking's outbound flight."""
+    _, _, _, departure_time, departure_airport, arrival_airport = _flight_columns(flight)
+    outbound = flight.get("outboundFlight") or {}
+    flight_number = outbound.get("flightNumber")
+    if not flight_number:
+        try:
+            segment = flight["flightDetails"]["itineraries"][0]["segments"][0]
+            flight_number = f"{segment.get('carrierCode', '')}{segment.get('number', '')}" or None
+        except (KeyError, IndexError, TypeError):
+            flight_number = None
+    return {
+        "departureTime": departure_time,
+        "departureAirport": departure_airport,
+        "arrivalAirport": arrival_airport,
+        "flightNumber": flight_number,
+    }
+
+def flight_segments(flight: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every flight of a booking (outbound and return, or each itinerary segment), in either booking layout."""
+    segments = []
+    if "outboundFlight" in flight:
+        for leg in (flight.get("outboundFlight"), flight.get("returnFlight")):
+            if leg:
+                segments.append({
+                    "departureAirport": leg.get("departureAirport"),
+                    "departureTime": leg.get("departureTime"),
+                    "arrivalAirport": leg.get("arrivalAirport"),
+                    "arrivalTime": leg.get("arrivalTime"),
+                    "flightNumber": leg.get("flightNumber"),
+                })
+        return segments
     try:
-        write_json_to_file(DATABASE_PATH, data)
-    except Exception as e:
-        print(f"Error writing to database: {e}")
+        itineraries = flight["flightDetails"]["itineraries"]
+    except (KeyError, TypeError):
+        return segments
+    for itinerary in itineraries:
+        for segment in itinerary.get("segments", []):
+            departure, arrival = segment.get("departure", {}), segment.get("arrival", {})
+            segments.append({
+                "departureAirport": departure.get("iataCode"),
+                "departureTime": departure.get("at"),
+                "arrivalAirport": arrival.get("iataCode"),
+                "arrivalTime": arrival.get("at"),
+                "flightNumber": f"{segment.get('carrierCode', '')}{segment.get('number', '')}" or None,
+            })
+    return segments
+
+FLIGHT_EVENTS = ("departure", "arrival")
+
+class FlightWindowIndex:
+    """Every booked flight segment, sorted by departure and by arrival time.
+
+    For each event there is one sorted ``(time, seq)`` list per airport and
+    one across all airports, so "what departs LHR in the next 6 hours" is two
+    bisects plus the matches. A user's entries are replaced whenever their
+    bookings change; cancelled bookings are left out. Times are compared as
+    stored, which for Amadeus data is the airport's local time.
+    """
+
+    def __init__(self):
+        self._seq = 0
+        # seq -> segment with its booking's userId, flightId and status
+        self._segments = {}
+        # user key -> seqs of that user's segments
+        self._by_user = {}
+        # event -> airport (None for every airport) -> sorted [(time, seq)]
+        self._times = {event: {} for event in FLIGHT_EVENTS}
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def _keys(self, segment: Dict[str, Any], event: str) -> List[Tuple[Optional[str], str]]:
+        time_ = segment[f"{event}Time"]
+        if not time_:
+            return []
+        airport = segment[f"{event}Airport"]
+        return [(key, time_) for key in ({None, airport} if airport else {None})]
+
+    def remove_user(self, user_key: Any) -> None:
+        for seq in self._by_user.pop(user_key, []):
+            segment = self._segments.pop(seq)
+            for event in FLIGHT_EVENTS:
+                for airport, time_ in self._keys(segment, event):
+                    times = self._times[event][airport]
+                    at = bisect.bisect_left(times, (time_, seq))
+                    if at < len(times) and times[at] == (time_, seq):
+                        del times[at]
+
+    def set_user(self, user_key: Any, user: Dict[str, Any]) -> None:
+        """Replace the segments indexed for one user with those of their current bookings"""
+        self.remove_user(user_key)
+        seqs = []
+        for flight in user.get("flights") or []:
+            if flight.get("status") == "cancelled":
+                continue
+            for segment in flight_segments(flight):
+                self._seq += 1
+                segment.update(userId=user.get("id"), flightId=flight.get("id"), status=flight.get("status"))
+                self._segments[self._seq] = segment
+                for event in FLIGHT_EVENTS:
+                    for airport, time_ in self._keys(segment, event):
+                        bisect.insort(self._times[event].setdefault(airport, []), (time_, self._seq))
+                seqs.append(self._seq)
+        if seqs:
+            self._by_user[user_key] = seqs
+
+    def window(self, start: str, end: str, airport: Optional[str] = None,
+               event: str = "departure") -> List[Dict[str, Any]]:
+        """Segments whose ``event`` time is in [start, end), at ``airport`` if given, in time order"""
+        times = self._times[event].get(airport, [])
+        low, high = bisect.bisect_left(times, (start,)), bisect.bisect_left(times, (end,))
+        return [dict(self._segments[seq]) for _, seq in times[low:high]]
+
+class SQLiteUserStore:
+    """Users and their bookings in normalized SQLite tables.
+
+    WAL mode lets readers on other threads and processes run while a booking
+    is written. Each thread gets its own connection. Name lookups use the
+    normalized name columns; the full user record is kept as JSON in
+    ``profile`` and each booking as JSON in ``details``. ``flight_segments``
+    has one row per flight of every booking that isn't cancelled, for
+    departure and arrival window queries across all users.
+    """
+
+    def __init__(self, path: str = SQLITE_DATABASE_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SQLITE_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SQLITE_SCHEMA_VERSION:
+            self._write(self._upgrade)
+
+    @classmethod
+    def _upgrade(cls, conn: sqlite3.Connection) -> bool:
+        """Fill flight_segments for bookings written before the table existed"""
+        conn.execute("DELETE FROM flight_segments")
+        for row_id, details in conn.execute("SELECT row_id, details FROM flights").fetchall():
+            cls._insert_segments(conn, row_id, json.loads(details))
+        conn.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+        return True
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; writers open their own IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn) -> bool:
+        """Run ``fn(conn)`` in one write transaction"""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        except sqlite3.Error as e:
+            print(f"Error writing to database: {e}")
+            return False
+
+    def _load(self, conn: sqlite3.Connection, rows: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        """User records for ``(id, profile)`` rows, with their bookings"""
+        users = {}
+        for user_id, profile in rows:
+            users[user_id] = json.loads(profile)
+        if not users:
+            return []
+        if len(users) == 1:
+            flights = conn.execute(
+                "SELECT user_id, details FROM flights WHERE user_id = ? ORDER BY row_id", tuple(users)
+            )
+        else:
+            flights = conn.execute("SELECT user_id, details FROM flights ORDER BY row_id")
+        for user_id, details in flights:
+            user = users.get(user_id)
+            if user is not None:
+                user.setdefault("flights", []).append(json.loads(details))
+        return list(users.values())
+
+    @staticmethod
+    def _insert_user(conn: sqlite3.Connection, user: Dict[str, Any]) -> None:
+        profile = {key: value for key, value in user.items() if key != "flights"}
+        name = user.get("name") or {}
+        conn.execute(
+            "INSERT OR IGNORE INTO users (id, first_name_key, last_name_key, preferred_departure_city, "
+            "preferred_departure_country, profile) VALUES (?, ?, ?, ?, ?, ?)",
+            (user.get("id"), normalize_name(name.get("firstName")), normalize_name(name.get("lastName")),
+             user.get("preferredDepartureCity"), user.get("preferredDepartureCountry"), json.dumps(profile))
+        )
+        for flight in user.get("flights") or []:
+            SQLiteUserStore._insert_flight(conn, user.get("id"), flight)
+
+    @staticmethod
+    def _insert_flight(conn: sqlite3.Connection, user_id: int, flight: Dict[str, Any]) -> None:
+        row_id = conn.execute(
+            "INSERT INTO flights (user_id, flight_id, status, booking_date, departure_time, departure_airport, "
+            "arrival_airport, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id,) + _flight_columns(flight) + (json.dumps(flight),)
+        ).lastrowid
+        SQLiteUserStore._insert_segments(conn, row_id, flight)
+
+    @staticmethod
+    def _insert_segments(conn: sqlite3.Connection, row_id: int, flight: Dict[str, Any]) -> None:
+        if flight.get("status") == "cancelled":
+            return
+        conn.executemany(
+            "INSERT INTO flight_segments (flight_row_id, departure_airport, departure_time, arrival_airport, "
+            "arrival_time, flight_number) VALUES (?, ?, ?, ?, ?, ?)",
+            [(row_id, segment["departureAirport"], segment["departureTime"], segment["arrivalAirport"],
+              segment["arrivalTime"], segment["flightNumber"]) for segment in flight_segments(flight)]
+        )
+
+    def read_all(self) -> Dict[str, Any]:
+        conn = self._conn()
+        return {"users": self._load(conn, conn.execute("SELECT id, profile FROM users ORDER BY id").fetchall())}
+
+    def write_all(self, data: Dict[str, Any]) -> bool:
+        def replace(conn):
+            conn.execute("DELETE FROM flights")
+            conn.execute("DELETE FROM users")
+            for user in data.get("users", []):
+                self._insert_user(conn, user)
+            return True
+        return self._write(replace)
+
+    def users(self) -> List[User]:
+        return [User(user) for user in self.read_all()["users"]]
+
+    def by_id(self, user_id: int) -> Optional[User]:
+        conn = self._conn()
+        users = self._load(conn, conn.execute("SELECT id, profile FROM users WHERE id = ?", (user_id,)).fetchall())
+        return User(users[0]) if users else None
+
+    def by_name(self, first_name: str, last_name: str = None) -> Optional[User]:
+        conn = self._conn()
+        if last_name is None:
+            row = conn.execute("SELECT id, profile FROM users WHERE first_name_key = ? ORDER BY id LIMIT 1",
+                               (normalize_name(first_name),)).fetchone()
+        else:
+            row = conn.execute("SELECT id, profile FROM users WHERE first_name_key = ? AND last_name_key = ? "
+                               "ORDER BY id LIMIT 1", (normalize_name(first_name), normalize_name(last_name))).fetchone()
+        users = self._load(conn, [row]) if row else []
+        return User(users[0]) if users else None
+
+    def upcoming_flights(self, user_id: int, now: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT details FROM flights WHERE user_id = ? AND departure_time >= ? "
+            "AND COALESCE(status, '') != 'cancelled' ORDER BY departure_time, row_id LIMIT ?",
+            (user_id, now, -1 if limit is None else limit)
+        )
+        return [json.loads(details) for details, in rows]
+
+    def flights_in_window(self, start: str, end: str, airport: Optional[str] = None,
+                          event: str = "departure") -> List[Dict[str, Any]]:
+        if event not in FLIGHT_EVENTS:
+            # interpolated into the query below
+            raise ValueError(f"event must be one of {FLIGHT_EVENTS}, not {event!r}")
+        query = (
+            "SELECT s.departure_airport, s.departure_time, s.arrival_airport, s.arrival_time, s.flight_number, "
+            f"f.user_id, f.flight_id, f.status FROM flight_segments s JOIN flights f ON f.row_id = s.flight_row_id "
+            f"WHERE s.{event}_time >= ? AND s.{event}_time < ?"
+        )
+        params = [start, end]
+        if airport is not None:
+            query += f" AND s.{event}_airport = ?"
+            params.append(airport)
+        rows = self._conn().execute(query + f" ORDER BY s.{event}_time, s.rowid", params)
+        keys = ("departureAirport", "departureTime", "arrivalAirport", "arrivalTime", "flightNumber",
+                "userId", "flightId", "status")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def add_user(self, user_data: Dict[str, Any]) -> bool:
+        def add(conn):
+            if "id" not in user_data:
+                user_data["id"] = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+            self._insert_user(conn, user_data)
+            return True
+        return self._write(add)
+
+    def update_user(self, user_id: int, updated_data: Dict[str, Any]) -> bool:
+        def update(conn):
+            users = self._load(conn, conn.execute("SELECT id, profile FROM users WHERE id = ?", (user_id,)).fetchall())
+            if not users:
+                return False
+            user = users[0]
+            _merge_user(user, updated_data)
+            if "flights" in updated_data:
+                conn.execute("DELETE FROM flights WHERE user_id = ?", (user_id,))
+            else:
+                user.pop("flights", None)
+            profile = {key: value for key, value in user.items() if key != "flights"}
+            name = user.get("name") or {}
+            conn.execute(
+                "UPDATE users SET first_name_key = ?, last_name_key = ?, preferred_departure_city = ?, "
+                "preferred_departure_country = ?, profile = ? WHERE id = ?",
+                (normalize_name(name.get("firstName")), normalize_name(name.get("lastName")),
+                 user.get("preferredDepartureCity"), user.get("preferredDepartureCountry"), json.dumps(profile), user_id)
+            )
+            for flight in user.get("flights") or []:
+                self._insert_flight(conn, user_id, flight)
+            return True
+        return self._write(update)
+
+    def add_flight(self, user_id: int, flight: Dict[str, Any]) -> bool:
+        def add(conn):
+            if conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is None:
+                return False
+            if flight.get("id") is None:
+                flight["id"] = conn.execute(
+                    "SELECT COALESCE(MAX(flight_id), 0) + 1 FROM flights WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+            self._insert_flight(conn, user_id, flight)
+            return True
+        return self._write(add)
+
+    def cancel_flight(self, user_id: int, flight_id: int) -> bool:
+        def cancel(conn):
+            row = conn.execute("SELECT row_id, details FROM flights WHERE user_id = ? AND flight_id = ?",
+                               (user_id, flight_id)).fetchone()
+            if row is None:
+                return False
+            row_id, details = row
+            flight = json.loads(details)
+            flight["status"] = "cancelled"
+            conn.execute("UPDATE flights SET status = 'cancelled', details = ? WHERE row_id = ?",
+                         (json.dumps(flight), row_id))
+            conn.execute("DELETE FROM flight_segments WHERE flight_row_id = ?", (row_id,))
+            return True
+        return self._write(cancel)
+
+def migrate_json_to_sqlite(json_path: str = DATABASE_PATH, sqlite_path: str = SQLITE_DATABASE_PATH,
+                           force: bool = False) -> int:
+    """Copy every user and booking from the JSON database into SQLite; returns the number of users.
+
+    Does nothing if the SQLite database already has users, unless ``force`` is set.
+    """
+    store = SQLiteUserStore(sqlite_path)
+    existing = store._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    if existing and not force:
+        print(f"{sqlite_path} already has {existing} users, not migrating")
+        return 0
+    data = read_json_file(json_path)
+    if not store.write_all(data):
+        return 0
+    return len(data.get("users", []))
+
+_store = SQLiteUserStore(SQLITE_DATABASE_PATH) if DATABASE_BACKEND == "sqlite" else JSONUserStore()
+
+def read_database() -> Dict[str, Any]:
+    """Read the database (a copy the caller may modify)."""
+    return _store.read_all()
+
+def write_database(data: Dict[str, Any]) -> bool:
+    """Write data to the database file."""
+    return _store.write_all(data)
 
 def get_users() -> List[User]:
     """Get all users from the database."""
-    db = read_database()
-    return [User(user_data) for user_data in db.get("users", [])]
+    return _store.users()
 
 def get_user_by_id(user_id: int) -> Optional[User]:
     """Get a user by their ID."""
-    users = get_users()
-    for user in users:
-        if user.id == user_id:
-            return user
-    return None
+    return _store.by_id(user_id)
 
 def get_user_by_name(first_name: str, last_name: str = None) -> Optional[User]:
-    """Get a user by their name."""
-    users = get_users()
-    for user in users:
-        if user.first_name == first_name:
-            if last_name is None or user.last_name == last_name:
-                return user
-    return None
+    """Get a user by their name (case-insensitive)."""
+    return _store.by_name(first_name, last_name)
 
 def get_preferred_departure_city(user_id: int) -> Optional[str]:
     """Get the preferred departure city for a user."""
     user = get_user_by_id(user_id)
     return user.preferred_departure_city if user else None
 
+def get_preferred_departure_cities() -> List[str]:
+    """Get every user's preferred departure city, most common first."""
+    counts = Counter(user.preferred_departure_city for user in get_users() if user.preferred_departure_city)
+    return [city for city, _ in counts.most_common()]
+
 def get_preferred_departure_country(user_id: int) -> Optional[str]:
     """Get the preferred departure country for a user."""
     user = get_user_by_id(user_id)
     return user.preferred_departure_country if user else None
 
+def get_upcoming_flights(user_id: int, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Get a user's bookings departing from now on, soonest first (cancelled ones excluded)."""
+    now = (now or datetime.now()).isoformat(timespec="seconds")
+    return _store.upcoming_flights(user_id, now, limit)
+
+def get_next_flight(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user's next upcoming booking."""
+    flights = get_upcoming_flights(user_id, limit=1)
+    return flights[0] if flights else None
+
+def get_flights_in_window(hours: float = 24, airport: Optional[str] = None, event: str = "departure",
+                          start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Get every booked flight departing (or with event="arrival", arriving) in the next ``hours``.
+
+    Optionally only at one airport. Each result is a flight segment with the
+    userId, flightId and status of its booking, in time order; cancelled
+    bookings are excluded.
+    """
+    if event not in FLIGHT_EVENTS:
+        raise ValueError(f"event must be one of {FLIGHT_EVENTS}, not {event!r}")
+    start = start or datetime.now()
+    end = start + timedelta(hours=hours)
+    return _store.flights_in_window(start.isoformat(timespec="seconds"), end.isoformat(timespec="seconds"),
+                                    airport.upper() if airport else None, event)
+
+def cancel_flight(user_id: int, flight_id: int) -> bool:
+    """Mark one of a user's bookings as cancelled."""
+    return _store.cancel_flight(user_id, flight_id)
+
 def add_user(user_data: Dict[str, Any]) -> bool:
     """Add a new user to the database."""
-    db = read_database()
-    users = db.get("users", [])
-    
-    # Generate a new ID if not provided
-    if "id" not in user_data:
-        max_id = 0
-        for user in users:
-            if user.get("id", 0) > max_id:
-                max_id = user.get("id")
-        user_data["id"] = max_id + 1
-    
-    users.append(user_data)
-    db["users"] = users
-    write_database(db)
-    return True
+    return _store.add_user(user_data)
 
 def update_user(user_id: int, updated_data: Dict[str, Any]) -> bool:
     """Update an existing user in the database."""
-    db = read_database()
-    users = db.get("users", [])
-    
-    for i, user in enumerate(users):
-        if user.get("id") == user_id:
-            # Update only the fields provided in updated_data
-            for key, value in updated_data.items():
-                if key == "name" and isinstance(value, dict):
-                    # Handle nested name object
-                    if "name" not in user:
-                        user["name"] = {}
-                    for name_key, name_value in value.items():
-                        user["name"][name_key] = name_value
-                else:
-                    user[key] = value
-            
-            db["users"] = users
-            write_database(db)
-            return True
-    
-    return False
+    return _store.update_user(user_id, updated_data)
 
 def add_flight_to_user(user_id: int, flight_data: Dict[str, Any]) -> bool:
     """Add a flight booking to a user's record.
     
     Args:
         user_id: The ID of the user
-        flight_data: Dictionary containing flight booking details
+        flight_data: Dictionary containing flight booking details; its flightDetails
+            is a FlightOffer or the offer as Amadeus returned it
         
     Returns:
         bool: True if successful, False otherwise
     """
-    user = get_user_by_id(user_id)
-    if not user:
-        return False
-    
-     user_dict = user.to_dict()
-    
-    # Initialize flights array if it doesn't exist
-    if "flights" not in user_dict:
-        user_dict["flights"] = []
+    offer = flight_data.get("flightDetails") or {}
+    if not isinstance(offer, FlightOffer):
+        offer = FlightOffer.from_json(offer)
     
     # Extract and simplify the important flight information
     simplified_flight = {
@@ -138,68 +1055,54 @@ def add_flight_to_user(user_id: int, flight_data: Dict[str, Any]) -> bool:
         "bookingDate": flight_data.get("bookingDate"),
         "status": flight_data.get("status", "confirmed"),
         "totalPrice": {
-            "amount": flight_data.get("flightDetails", {}).get("price", {}).get("total"),
-            "currency": flight_data.get("flightDetails", {}).get("price", {}).get("currency", "USD")
+            "amount": None if offer.total is None else str(offer.total),
+            "currency": offer.currency
         },
-        "outboundFlight": _extract_flight_segment(flight_data, 0, 0),  # First segment of outbound journey
+        "outboundFlight": _extract_flight_segment(offer.outbound),  # First segment of outbound journey
         "returnFlight": None,  # Will be populated if it's a round trip
-        "airline": flight_data.get("flightDetails", {}).get("validatingAirlineCodes", [""])[0],
+        "airline": offer.airline,
         "tripType": "ONE_WAY"
     }
     
     # Check if it's a round trip (has more than one itinerary)
-    itineraries = flight_data.get("flightDetails", {}).get("itineraries", [])
-    if len(itineraries) > 1:
-        simplified_flight["returnFlight"] = _extract_flight_segment(flight_data, 1, 0)  # First segment of return journey
+    if offer.inbound is not None:
+        simplified_flight["returnFlight"] = _extract_flight_segment(offer.inbound)  # First segment of return journey
         simplified_flight["tripType"] = "ROUND_TRIP"
     
-    # Generate flight ID if not provided
-    if simplified_flight["id"] is None:
-        max_id = 0
-        for flight in user_dict["flights"]:
-            if flight.get("id", 0) > max_id:
-                max_id = flight.get("id")
-        simplified_flight["id"] = max_id + 1
-    
-    # Add the simplified flight to the user's flights
-    user_dict["flights"].append(simplified_flight)
-    
-    # Update the user in the database
-    return update_user(user_id, user_dict)
+    # Add the simplified flight to the user's flights; a flight ID is generated if not provided
+    return _store.add_flight(user_id, simplified_flight)
 
-def _extract_flight_segment(flight_data: Dict[str, Any], itinerary_index: int, segment_index: int) -> Dict[str, Any]:
-    """Extract the important information from a flight segment.
+def _extract_flight_segment(itinerary: Optional[Itinerary]) -> Optional[Dict[str, Any]]:
+    """Extract the important information from the first segment of a journey.
     
     Args:
-        flight_data: The complete flight data
-        itinerary_index: Index of the itinerary (0 for outbound, 1 for return)
-        segment_index: Index of the segment within the itinerary
+        itinerary: The outbound or return journey of the booked offer
         
     Returns:
-        Dict containing simplified flight segment information
+        Dict containing simplified flight segment information, None if there is no such journey
     """
-    try:
-        itineraries = flight_data.get("flightDetails", {}).get("itineraries", [])
-        if itinerary_index >= len(itineraries):
-            return None
-            
-        segments = itineraries[itinerary_index].get("segments", [])
-        if segment_index >= len(segments):
-            return None
-            
-        segment = segments[segment_index]
-        
-        return {
-            "departureAirport": segment.get("departure", {}).get("iataCode"),
-            "departureTerminal": segment.get("departure", {}).get("terminal"),
-            "departureTime": segment.get("departure", {}).get("at"),
-            "arrivalAirport": segment.get("arrival", {}).get("iataCode"),
-            "arrivalTerminal": segment.get("arrival", {}).get("terminal"),
-            "arrivalTime": segment.get("arrival", {}).get("at"),
-            "flightNumber": f"{segment.get('carrierCode')}{segment.get('number')}",
-            "duration": segment.get("duration"),
-            "stops": segment.get("numberOfStops", 0)
-        }
-    except Exception as e:
-        print(f"Error extracting flight segment: {e}")
-        return {}
\ No newline at end of file
+    if itinerary is None or not itinerary.segments:
+        return None
+    segment = itinerary.segments[0]
+    return {
+        "departureAirport": segment.departure_airport,
+        "departureTerminal": segment.departure_terminal,
+        "departureTime": segment.departure_at and segment.departure_at.isoformat(),
+        "arrivalAirport": segment.arrival_airport,
+        "arrivalTerminal": segment.arrival_terminal,
+        "arrivalTime": segment.arrival_at and segment.arrival_at.isoformat(),
+        "flightNumber": segment.flight_number,
+        "duration": segment.duration,
+        "stops": segment.stops
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="User database maintenance")
+    parser.add_argument("command", choices=["migrate"], help="migrate: copy the JSON database into SQLite")
+    parser.add_argument("--json", default=DATABASE_PATH)
+    parser.add_argument("--sqlite", default=SQLITE_DATABASE_PATH)
+    parser.add_argument("--force", action="store_true", help="replace users already in the SQLite database")
+    args = parser.parse_args()
+    print(f"Migrated {migrate_json_to_sqlite(args.json, args.sqlite, args.force)} users to {args.sqlite}")
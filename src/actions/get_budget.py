@@ -14,13 +14,13 @@ class ActionGetTravelBudget(Action):
     def name(self) -> Text:
         return "action_get_travel_budget"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         print("Getting travel budget...")
         ynab_service = YNABService()
-        budget_info = ynab_service.get_travel_budget()
+        budget_info = await ynab_service.get_travel_budget_async()
         
         if not budget_info:
             dispatcher.utter_message(text="Sorry, I couldn't access your budget information. Please check your configuration.")
@@ -7,7 +7,27 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 
+from services.destination_snapshot import destination_snapshot
+from services.flight_models import Destination
 from services.flight_service import FlightService
+from services.result_store import ResultPages, result_store
+from actions.db import get_preferred_departure_cities
+
+def start_destination_refresh() -> bool:
+    """Keep the cheapest destinations searched, and the same from the users' home cities, precomputed.
+
+    Called once when the action server loads the actions; does nothing
+    unless DESTINATION_SNAPSHOT=1. Returns whether the refresh runs.
+    """
+    flight_service = FlightService()
+
+    def preferred_origins() -> List[str]:
+        """IATA codes of the users' preferred departure cities"""
+        codes = (flight_service.get_location_iata(city) for city in get_preferred_departure_cities())
+        return [code for code in codes if code]
+
+    return destination_snapshot.start(preferred_origins, flight_service.fetch_destinations_snapshot)
+
 
 class ActionGetDestinations(Action):
     def __init__(self):
@@ -16,7 +36,7 @@ class ActionGetDestinations(Action):
     def name(self) -> Text:
         return "action_get_destinations"
     
-    def run(self, dispatcher, tracker, domain) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher, tracker, domain) -> List[Dict[Text, Any]]:
         # Get user-provided slots
         departure = tracker.get_slot("departure_city")
         destination = tracker.get_slot("destination")
@@ -26,7 +46,7 @@ class ActionGetDestinations(Action):
         departure_date = tracker.get_slot("travel_timeframe")
 
         # Search for flights
-        result = self.flight_service.search_flights(
+        result = await self.flight_service.search_flights_async(
             departure=departure,
             destination=destination,
             duration=duration,
@@ -39,9 +59,11 @@ class ActionGetDestinations(Action):
             dispatcher.utter_message(text=result["message"] or "I couldn't find any flights matching your criteria. Would you like to adjust your preferences?")
             return [SlotSet("success", "failure")]
         
-        # Store flight suggestions but don't display them yet
+        # Store flight suggestions but don't display them yet; the slot only holds their handle.
+        # Flight destinations come in one response, so there is nothing more to fetch later.
+        destinations = ResultPages(Destination.from_response(result["data"]))
         return [
-            SlotSet("flight_suggestions", result["data"]), 
+            SlotSet("flight_suggestions", result_store.put("flight-destinations", destinations)), 
             SlotSet("return_value", "success")
         ]
 
@@ -56,23 +78,23 @@ class ActionDisplayDestinations(Action):
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        # Get flight suggestions from slot
-        flight_suggestions = tracker.get_slot("flight_suggestions")
+        # Get flight suggestions from the result store (None once they have expired)
+        pages = result_store.get(tracker.get_slot("flight_suggestions"))
         
-        if not flight_suggestions:
+        if not pages:
             dispatcher.utter_message(text="I don't have any flight suggestions to show you. Let's search for flights first.")
             return [SlotSet("return_value", "failure")]
         
         # Handle different numbers of suggestions
-        total_suggestions = len(flight_suggestions)
+        total_suggestions = len(pages.items)
         
         if total_suggestions == 0:
             dispatcher.utter_message(text="I couldn't find any flight suggestions for your criteria.")
             return [SlotSet("return_value", "failure")]
         
-        # Format and display flight suggestions (up to 3)
-        display_count = min(3, total_suggestions)
-        response_message = self.flight_service.format_flight_suggestions(flight_suggestions, 0, display_count)
+        # Format and display the first page of flight suggestions
+        display_count = len(pages.page(0))
+        response_message = pages.render(0, self.flight_service.format_suggestions_page)
         
         # Add selection prompt
         if total_suggestions == 1:
@@ -92,8 +114,8 @@ class ActionDisplayDestinations(Action):
                     "payload": f"/SetSlots(destination_index={i})"
                 })
             
-            # Add "See More" button if there are more than 3 suggestions
-            if total_suggestions > 3:
+            # Add "See More" button if there is another page
+            if pages.has_page(1):
                 buttons.append({
                     "title": "See More Options",
                     "payload": "/SetSlots(destination_index=see_more)"
@@ -113,25 +135,25 @@ class ActionShowMoreDestinations(Action):
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
-        destinations = tracker.get_slot("flight_suggestions")
-        current_page = tracker.get_slot("current_page") or 0
+        pages = result_store.get(tracker.get_slot("flight_suggestions"))
+        current_page = int(tracker.get_slot("current_page") or 0)
         
-        if not destinations:
+        if not pages:
            # dispatcher.utter_message(text="I don't have any flight suggestions to show you. Let's search for flights first.")
             return []
         
         # Calculate next page
         next_page = current_page + 1
-        start_idx = next_page * 3
+        start_idx = pages.start(next_page)
         
         # Check if we have more results to show
-        if start_idx >= len(destinations):
+        if not pages.has_page(next_page):
             dispatcher.utter_message(text="There are no more flight suggestions available.")
             return []
             
-        # Show the next batch of flights (3 more)
-        display_count = min(3, len(destinations) - start_idx)
-        response_message = self.flight_service.format_flight_suggestions(destinations, start_idx, display_count)
+        # Show the next page of flights
+        display_count = len(pages.page(next_page))
+        response_message = pages.render(next_page, self.flight_service.format_suggestions_page)
         response_message += "\nWhich destination would you like to choose?"
         
         # Create buttons for each destination
@@ -143,8 +165,7 @@ class ActionShowMoreDestinations(Action):
             })
         
         # Add navigation buttons
-        has_more = (start_idx + display_count) < len(destinations)
-        if has_more:
+        if pages.has_page(next_page + 1):
             buttons.append({
                 "title": "See More Options",
                 "payload": "/show_more_destinations"
@@ -170,20 +191,20 @@ class ActionShowPreviousDestinations(Action):
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
-        destinations = tracker.get_slot("flight_suggestions")
-        current_page = tracker.get_slot("current_page") or 0
+        pages = result_store.get(tracker.get_slot("flight_suggestions"))
+        current_page = int(tracker.get_slot("current_page") or 0)
         
-        if not destinations or current_page <= 0:
+        if not pages or current_page <= 0:
             dispatcher.utter_message(text="There are no previous flight suggestions to show.")
             return []
         
         # Calculate previous page
         prev_page = current_page - 1
-        start_idx = prev_page * 3
+        start_idx = pages.start(prev_page)
         
-        # Show the previous batch of flights
-        display_count = min(3, len(destinations) - start_idx)
-        response_message = self.flight_service.format_flight_suggestions(destinations, start_idx, display_count)
+        # Show the previous page of flights, formatted when it was first shown
+        display_count = len(pages.page(prev_page))
+        response_message = pages.render(prev_page, self.flight_service.format_suggestions_page)
         response_message += "\nWhich destination would you like to choose?"
         
         # Create buttons for each destination
@@ -195,8 +216,7 @@ class ActionShowPreviousDestinations(Action):
             })
         
         # Add navigation buttons
-        has_more = (start_idx + display_count) < len(destinations)
-        if has_more:
+        if pages.has_page(prev_page + 1):
             buttons.append({
                 "title": "See More Options",
                 "payload": "/show_more_destinations"
@@ -219,10 +239,10 @@ class ActionSelectDestination(Action):
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
-        # Get flight suggestions from slot
-        flight_suggestions = tracker.get_slot("flight_suggestions")
+        # Get flight suggestions from the result store (None once they have expired)
+        pages = result_store.get(tracker.get_slot("flight_suggestions"))
         
-        if not flight_suggestions:
+        if not pages:
             #dispatcher.utter_message(text="I don't have any flight suggestions available. Let's search for flights first.")
             return []
         
@@ -250,8 +270,9 @@ class ActionSelectDestination(Action):
             return []
         
         # Validate index
-        if 0 <= destination_index < len(flight_suggestions):
-            selected = flight_suggestions[destination_index]
+        if 0 <= destination_index < len(pages.items):
+            # Only the few fields the booking flow needs go into the slot
+            selected = pages.items[destination_index].to_json()
 
             # Extract data from the selected destination for booking flow
             destination_code = selected.get('destination')
@@ -262,7 +283,7 @@ class ActionSelectDestination(Action):
             # Format a message about the selected destination
             message = (f"Great choice! You've selected a trip to {destination_code} from {departure_code}.\n"
                       f"Departing on {departure_date} and returning on {return_date}.\n"
-                      f"Price estimate: ${selected.get('price', {}).get('total', 'Unknown')}\n\n"
+                      f"Price estimate: ${selected['price']['total'] or 'Unknown'}\n\n"
                       f"Would you like to proceed with booking this flight?")
             
             # Create buttons for booking or going back
@@ -3,7 +3,16 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 
-from .db import read_database, User
+from services.airport_index import airport_index
+from .db import flight_summary, get_upcoming_flights, get_user_by_id
+
+
+def _describe_airport(iata_code: Text) -> Text:
+    """"City, country" for an airport code, or the code itself if it isn't in the bundled data"""
+    airport = airport_index.airport(iata_code) if iata_code else None
+    if airport:
+        return f"{airport['city']}, {airport['country']}"
+    return iata_code or "Unknown"
 
 
 class ActionCheckUserFlights(Action):
@@ -24,17 +33,11 @@ class ActionCheckUserFlights(Action):
             # This would be handled by a separate login flow
             return []
         
-        # Read the database
-        db = read_database()
-        flights = db.get("flights", [])
-        
-        # Filter flights for the specific user
-        user_flights = [flight for flight in flights if flight.get("user_id") == user_id]
+        # Upcoming bookings come from the per-user departure index, soonest first
+        user_flights = get_upcoming_flights(user_id)
         
         # Get user information for personalized greeting
-        users = db.get("users", [])
-        user_data = next((user for user in users if user.get("id") == user_id), None)
-        user = User(user_data) if user_data else None
+        user = get_user_by_id(user_id)
         
         events = []
         
@@ -46,19 +49,12 @@ class ActionCheckUserFlights(Action):
             events.append(SlotSet("flight_count", len(user_flights)))
             
             # Get the next upcoming flight
-            # Assuming flights have a 'date' field that can be compared
-            upcoming_flights = sorted(user_flights, key=lambda f: f.get('date', ''))
-            if upcoming_flights:
-                next_flight = upcoming_flights[0]
-                departure = next_flight.get("departure", {})
-                arrival = next_flight.get("arrival", {})
-                
+            next_flight = flight_summary(user_flights[0])
+            if next_flight:
                 # Store information about the next flight
-                events.append(SlotSet("next_flight_date", next_flight.get('date')))
-                events.append(SlotSet("next_flight_departure", 
-                                      f"{departure.get('city', '')}, {departure.get('country', '')}"))
-                events.append(SlotSet("next_flight_arrival", 
-                                      f"{arrival.get('city', '')}, {arrival.get('country', '')}"))
+                events.append(SlotSet("next_flight_date", (next_flight["departureTime"] or "")[:10]))
+                events.append(SlotSet("next_flight_departure", _describe_airport(next_flight["departureAirport"])))
+                events.append(SlotSet("next_flight_arrival", _describe_airport(next_flight["arrivalAirport"])))
                 
                 # Personalized greeting with subtle flight reminder
                 greeting = f"Welcome back{' ' + user.first_name if user and user.first_name else ''}! "
@@ -95,26 +91,25 @@ class ActionGetUserFlights(Action):
             dispatcher.utter_message(text="You don't have any flights booked yet. Would you like to book a new flight?")
             return []
         
-        # Read the database
-        db = read_database()
-        flights = db.get("flights", [])
+        # Upcoming bookings come from the per-user departure index, soonest first
+        user_flights = get_upcoming_flights(user_id)
         
-        # Filter flights for the specific user
-        user_flights = [flight for flight in flights if flight.get("user_id") == user_id]
+        if not user_flights:
+            dispatcher.utter_message(text="You don't have any upcoming flights. Would you like to book a new flight?")
+            return []
         
         # Format and display the flights
         dispatcher.utter_message(text=f"Here are your upcoming flights:")
         
         for i, flight in enumerate(user_flights, 1):
-            departure = flight.get("departure", {})
-            arrival = flight.get("arrival", {})
+            summary = flight_summary(flight)
             
             flight_info = (
                 f"Flight {i}:\n"
-                f"From: {departure.get('city', 'Unknown')}, {departure.get('country', 'Unknown')}\n"
-                f"To: {arrival.get('city', 'Unknown')}, {arrival.get('country', 'Unknown')}\n"
-                f"Date: {flight.get('date', 'Unknown')}\n"
-                f"Flight Number: {flight.get('flightNumber', 'Unknown')}\n"
+                f"From: {_describe_airport(summary['departureAirport'])}\n"
+                f"To: {_describe_airport(summary['arrivalAirport'])}\n"
+                f"Date: {(summary['departureTime'] or 'Unknown')[:10]}\n"
+                f"Flight Number: {summary['flightNumber'] or 'Unknown'}\n"
             )
             
             dispatcher.utter_message(text=flight_info)
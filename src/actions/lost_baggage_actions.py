@@ -2,20 +2,27 @@ from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
-import requests
 import os
 import json
 from dotenv import load_dotenv
 
+from services.circuit_breaker import get_breaker
+from services.http_client import async_http_client
+from services.rate_limiter import is_retryable
+
 load_dotenv()
 
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_CHAT_URL = f"{OPENAI_BASE_URL}/chat/completions"
+openai_breaker = get_breaker("openai", is_failure=is_retryable)
+
 class ActionProvideLostBaggageInfo(Action):
     def name(self) -> Text:
         return "action_provide_lost_baggage_info"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Get slot values
         airport = tracker.get_slot("airport")
@@ -60,13 +67,11 @@ class ActionProvideLostBaggageInfo(Action):
                 "max_tokens": 300
             }
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                data=json.dumps(payload)
+            # Fails fast while OpenAI is down, reusing the last answer for this airline/airport if any
+            response_data = await openai_breaker.call_async(
+                lambda: self._ask_openai(headers, payload),
+                key=(str(airline).lower(), str(airport).lower())
             )
-            
-            response_data = response.json()
             print(response_data)
             baggage_info = response_data["choices"][0]["message"]["content"]
             
@@ -79,3 +84,12 @@ class ActionProvideLostBaggageInfo(Action):
             dispatcher.utter_message(text=f"Error details: {str(e)}")
         
         return []
+
+    async def _ask_openai(self, headers: Dict[Text, Text], payload: Dict[Text, Any]) -> Dict[Text, Any]:
+        response = await async_http_client.post(
+            OPENAI_CHAT_URL,
+            headers=headers,
+            content=json.dumps(payload)
+        )
+        response.raise_for_status()
+        return response.json()
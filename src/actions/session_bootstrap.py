@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Text
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.db import get_preferred_departure_city
+from services.amadeus_service import AmadeusService
+from services.ynab_service import YNABService
+
+
+class ActionBootstrapSession(Action):
+    """Start of the trip flows, in place of action_get_travel_budget followed by action_get_departure_location.
+
+    Fetches the YNAB travel budget, looks up the user's preferred departure
+    city and resolves its IATA code, and fetches an Amadeus token, all at
+    once. It fills the same slots as the two actions. The IATA code and the
+    token are not slots; fetching them leaves the IATA cache and the shared
+    token warm, so the first search does not wait for them.
+    """
+
+    def name(self) -> Text:
+        return "action_bootstrap_session"
+
+    async def departure_city(self, user_id: Any, amadeus_service: AmadeusService) -> Optional[str]:
+        """The user's preferred departure city, with its IATA code resolved for the first search"""
+        loop = asyncio.get_running_loop()
+        departure_city = await loop.run_in_executor(None, get_preferred_departure_city, user_id)
+        if departure_city:
+            try:
+                await amadeus_service.get_iata_code_async(departure_city)
+            except Exception as e:
+                print(f"Error resolving {departure_city}: {e}")
+        return departure_city
+
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        user_id = tracker.get_slot("user_id")
+        amadeus_service = AmadeusService()
+
+        calls = [
+            YNABService().get_travel_budget_async(),
+            amadeus_service.get_access_token_async(),
+        ]
+        if user_id:
+            calls.append(self.departure_city(user_id, amadeus_service))
+
+        budget_info, access_token, *rest = await asyncio.gather(*calls, return_exceptions=True)
+        departure_city = rest[0] if rest else None
+        for name, value in (("budget", budget_info), ("Amadeus token", access_token),
+                            ("departure city", departure_city)):
+            if isinstance(value, Exception):
+                print(f"Error getting {name}: {value}")
+
+        events = []
+        if budget_info and not isinstance(budget_info, Exception):
+            events.append(SlotSet("travel_budget", budget_info))
+        else:
+            dispatcher.utter_message(text="Sorry, I couldn't access your budget information. Please check your configuration.")
+
+        if not user_id:
+            dispatcher.utter_message(text="I don't know who you are. Please provide your departure city.")
+        elif departure_city and not isinstance(departure_city, Exception):
+            events.append(SlotSet("departure_city", departure_city))
+        return events
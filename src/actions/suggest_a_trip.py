@@ -16,9 +16,10 @@ load_dotenv()
 # Amadeus API Credentials from environment variables
 CLIENT_ID = os.getenv("AMADEUS_CLIENT_ID")
 CLIENT_SECRET = os.getenv("AMADEUS_CLIENT_SECRET")
-AUTH_URL = os.getenv("AMADEUS_AUTH_URL", "https://test.api.amadeus.com/v1/security/oauth2/token")
-FLIGHT_SEARCH_URL = os.getenv("AMADEUS_FLIGHT_SEARCH_URL", "https://test.api.amadeus.com/v1/shopping/flight-destinations")
-AIRPORT_SEARCH_URL = os.getenv("AMADEUS_AIRPORT_SEARCH_URL", "https://test.api.amadeus.com/v1/reference-data/locations")
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+AUTH_URL = os.getenv("AMADEUS_AUTH_URL", f"{AMADEUS_BASE_URL}/v1/security/oauth2/token")
+FLIGHT_SEARCH_URL = os.getenv("AMADEUS_FLIGHT_SEARCH_URL", f"{AMADEUS_BASE_URL}/v1/shopping/flight-destinations")
+AIRPORT_SEARCH_URL = os.getenv("AMADEUS_AIRPORT_SEARCH_URL", f"{AMADEUS_BASE_URL}/v1/reference-data/locations")
 
 class ActionProcessTravelDates(Action):
     def name(self) -> Text:
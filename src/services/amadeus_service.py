@@ -1,115 +1,289 @@
 import os
+import time
 import requests
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Tuple
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, stop_before_delay
+
+from .airport_index import airport_index
+from .circuit_breaker import get_breaker
+from .http_client import HTTP_ERRORS, http_client, async_http_client
+from .iata_cache import iata_cache
+from .rate_limiter import RateLimitedError, amadeus_rate_limiter, is_retryable, parse_retry_after, wait_for_retry
+from .response_cache import normalize_params, response_cache
+from .single_flight import single_flight
+from .token_manager import OAuthTokenManager
 
 # Load environment variables
 load_dotenv()
 
+# Only upstream trouble (429/5xx/connection errors) counts towards opening the circuit
+breaker = get_breaker("amadeus", is_failure=is_retryable)
+
 class AmadeusService:
     # Amadeus API credentials and endpoints
     CLIENT_ID = os.getenv("AMADEUS_CLIENT_ID")
     CLIENT_SECRET = os.getenv("AMADEUS_CLIENT_SECRET")
-    AUTH_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    FLIGHT_DESTINATIONS_URL = "https://test.api.amadeus.com/v1/shopping/flight-destinations" ##Cheapest destinations to fly to
-    GET_DESTINATIONS_URL = "https://test.api.amadeus.com/v1/shopping/flight-dates" ##Cheapest flights given from/to
-    AIRPORT_SEARCH_URL = os.getenv("AMADEUS_AIRPORT_SEARCH_URL", "https://test.api.amadeus.com/v1/reference-data/locations")
-    FLIGHT_OFFERS_URL = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+    # Point AMADEUS_BASE_URL at the upstream stub to run without the real API
+    BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+    AUTH_URL = os.getenv("AMADEUS_AUTH_URL", f"{BASE_URL}/v1/security/oauth2/token")
+    FLIGHT_DESTINATIONS_URL = os.getenv("AMADEUS_FLIGHT_DESTINATIONS_URL", f"{BASE_URL}/v1/shopping/flight-destinations") ##Cheapest destinations to fly to
+    GET_DESTINATIONS_URL = os.getenv("AMADEUS_FLIGHT_DATES_URL", f"{BASE_URL}/v1/shopping/flight-dates") ##Cheapest flights given from/to
+    AIRPORT_SEARCH_URL = os.getenv("AMADEUS_AIRPORT_SEARCH_URL", f"{BASE_URL}/v1/reference-data/locations")
+    FLIGHT_OFFERS_URL = os.getenv("AMADEUS_FLIGHT_OFFERS_URL", f"{BASE_URL}/v2/shopping/flight-offers")
+
+    # Attempts per call when Amadeus answers 429/5xx or the connection fails
+    MAX_ATTEMPTS = int(os.getenv("AMADEUS_MAX_ATTEMPTS", "4"))
+    # Seconds a blocking call may spend waiting and retrying, as it holds a worker thread meanwhile
+    SYNC_DEADLINE = float(os.getenv("AMADEUS_SYNC_DEADLINE", "5"))
+
+    # One token for the whole process, shared by every AmadeusService instance;
+    # fetching it counts towards (and is stopped by) the Amadeus circuit breaker
+    token_manager = OAuthTokenManager(AUTH_URL, CLIENT_ID, CLIENT_SECRET, breaker=breaker)
+
     def __init__(self):
         self.access_token = None
     
     def get_access_token(self) -> Optional[str]:
-        """Fetch a Bearer token from Amadeus API"""
-        payload = {
-            "grant_type": "client_credentials",
-            "client_id": self.CLIENT_ID,
-            "client_secret": self.CLIENT_SECRET
+        """Get a Bearer token for the Amadeus API, reusing the cached one while it is valid"""
+        self.access_token = self.token_manager.get_token()
+        return self.access_token
+
+    async def get_access_token_async(self) -> Optional[str]:
+        """Coroutine variant of get_access_token"""
+        self.access_token = await self.token_manager.get_token_async()
+        return self.access_token
+
+    def _get(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Authorized GET, shared with any identical request already in flight.
+        Fails fast with the last good response (or CircuitOpenError) while Amadeus is down
+        """
+        key = (url, normalize_params(params))
+        return single_flight.do(key, lambda: breaker.call(lambda: self._request(url, params), key=key))
+
+    async def _get_async(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Coroutine variant of _get"""
+        key = (url, normalize_params(params))
+        return await single_flight.do_async(
+            key, lambda: breaker.call_async(lambda: self._request_async(url, params), key=key))
+
+    def _retry_policy(self, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Retries on 429/5xx; with ``deadline`` (seconds) none whose wait would end past it"""
+        stop = stop_after_attempt(self.MAX_ATTEMPTS)
+        if deadline is not None:
+            stop = stop | stop_before_delay(deadline)
+        return {
+            "retry": retry_if_exception(is_retryable),
+            "wait": wait_for_retry,
+            "stop": stop,
+            "reraise": True,
         }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        try:
-            response = requests.post(self.AUTH_URL, data=payload, headers=headers)
-            response.raise_for_status()
-            self.access_token = response.json().get("access_token")
-            return self.access_token
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching access token: {e}")
-            return None
+    def _check_throttled(self, endpoint: str, response: Any) -> None:
+        """Turn a 429 into RateLimitedError and hold back further calls to the endpoint"""
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            amadeus_rate_limiter.throttle(endpoint, retry_after)
+            raise RateLimitedError(f"429 Too Many Requests for {endpoint}", retry_after, response)
+
+    def _request(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Rate-limited GET, retried with jittered backoff on 429/5xx.
+
+        Gives up once waiting (for the rate limiter, a Retry-After or the
+        backoff) would take it past SYNC_DEADLINE; the breaker then answers
+        with the last good response, if it has one.
+        """
+        deadline = time.monotonic() + self.SYNC_DEADLINE
+        for attempt in Retrying(**self._retry_policy(self.SYNC_DEADLINE)):
+            with attempt:
+                return self._attempt(url, params, deadline)
+
+    async def _request_async(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Coroutine variant of _request"""
+        async for attempt in AsyncRetrying(**self._retry_policy()):
+            with attempt:
+                return await self._attempt_async(url, params)
+
+    def _attempt(self, url: str, params: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Authorized GET that refreshes the token once if Amadeus answers 401.
+
+        With ``deadline`` (a time.monotonic() value), the rate limiter is
+        not waited for past it.
+        """
+        endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+        token = self.get_access_token()
+        if not token:
+            raise requests.exceptions.RequestException("No Amadeus access token available")
+
+        def max_wait() -> Optional[float]:
+            return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+        amadeus_rate_limiter.acquire(endpoint, max_wait())
+        response = http_client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 401:
+            token = self.token_manager.invalidate(token)
+            if not token:
+                response.raise_for_status()
+            self.access_token = token
+            amadeus_rate_limiter.acquire(endpoint, max_wait())
+            response = http_client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        self._check_throttled(endpoint, response)
+        response.raise_for_status()
+        return response.json()
+
+    async def _attempt_async(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Coroutine variant of _attempt"""
+        endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+        token = await self.get_access_token_async()
+        if not token:
+            raise requests.exceptions.RequestException("No Amadeus access token available")
+
+        await amadeus_rate_limiter.acquire_async(endpoint)
+        response = await async_http_client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 401:
+            token = await self.token_manager.invalidate_async(token)
+            if not token:
+                response.raise_for_status()
+            self.access_token = token
+            await amadeus_rate_limiter.acquire_async(endpoint)
+            response = await async_http_client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        self._check_throttled(endpoint, response)
+        response.raise_for_status()
+        return response.json()
+
+    def _lookup_iata_locally(self, location: str) -> Tuple[bool, Optional[str]]:
+        """Resolve from the bundled airport index or the IATA cache, without a network call"""
+        # Bundled airport data answers the common cities and codes, spelled exactly
+        iata_code = airport_index.resolve(location)
+        if iata_code:
+            return True, iata_code
+        found, iata_code = iata_cache.lookup(location)
+        if found:
+            return found, iata_code
+        # A one-letter slip in a longer name ("new yrok") need not wait for Amadeus
+        iata_code = airport_index.correct(location)
+        return iata_code is not None, iata_code
+
+    def _parse_iata_response(self, location: str, data: Dict[str, Any]) -> Optional[str]:
+        if "data" in data and data["data"]:
+            iata_code = data["data"][0]["iataCode"]  # Take the first match
+            print(f"Found IATA code for {location}: {iata_code}")
+            iata_cache.store(location, iata_code)
+            return iata_code
+        # Not a place Amadeus knows: maybe a prefix or typo of one in the bundled data
+        iata_code = airport_index.suggest(location)
+        if iata_code:
+            print(f"Guessed IATA code for {location}: {iata_code}")
+        else:
+            print(f"No IATA code found for {location}")
+        iata_cache.store(location, iata_code)
+        return iata_code
 
     def get_iata_code(self, location: str) -> Optional[str]:
         """Get IATA code for a location (city or airport)"""
-        if not self.access_token:
-            self.access_token = self.get_access_token()
-            if not self.access_token:
-                return None
-                
-        headers = {"Authorization": f"Bearer {self.access_token}"}
+        found, iata_code = self._lookup_iata_locally(location)
+        if found:
+            return iata_code
+
         params = {"keyword": location, "subType": "AIRPORT,CITY"}
 
         try:
-            response = requests.get(self.AIRPORT_SEARCH_URL, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            if "data" in data and data["data"]:
-                iata_code = data["data"][0]["iataCode"]  # Take the first match
-                print(f"Found IATA code for {location}: {iata_code}")
-                return iata_code
-            else:
-                print(f"No IATA code found for {location}")
-                return None
-        except requests.exceptions.RequestException as e:
+            return self._parse_iata_response(location, self._get(self.AIRPORT_SEARCH_URL, params))
+        except HTTP_ERRORS as e:
+            print(f"Error fetching IATA code: {e}")
+            return None
+
+    async def get_iata_code_async(self, location: str) -> Optional[str]:
+        """Coroutine variant of get_iata_code"""
+        found, iata_code = self._lookup_iata_locally(location)
+        if found:
+            return iata_code
+
+        params = {"keyword": location, "subType": "AIRPORT,CITY"}
+
+        try:
+            return self._parse_iata_response(location, await self._get_async(self.AIRPORT_SEARCH_URL, params))
+        except HTTP_ERRORS as e:
             print(f"Error fetching IATA code: {e}")
             return None
     
-    def search_flight_destinations(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Search for flight destinations based on parameters"""
-        if not self.access_token:
-            self.access_token = self.get_access_token()
-            if not self.access_token:
-                return None
-                
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        
+    def search_flight_destinations(self, params: Dict[str, Any], refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Search for flight destinations based on parameters; ``refresh`` skips the cached response"""
         print(params)
         try:
-            response = requests.get(self.FLIGHT_DESTINATIONS_URL, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            if refresh:
+                response_data = self._get(self.FLIGHT_DESTINATIONS_URL, params)
+                response_cache.put("flight-destinations", params, response_data)
+                return response_data
+            return response_cache.get_or_fetch(
+                "flight-destinations", params, lambda: self._get(self.FLIGHT_DESTINATIONS_URL, params))
+        except HTTP_ERRORS as e:
+            print(f"Error fetching flight destinations: {e}")
+            return None
+
+    async def search_flight_destinations_async(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Coroutine variant of search_flight_destinations"""
+        try:
+            return await response_cache.get_or_fetch_async(
+                "flight-destinations", params, lambda: self._get_async(self.FLIGHT_DESTINATIONS_URL, params))
+        except HTTP_ERRORS as e:
             print(f"Error fetching flight destinations: {e}")
             return None
     
     def search_destinations(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Search for destinations based on parameters"""
-        if not self.access_token:
-            self.access_token = self.get_access_token()
-            if not self.access_token:
-                return None
-                
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        
         try:
-            response = requests.get(self.GET_DESTINATIONS_URL, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return response_cache.get_or_fetch(
+                "flight-dates", params, lambda: self._get(self.GET_DESTINATIONS_URL, params))
+        except HTTP_ERRORS as e:
+            print(f"Error fetching cheapest flights: {e}")
+            return None
+
+    async def search_destinations_async(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Coroutine variant of search_destinations"""
+        try:
+            return await response_cache.get_or_fetch_async(
+                "flight-dates", params, lambda: self._get_async(self.GET_DESTINATIONS_URL, params))
+        except HTTP_ERRORS as e:
             print(f"Error fetching cheapest flights: {e}")
             return None
 
     def search_flight_offers(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Get flight offers based on parameters"""
-        if not self.access_token:
-            self.access_token = self.get_access_token()
-            if not self.access_token:
-                return None
-                
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        
         try:
-            response = requests.get(self.FLIGHT_OFFERS_URL, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return response_cache.get_or_fetch(
+                "flight-offers", params, lambda: self._get(self.FLIGHT_OFFERS_URL, params))
+        except HTTP_ERRORS as e:
+            print(f"Error fetching flight offers: {e}")
+            return None
+
+    async def search_flight_offers_async(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Coroutine variant of search_flight_offers"""
+        try:
+            return await response_cache.get_or_fetch_async(
+                "flight-offers", params, lambda: self._get_async(self.FLIGHT_OFFERS_URL, params))
+        except HTTP_ERRORS as e:
             print(f"Error fetching flight offers: {e}")
             return None
+
+    def token_stats(self) -> Dict[str, Any]:
+        """Token fetch and cache-hit counters for the shared token manager"""
+        return self.token_manager.stats()
+
+    def iata_cache_stats(self) -> Dict[str, Any]:
+        """Hit-rate counters for the shared IATA cache"""
+        return iata_cache.stats()
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """Quota used, 429s received and time spent waiting for the rate limiter"""
+        return amadeus_rate_limiter.stats()
+
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """Upstream calls made and identical concurrent calls collapsed into them"""
+        return single_flight.stats()
+
+    def response_cache_stats(self) -> Dict[str, Any]:
+        """Hit, miss and staleness counters for cached search responses"""
+        return response_cache.stats()
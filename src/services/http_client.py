@@ -0,0 +1,211 @@
+import asyncio
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Any, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:  # the Flask API only needs the sync client
+    httpx = None
+
+# Errors raised by either client, for callers that handle both
+HTTP_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+
+def _parse_host_settings(value: Optional[str]) -> Dict[str, int]:
+    """Parse ``host=number,host=number`` from an environment variable"""
+    settings = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        host, number = item.split("=", 1)
+        try:
+            settings[host.strip()] = int(number)
+        except ValueError:
+            print(f"Ignoring invalid HTTP pool setting: {item}")
+    return settings
+
+
+def _upstream_hosts(upstreams: Tuple[Tuple[str, int], ...], combine) -> Dict[str, int]:
+    """Map ``(base URL, number)`` pairs to ``host -> number``, combining hosts that repeat"""
+    settings = {}
+    for url, number in upstreams:
+        host = urlsplit(url).hostname or ""
+        settings[host] = combine((settings[host], number)) if host in settings else number
+    return settings
+
+
+class HTTPClient:
+    """Shared keep-alive connection pools for every upstream API.
+
+    One ``requests.Session`` is used for the whole process, with a dedicated
+    ``HTTPAdapter`` mounted per upstream host so each host gets its own pool size.
+    Every request gets a connect and read timeout unless the caller passes one.
+    """
+
+    DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+
+    # Pool sizes and read timeouts for the upstreams we know about. Hosts come
+    # from the same base URL variables the service clients read, so a local stub
+    # serving several upstreams gets their pools added together.
+    POOL_SIZES = _upstream_hosts((
+        (os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com"), 20),
+        (os.getenv("YNAB_BASE_URL", "https://api.youneedabudget.com/v1"), 4),
+        (os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"), 8),
+    ), sum)
+    READ_TIMEOUTS = _upstream_hosts((
+        (os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"), 30),
+    ), max)
+
+    def __init__(self):
+        self.pool_sizes = {**self.POOL_SIZES, **_parse_host_settings(os.getenv("HTTP_POOL_SIZES"))}
+        self.read_timeouts = {**self.READ_TIMEOUTS, **_parse_host_settings(os.getenv("HTTP_READ_TIMEOUTS"))}
+
+        self.session = requests.Session()
+        default_adapter = HTTPAdapter(pool_connections=self.DEFAULT_POOL_SIZE, pool_maxsize=self.DEFAULT_POOL_SIZE)
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        self._adapters = {"*": default_adapter}
+        for host, size in self.pool_sizes.items():
+            self._mount_host(host, size)
+
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._errors = {}
+
+    def _mount_host(self, host: str, size: int) -> None:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        self.session.mount(f"https://{host}", adapter)
+        self.session.mount(f"http://{host}", adapter)
+        self._adapters[host] = adapter
+
+    def timeout_for(self, url: str) -> Tuple[float, float]:
+        """(connect, read) timeout for a URL"""
+        host = urlsplit(url).hostname or ""
+        return self.CONNECT_TIMEOUT, float(self.read_timeouts.get(host, self.READ_TIMEOUT))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared session"""
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors[host] = self._errors.get(host, 0) + 1
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counts per host and connection reuse per pool"""
+        pools = {}
+        for name, adapter in self._adapters.items():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                pools[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                    "maxsize": pool.pool.maxsize if pool.pool is not None else 0,
+                    "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                }
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "errors": dict(self._errors),
+                "pools": pools,
+            }
+
+
+class AsyncHTTPClient:
+    """asyncio counterpart of HTTPClient built on ``httpx.AsyncClient``.
+
+    Uses the same per-host pool sizes and timeouts. httpx only limits connections
+    globally, so a semaphore per host caps concurrent requests to each upstream.
+    The underlying client is bound to the event loop it was created on and is
+    recreated if called from a different loop.
+    """
+
+    def __init__(self, settings: HTTPClient):
+        self.settings = settings
+        self._client = None
+        self._loop = None
+        self._semaphores = {}
+        self._requests = {}
+        self._errors = {}
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if httpx is None:
+            raise RuntimeError("httpx is required for async upstream calls")
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            total = sum(self.settings.pool_sizes.values()) + self.settings.DEFAULT_POOL_SIZE
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=total, max_keepalive_connections=total),
+                timeout=httpx.Timeout(self.settings.READ_TIMEOUT, connect=self.settings.CONNECT_TIMEOUT),
+            )
+            self._loop = loop
+            self._semaphores = {}
+        return self._client
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            size = self.settings.pool_sizes.get(host, self.settings.DEFAULT_POOL_SIZE)
+            semaphore = self._semaphores[host] = asyncio.Semaphore(size)
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """Send a request through the shared async client"""
+        client = self._get_client()
+        if "timeout" not in kwargs:
+            connect, read = self.settings.timeout_for(url)
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+        host = urlsplit(url).hostname or ""
+        self._requests[host] = self._requests.get(host, 0) + 1
+        try:
+            async with self._semaphore(host):
+                return await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._errors[host] = self._errors.get(host, 0) + 1
+            raise
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counts per host and requests currently in flight"""
+        return {
+            "requests": dict(self._requests),
+            "errors": dict(self._errors),
+            "in_flight": {
+                host: self.settings.pool_sizes.get(host, self.settings.DEFAULT_POOL_SIZE) - semaphore._value
+                for host, semaphore in self._semaphores.items()
+            },
+        }
+
+
+# Shared by all service clients and actions in this process
+http_client = HTTPClient()
+async_http_client = AsyncHTTPClient(http_client)
@@ -0,0 +1,153 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+
+# Marker for "looked up, no such place" so we don't ask Amadeus again
+NOT_FOUND = ""
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a free-text place name: strip accents, casefold and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", location or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped).strip().casefold()
+
+
+class IATACache:
+    """Two-tier cache of location -> IATA code.
+
+    The first tier is a bounded in-memory LRU. The second is a small SQLite file
+    that survives restarts and is shared by every process pointing at the same path;
+    it is opened on first use, not on import. Unknown places are cached too
+    (negative entries) with a shorter TTL.
+    """
+
+    MAX_ENTRIES = int(os.getenv("IATA_CACHE_SIZE", "2048"))
+    TTL = int(os.getenv("IATA_CACHE_TTL", str(30 * 24 * 3600)))
+    NEGATIVE_TTL = int(os.getenv("IATA_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+    # Next to the user database in src/db, wherever the process was started from
+    PATH = os.getenv("IATA_CACHE_PATH", os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db", "iata_cache.sqlite")))
+
+    def __init__(self, path: Optional[str] = PATH, max_entries: int = MAX_ENTRIES,
+                 ttl: int = TTL, negative_ttl: int = NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.path = path
+        self._db = None
+        self._opened = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS iata_cache ("
+                "location TEXT PRIMARY KEY, iata_code TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"Error opening IATA cache at {path}, using memory only: {e}")
+            return None
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """The SQLite tier, opened the first time it is needed. Caller must hold ``self._lock``."""
+        if not self._opened:
+            self._opened = True
+            self._db = self._open(self.path) if self.path else None
+        return self._db
+
+    def _remember(self, key: str, code: str, expires_at: float) -> None:
+        """Put an entry in the LRU tier. Caller must hold ``self._lock``."""
+        self._memory[key] = (code, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[str, float]]:
+        db = self._disk()
+        if db is None:
+            return None
+        try:
+            return db.execute(
+                "SELECT iata_code, expires_at FROM iata_cache WHERE location = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading IATA cache: {e}")
+            return None
+
+    def lookup(self, location: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(found, iata_code)``. A found entry with no code is a cached miss."""
+        key = normalize_location(location)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                entry = self._read_disk(key)
+                if entry and entry[1] > now:
+                    self._remember(key, entry[0], entry[1])
+                    self.disk_hits += 1
+                else:
+                    self._memory.pop(key, None)
+                    self.misses += 1
+                    return False, None
+
+        if entry[0] == NOT_FOUND:
+            self.negative_hits += 1
+            return True, None
+        return True, entry[0]
+
+    def store(self, location: str, iata_code: Optional[str]) -> None:
+        """Cache a resolved code, or ``None`` to remember that the place is unknown"""
+        key = normalize_location(location)
+        code = iata_code.upper() if iata_code else NOT_FOUND
+        expires_at = time.time() + (self.ttl if iata_code else self.negative_ttl)
+        with self._lock:
+            self._remember(key, code, expires_at)
+            db = self._disk()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO iata_cache (location, iata_code, expires_at) VALUES (?, ?, ?)",
+                    (key, code, expires_at)
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing IATA cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for both tiers"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# Shared by FlightService, the Flask API and the actions
+iata_cache = IATACache()
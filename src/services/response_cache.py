@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_params(params: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """Order-independent, type-independent form of a query parameter dict"""
+    normalized = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        normalized.append((key, str(value).strip().upper() if isinstance(value, str) else str(value)))
+    return tuple(sorted(normalized))
+
+
+class ResponseCache:
+    """LRU cache of upstream JSON responses with per-endpoint TTLs and stale-while-revalidate.
+
+    Within its TTL an entry is served as is. After that it is still served for
+    its endpoint's ``STALE_FORS`` seconds while a single background refresh
+    replaces it; only entries older than that count as misses. Flight offers
+    are never served stale: prices and seats change, and an offer shown is
+    one the user may book. The cache is bounded both by entry
+    count and by the approximate JSON size of the stored responses.
+    """
+
+    # Seconds a response is fresh, per endpoint
+    TTLS = {
+        "flight-offers": int(os.getenv("FLIGHT_OFFERS_CACHE_TTL", "600")),
+        "flight-destinations": int(os.getenv("FLIGHT_DESTINATIONS_CACHE_TTL", "3600")),
+        "flight-dates": int(os.getenv("FLIGHT_DATES_CACHE_TTL", "3600")),
+    }
+    DEFAULT_TTL = 600
+    # Seconds an expired response is still served while it is refreshed, per endpoint
+    STALE_FORS = {
+        "flight-offers": int(os.getenv("FLIGHT_OFFERS_CACHE_STALE_FOR", "0")),
+        "flight-destinations": int(os.getenv("FLIGHT_DESTINATIONS_CACHE_STALE_FOR", "1800")),
+        "flight-dates": int(os.getenv("FLIGHT_DATES_CACHE_STALE_FOR", "1800")),
+    }
+    DEFAULT_STALE_FOR = int(os.getenv("RESPONSE_CACHE_STALE_FOR", "1800"))
+    MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.TTLS)
+        self.stale_fors = dict(self.STALE_FORS)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._tasks = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Tuple) -> Tuple[Optional[str], Any]:
+        """Return ``("fresh" | "stale" | None, value)`` and update counters"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] + self.stale_fors.get(key[0], self.DEFAULT_STALE_FOR) <= now:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            value, fresh_until, _ = entry
+            if fresh_until > now:
+                self.hits += 1
+                return "fresh", value
+            self.stale_hits += 1
+            if key in self._refreshing:
+                return "fresh", value
+            self._refreshing.add(key)
+            return "stale", value
+
+    def put(self, endpoint: str, params: Dict[str, Any], value: Any) -> None:
+        """Store a response for an endpoint/params pair"""
+        self._store((endpoint, normalize_params(params)), value)
+
+    def _store(self, key: Tuple, value: Any) -> None:
+        size = len(json.dumps(value, separators=(",", ":")))
+        if size > self.max_bytes:
+            return
+        fresh_until = time.time() + self.ttls.get(key[0], self.DEFAULT_TTL)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[2]
+            self._entries[key] = (value, fresh_until, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _refresh_done(self, key: Tuple, value: Any = None, error: Optional[Exception] = None) -> None:
+        if error is None and value is not None:
+            self._store(key, value)
+            self.refreshes += 1
+        elif error is not None:
+            print(f"Error refreshing cached {key[0]} response: {error}")
+            self.refresh_errors += 1
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get_or_fetch(self, endpoint: str, params: Dict[str, Any],
+                     fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Serve from cache, refreshing stale entries on a background thread; fetch on a miss"""
+        key = (endpoint, normalize_params(params))
+        state, value = self._lookup(key)
+        if state == "stale":
+            def refresh():
+                try:
+                    self._refresh_done(key, fetch())
+                except Exception as e:
+                    self._refresh_done(key, error=e)
+            threading.Thread(target=refresh, name=f"refresh-{endpoint}", daemon=True).start()
+        if state:
+            return value
+
+        value = fetch()
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    async def get_or_fetch_async(self, endpoint: str, params: Dict[str, Any],
+                                 fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        """Coroutine variant of get_or_fetch; stale entries are refreshed in a background task"""
+        key = (endpoint, normalize_params(params))
+        state, value = self._lookup(key)
+        if state == "stale":
+            async def refresh():
+                try:
+                    self._refresh_done(key, await fetch())
+                except Exception as e:
+                    self._refresh_done(key, error=e)
+            task = asyncio.get_running_loop().create_task(refresh())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if state:
+            return value
+
+        value = await fetch()
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and staleness counters"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 4) if total else 0.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+# Shared by the Rasa actions and the Flask API
+response_cache = ResponseCache()
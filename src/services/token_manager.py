@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+import requests
+from typing import Dict, Optional, Any
+
+from .circuit_breaker import CircuitBreaker
+from .http_client import http_client
+
+
+class OAuthTokenManager:
+    """Process-wide cache for a client-credentials OAuth token.
+
+    The token is kept until shortly before its ``expires_in`` runs out. Inside the
+    refresh window the current token is still handed out while a single background
+    thread fetches the next one, so callers never wait on the auth server unless
+    the token has actually expired.
+
+    With a ``breaker`` the token request goes through the upstream's circuit
+    breaker like its API calls, so while the upstream is down a missing token
+    fails fast instead of waiting out the connect timeout on every turn.
+    """
+
+    # Refresh this many seconds before the token expires
+    REFRESH_MARGIN = 300
+    # Used when the auth server does not send expires_in
+    DEFAULT_EXPIRES_IN = 1799
+
+    def __init__(self, token_url: str, client_id: Optional[str], client_secret: Optional[str],
+                 refresh_margin: int = REFRESH_MARGIN, breaker: Optional[CircuitBreaker] = None):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.breaker = breaker
+
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+        self.fetch_count = 0
+        self.fetch_errors = 0
+        self.cache_hits = 0
+        self.forced_refreshes = 0
+
+    def _fetch(self) -> Optional[Dict[str, Any]]:
+        """POST the client credentials to the token endpoint"""
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        def post() -> Dict[str, Any]:
+            response = http_client.post(self.token_url, data=payload, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            # an open circuit raises CircuitOpenError, a RequestException
+            return self.breaker.call(post) if self.breaker else post()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching access token: {e}")
+            return None
+
+    def _refresh_locked(self) -> Optional[str]:
+        """Fetch a new token and store it. Caller must hold ``self._lock``."""
+        self.fetch_count += 1
+        data = self._fetch()
+        if not data or not data.get("access_token"):
+            self.fetch_errors += 1
+            return None
+
+        expires_in = int(data.get("expires_in") or self.DEFAULT_EXPIRES_IN)
+        self._token = data["access_token"]
+        self._expires_at = time.monotonic() + expires_in
+        return self._token
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._refresh_locked()
+        finally:
+            self._refreshing = False
+
+    def _start_background_refresh(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="oauth-token-refresh", daemon=True).start()
+
+    def _cached_token(self) -> Optional[str]:
+        """Return the cached token if it is still valid, scheduling an early refresh if due"""
+        token = self._token
+        remaining = self._expires_at - time.monotonic()
+        if token and remaining > 0:
+            self.cache_hits += 1
+            if remaining <= self.refresh_margin and not self._refreshing:
+                self._start_background_refresh()
+            return token
+        return None
+
+    def get_token(self) -> Optional[str]:
+        """Return a valid access token, fetching one only when none is cached"""
+        token = self._cached_token()
+        if token:
+            return token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and self._expires_at > time.monotonic():
+                self.cache_hits += 1
+                return self._token
+            return self._refresh_locked()
+
+    async def get_token_async(self) -> Optional[str]:
+        """Coroutine variant of get_token that never blocks the event loop"""
+        token = self._cached_token()
+        if token:
+            return token
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_token)
+
+    def invalidate(self, rejected_token: Optional[str]) -> Optional[str]:
+        """Replace a token the API rejected with 401.
+
+        Only the first caller holding ``rejected_token`` triggers a fetch; everyone
+        else who got a 401 with the same token receives the already refreshed one.
+        """
+        with self._lock:
+            if self._token and self._token != rejected_token and self._expires_at > time.monotonic():
+                return self._token
+            self.forced_refreshes += 1
+            return self._refresh_locked()
+
+    async def invalidate_async(self, rejected_token: Optional[str]) -> Optional[str]:
+        """Coroutine variant of invalidate"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.invalidate, rejected_token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for token fetches and cache hits"""
+        return {
+            "fetches": self.fetch_count,
+            "fetch_errors": self.fetch_errors,
+            "cache_hits": self.cache_hits,
+            "forced_refreshes": self.forced_refreshes,
+            "expires_in": max(0, int(self._expires_at - time.monotonic())) if self._token else 0
+        }
@@ -0,0 +1,33 @@
+import copy
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# The actions and services are imported as top-level packages, as the action server does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# Keep the IATA cache in memory
+os.environ.setdefault("IATA_CACHE_PATH", "")
+
+from services.flight_models import FlightOffer  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "upstream_stub", "fixtures")
+
+
+@pytest.fixture
+def offers_priced():
+    """Copies of one stub flight offer that differ only in price, numbered from 1"""
+    with open(os.path.join(FIXTURES, "flight_offers.json"), encoding="utf-8") as f:
+        template = FlightOffer.from_response(json.load(f)["data"])[0]
+
+    def make(*totals):
+        offers = []
+        for i, total in enumerate(totals):
+            offer = copy.deepcopy(template)
+            offer.id = str(i + 1)
+            offer.total = Decimal(total)
+            offers.append(offer)
+        return offers
+    return make
@@ -0,0 +1,58 @@
+import pytest
+
+from services import amadeus_service
+from services.airport_index import airport_index
+from services.amadeus_service import AmadeusService
+from services.iata_cache import IATACache
+
+
+@pytest.mark.parametrize("location, iata_code", [
+    ("New York", "NYC"),
+    ("zürich", "ZRH"),
+    ("JFK", "JFK"),
+    ("lhr", "LHR"),
+])
+def test_resolves_exact_names_and_codes(location, iata_code):
+    assert airport_index.resolve(location) == iata_code
+
+
+@pytest.mark.parametrize("location", ["Nome", "Sidney", "San", "San Fran", "new yrok"])
+def test_leaves_places_it_does_not_know_exactly_to_amadeus(location):
+    assert airport_index.resolve(location) is None
+
+
+def test_guesses_from_prefixes_and_typos():
+    assert airport_index.suggest("San Fran") == "SFO"
+    assert airport_index.suggest("new yrok") == "NYC"
+    assert airport_index.suggest("Ouagadougou") is None
+
+
+def test_corrects_only_a_single_slip_in_a_longer_name():
+    assert airport_index.correct("new yrok") == "NYC"
+    assert airport_index.correct("londn") == "LON"
+    # "Nome" is one letter from Rome, but too short to be sure
+    assert airport_index.correct("Nome") is None
+    assert airport_index.correct("San Fran") is None
+    assert airport_index.correct("Ouagadougou") is None
+
+
+def test_a_single_slip_is_corrected_without_asking_amadeus(monkeypatch):
+    monkeypatch.setattr(amadeus_service, "iata_cache", IATACache(path=None))
+    service = AmadeusService()
+
+    def get(url, params):
+        raise AssertionError(f"{params['keyword']} went to Amadeus")
+
+    monkeypatch.setattr(service, "_get", get)
+    assert service.get_iata_code("new yrok") == "NYC"
+
+
+def test_amadeus_answer_wins_over_a_guess(monkeypatch):
+    monkeypatch.setattr(amadeus_service, "iata_cache", IATACache(path=None))
+    service = AmadeusService()
+    monkeypatch.setattr(service, "_get", lambda url, params: {"data": [{"iataCode": "OME"}]})
+    assert service.get_iata_code("Nome") == "OME"
+
+    monkeypatch.setattr(service, "_get", lambda url, params: {"data": []})
+    assert service.get_iata_code("San Fran") == "SFO"
+    assert service.get_iata_code("Ouagadougou") is None
@@ -0,0 +1,96 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("rasa_sdk")
+pytest.importorskip("rasa")
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions import book_flight
+from actions.book_flight import ActionBookFlight, ActionSearchFlights
+from services.flight_models import FlightOffer, PriceCalendar
+from services.flight_service import FlightService
+from services.result_store import ResultPages, ResultStore
+
+
+def tracker(**slots):
+    return Tracker("test", slots, {}, [], False, None, None, None)
+
+
+def test_booking_on_another_server_picks_the_offer_shown(tmp_path, monkeypatch, offers_priced):
+    # an exhausted result (as a flexible-dates calendar stores it) is never saved again by a fetch
+    shown_by = ResultStore(directory=str(tmp_path))
+    monkeypatch.setattr(book_flight, "result_store", shown_by)
+    pages = ResultPages(offers_priced("900", "300", "500"))
+    handle = shown_by.put("flight-offers", pages)
+
+    dispatcher = CollectingDispatcher()
+    ActionSearchFlights().show_page(dispatcher, FlightService(), handle, pages, 0, {})
+    assert dispatcher.messages[0]["text"].startswith("Option 1")
+    assert dispatcher.messages[0]["text"].endswith("USD 300")
+
+    # another action server (or this one after a restart) reads the result from disk
+    monkeypatch.setattr(book_flight, "result_store", ResultStore(directory=str(tmp_path)))
+    booked = []
+    monkeypatch.setattr(book_flight, "add_flight_to_user", lambda user_id, flight: booked.append(flight) or True)
+    ActionBookFlight().run(CollectingDispatcher(), tracker(flight_offers=handle, selected_flight_index="1",
+                                                           user_id=1), {})
+
+    assert booked[0]["flightDetails"].total == Decimal("300")
+
+
+@pytest.mark.parametrize("value, option", [
+    ("2", 2), (2, 2), ("2.0", 2), ("option 3", 3), ("#1", 1), ("the second one", 2), ("Third", 3),
+    ("0", 0), ("-1", -1), ("1.5", None), ("1 or 2", None), ("the cheap one", None), (None, None),
+])
+def test_parse_option_number(value, option):
+    assert book_flight.parse_option_number(value) == option
+
+
+@pytest.mark.parametrize("selected", ["0", "-1", "4", "the cheap one"])
+def test_booking_an_option_not_shown_asks_again(tmp_path, monkeypatch, offers_priced, selected):
+    # four offers fetched, the first page of three shown
+    store = ResultStore(directory=str(tmp_path))
+    monkeypatch.setattr(book_flight, "result_store", store)
+    handle = store.put("flight-offers", ResultPages(offers_priced("100", "200", "300", "400"), page_size=3))
+    booked = []
+    monkeypatch.setattr(book_flight, "add_flight_to_user", lambda user_id, flight: booked.append(flight) or True)
+
+    dispatcher = CollectingDispatcher()
+    events = ActionBookFlight().run(dispatcher, tracker(flight_offers=handle, flight_offers_page=0,
+                                                        selected_flight_index=selected, user_id=1), {})
+
+    assert booked == []
+    assert dispatcher.messages[0]["text"] == "Please pick one of the options shown, from 1 to 3."
+    assert {event["name"]: event["value"] for event in events} == {"selected_flight_index": None,
+                                                                   "return_value": "invalid_selection"}
+
+
+def test_booking_an_option_on_a_later_page(tmp_path, monkeypatch, offers_priced):
+    store = ResultStore(directory=str(tmp_path))
+    monkeypatch.setattr(book_flight, "result_store", store)
+    handle = store.put("flight-offers", ResultPages(offers_priced("100", "200", "300", "400"), page_size=3))
+    booked = []
+    monkeypatch.setattr(book_flight, "add_flight_to_user", lambda user_id, flight: booked.append(flight) or True)
+
+    events = ActionBookFlight().run(CollectingDispatcher(), tracker(flight_offers=handle, flight_offers_page=1,
+                                                                    selected_flight_index="the fourth", user_id=1), {})
+
+    assert booked[0]["flightDetails"].total == Decimal("400")
+    assert {event["name"]: event["value"] for event in events}["return_value"] == "success"
+
+
+def test_a_partial_price_calendar_says_other_days_may_be_cheaper():
+    calendar = PriceCalendar(planned=4)
+    calendar.add(date(2027, 5, 3), date(2027, 5, 10), [FlightOffer("1", Decimal("420"), "USD", (), ())])
+    calendar.add(date(2027, 5, 1), date(2027, 5, 8), [FlightOffer("1", Decimal("380"), "USD", (), ())])
+
+    assert ActionSearchFlights().format_price_calendar(calendar).splitlines() == [
+        "📆 Cheapest price per departure day:",
+        "Sat May 01 → Sat May 08: 💰 USD 380 ⭐",
+        "Mon May 03 → Mon May 10: 💰 USD 420",
+        "(Searched 2 of 4 date combinations in time; other days may be cheaper.)",
+    ]
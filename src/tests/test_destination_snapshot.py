@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import date, timedelta
+
+from services.destination_snapshot import DestinationSnapshot
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "upstream_stub", "fixtures")
+
+# June next year, so no bucket is in the past; the fixture departs 1-7 June
+JUNE = date(date.today().year + 1, 6, 1)
+MONTH = JUNE.strftime("%Y-%m")
+
+
+def fetch(origin, departure_date, duration):
+    """The recorded response moved to June next year, as the stub does"""
+    with open(os.path.join(FIXTURES, "flight_destinations.json"), encoding="utf-8") as f:
+        data = json.load(f)["data"]
+    for entry in data:
+        departure = date.fromisoformat(entry["departureDate"]).replace(year=JUNE.year)
+        entry.update(origin=origin, departureDate=departure.isoformat(),
+                     returnDate=(departure + timedelta(days=duration)).isoformat())
+    return {"data": data}
+
+
+def make_snapshot(tmp_path, **kwargs):
+    snapshot = DestinationSnapshot(path=str(tmp_path / "snapshot.json"), enabled=True, **kwargs)
+    snapshot.refresh([("NYC", MONTH, 7)], fetch)
+    return snapshot
+
+
+def test_answers_a_month_and_trip_length_from_its_bucket(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    found = snapshot.search("nyc", duration="7", departure_date=f"{MONTH}-01,{MONTH}-30")
+    assert len(found) == 12
+    assert [entry["destination"] for entry in found[:3]] == ["MIA", "LAX", "CUN"]
+    assert all(entry["returnDate"] == (date.fromisoformat(entry["departureDate"]) + timedelta(days=7)).isoformat()
+               for entry in found)
+
+
+def test_keeps_only_fares_inside_the_window_and_price(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    found = snapshot.search("NYC", duration="7", max_price="300", departure_date=f"{MONTH}-02,{MONTH}-04")
+    assert {entry["destination"]: entry["price"]["total"] for entry in found} == {"LAX": "198.35", "MAD": "289.49"}
+
+
+def test_searches_touching_missing_or_old_buckets_go_live(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    timeframe = f"{MONTH}-01,{MONTH}-30"
+    assert snapshot.search("NYC", duration="5,7", departure_date=timeframe) is None
+    assert snapshot.search("NYC", duration="7", departure_date=f"{MONTH}-20,{JUNE.year}-07-10") is None
+    assert snapshot.search("LON", duration="7", departure_date=timeframe) is None
+    assert make_snapshot(tmp_path, max_age=-1).search("NYC", duration="7", departure_date=timeframe) is None
+
+
+def test_one_way_unbounded_and_disabled_searches_go_live(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    timeframe = f"{MONTH}-01,{MONTH}-30"
+    assert snapshot.search("NYC", duration="7", departure_date=timeframe, one_way=True) is None
+    assert snapshot.search("NYC") is None
+    assert snapshot.search("NYC", duration="7") is None
+    disabled = DestinationSnapshot(path=snapshot.path, enabled=False)
+    assert disabled.search("NYC", duration="7", departure_date=timeframe) is None
+
+
+def test_another_process_reads_the_buckets_from_the_file(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    other = DestinationSnapshot(path=snapshot.path, enabled=True)
+    assert other.search("NYC", duration="7", departure_date=f"{MONTH}-01,{MONTH}-30") is not None
+
+
+def test_hot_buckets_are_the_searched_ones_then_the_same_from_preferred_origins(tmp_path):
+    snapshot = DestinationSnapshot(path=str(tmp_path / "snapshot.json"), enabled=True)
+    snapshot.record_query("NYC", "3,4", f"{MONTH}-10")
+    snapshot.record_query("NYC", "4", f"{MONTH}-12")
+    snapshot.record_query("LON", "7", "2020-01-01,2020-01-31")
+    assert snapshot.hot_buckets(["MAD"]) == [("NYC", MONTH, 4), ("NYC", MONTH, 3),
+                                             ("MAD", MONTH, 4), ("MAD", MONTH, 3)]
+
+
+def test_snapshot_file_lives_next_to_the_user_database():
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert DestinationSnapshot.PATH == os.path.join(src, "db", "destination_snapshot.json")
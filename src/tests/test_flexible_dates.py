@@ -0,0 +1,116 @@
+import asyncio
+from datetime import date, timedelta
+
+from services import flight_service as flight_service_module
+from services.flight_models import FlightOffer, PriceCalendar
+from services.flight_service import FlightService, flexible_date_pairs
+
+DAY = date.today() + timedelta(days=30)
+
+
+def raw_offer(departure_date, total):
+    return {
+        "id": "1",
+        "price": {"total": total, "currency": "USD"},
+        "itineraries": [{"duration": "PT7H", "segments": [{
+            "departure": {"iataCode": "JFK", "at": f"{departure_date}T10:00:00"},
+            "arrival": {"iataCode": "LHR", "at": f"{departure_date}T22:00:00"},
+            "carrierCode": "BA", "number": "117", "duration": "PT7H", "numberOfStops": 0,
+        }]}],
+        "validatingAirlineCodes": ["BA"],
+    }
+
+
+class Upstream:
+    """flight-offers answering each departure day after its own delay, with its own fares"""
+
+    def __init__(self, fares, delays=None):
+        self.fares = fares
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def get_access_token_async(self):
+        return "token"
+
+    async def get_iata_code_async(self, location):
+        return {"New York": "JFK", "London": "LHR"}.get(location)
+
+    async def search_flight_offers_async(self, params):
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(params["departureDate"], 0.01))
+        finally:
+            self.in_flight -= 1
+        fares = self.fares.get(params["departureDate"], [])
+        return {"data": [raw_offer(params["departureDate"], total) for total in fares]}
+
+
+def search(upstream, pairs, budget=5):
+    flight_service = FlightService()
+    flight_service.amadeus_service = upstream
+    return asyncio.run(flight_service.search_flexible_dates_async("New York", "London", pairs, "1", budget=budget))
+
+
+def test_date_pairs_cover_every_day_with_the_shortest_trip_first():
+    timeframe = f"{DAY},{DAY + timedelta(days=2)}"
+    assert flexible_date_pairs(timeframe, "3,4") == [
+        (DAY, DAY + timedelta(days=3)), (DAY + timedelta(days=1), DAY + timedelta(days=4)),
+        (DAY + timedelta(days=2), DAY + timedelta(days=5)), (DAY, DAY + timedelta(days=4)),
+        (DAY + timedelta(days=1), DAY + timedelta(days=5)), (DAY + timedelta(days=2), DAY + timedelta(days=6))]
+    assert len(flexible_date_pairs(timeframe, "3,4", limit=4)) == 4
+    # days already past are not searched
+    yesterday = date.today() - timedelta(days=1)
+    assert flexible_date_pairs(f"{yesterday},{date.today()}", "2") == [(date.today(), date.today() + timedelta(days=2))]
+    assert flexible_date_pairs(None, "3") == [] and flexible_date_pairs(str(DAY), "soon") == []
+
+
+def test_calendar_keeps_the_cheapest_offer_per_day():
+    calendar = PriceCalendar(planned=3)
+    calendar.add(DAY, DAY + timedelta(days=3), FlightOffer.from_response([raw_offer(DAY, "400"), raw_offer(DAY, "350")]))
+    calendar.add(DAY, DAY + timedelta(days=4), FlightOffer.from_response([raw_offer(DAY, "380")]))
+    other = DAY + timedelta(days=1)
+    assert not calendar.complete
+    calendar.add(other, other + timedelta(days=3), FlightOffer.from_response([raw_offer(other, "300")]))
+
+    assert calendar.complete
+    assert [(day.departure_date, day.return_date, day.total) for day in calendar.sorted_days()] == [
+        (DAY, DAY + timedelta(days=3), 350), (other, other + timedelta(days=3), 300)]
+    assert calendar.cheapest().departure_date == other
+    assert [offer.total for offer in calendar.offers()] == [300, 350]
+
+
+def test_searches_every_pair_a_few_at_a_time(monkeypatch):
+    monkeypatch.setattr(flight_service_module, "FLEX_CONCURRENCY", 2)
+    pairs = [(DAY + timedelta(days=n), DAY + timedelta(days=n + 3)) for n in range(5)]
+    upstream = Upstream({str(departure): [str(500 - 10 * n)] for n, (departure, _) in enumerate(pairs)})
+
+    result = search(upstream, pairs)
+
+    calendar = result["data"]
+    assert result["success"] and calendar.complete and len(calendar.days) == 5
+    assert calendar.cheapest().total == 460
+    assert upstream.most_in_flight == 2
+
+
+def test_answers_with_the_days_found_by_the_deadline():
+    pairs = [(DAY + timedelta(days=n), DAY + timedelta(days=n + 3)) for n in range(3)]
+    slow = str(DAY + timedelta(days=2))
+    upstream = Upstream({str(departure): ["300"] for departure, _ in pairs}, delays={slow: 5})
+
+    result = search(upstream, pairs, budget=0.5)
+
+    calendar = result["data"]
+    assert result["success"] and not calendar.complete
+    assert (calendar.planned, calendar.searched) == (3, 2)
+    assert sorted(calendar.days) == [DAY, DAY + timedelta(days=1)]
+
+
+def test_nothing_found_by_the_deadline_is_a_failure():
+    pairs = [(DAY, DAY + timedelta(days=3))]
+    upstream = Upstream({str(DAY): ["300"]}, delays={str(DAY): 5})
+
+    result = search(upstream, pairs, budget=0.2)
+
+    assert not result["success"] and result["message"] == "No flights found matching your criteria"
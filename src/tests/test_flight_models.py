@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from services.flight_models import FlightOffer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "upstream_stub", "fixtures")
+
+
+@pytest.fixture
+def offer():
+    """A stub offer whose outbound takes PT7H and whose first segment P1DT2H, as Amadeus may write them"""
+    with open(os.path.join(FIXTURES, "flight_offers.json"), encoding="utf-8") as f:
+        raw = json.load(f)["data"][0]
+    raw["itineraries"][0]["duration"] = "PT7H"
+    raw["itineraries"][0]["segments"][0]["duration"] = "P1DT2H"
+    return FlightOffer.from_json(raw)
+
+
+def test_durations_are_kept_as_sent(offer):
+    assert offer.outbound.duration_minutes == 7 * 60
+    assert offer.outbound.segments[0].duration_minutes == 26 * 60
+    again = FlightOffer.from_json(json.loads(json.dumps(offer.to_json())))
+    assert again.outbound.duration == "PT7H"
+    assert again.outbound.segments[0].duration == "P1DT2H"
+
+
+def test_shown_and_booked_durations_are_unchanged(offer):
+    pytest.importorskip("rasa_sdk")
+    pytest.importorskip("rasa")
+    from actions import db
+    from actions.book_flight import ActionSearchFlights
+
+    assert "(7h )" in ActionSearchFlights().format_flight_offer(offer, 1)
+    assert db._extract_flight_segment(offer.outbound)["duration"] == "P1DT2H"
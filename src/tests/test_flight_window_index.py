@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+pytest.importorskip("rasa")
+
+from actions import db
+from actions.db import FlightWindowIndex, SQLiteUserStore
+
+
+def leg(departure_airport, departure_time, arrival_airport, arrival_time, number):
+    return {"departureAirport": departure_airport, "departureTime": departure_time,
+            "arrivalAirport": arrival_airport, "arrivalTime": arrival_time, "flightNumber": number}
+
+
+def round_trip(flight_id, day, status="confirmed"):
+    return {"id": flight_id, "status": status,
+            "outboundFlight": leg("JFK", f"2027-05-{day:02d}T10:00:00", "LHR", f"2027-05-{day:02d}T22:00:00", "BA1"),
+            "returnFlight": leg("LHR", f"2027-05-{day + 7:02d}T09:00:00", "JFK", f"2027-05-{day + 7:02d}T12:00:00",
+                                "BA2")}
+
+
+USERS = [
+    {"id": 1, "name": {"firstName": "Ada", "lastName": "Lovelace"}, "flights": [round_trip(1, 1), round_trip(2, 3)]},
+    {"id": 2, "name": {"firstName": "Alan", "lastName": "Turing"},
+     "flights": [round_trip(1, 2), round_trip(2, 4, status="cancelled")]},
+]
+
+
+def flights(segments):
+    return [(segment["userId"], segment["flightId"], segment["flightNumber"]) for segment in segments]
+
+
+def test_window_across_all_airports_and_at_one():
+    index = FlightWindowIndex()
+    for position, user in enumerate(USERS):
+        index.set_user(position, user)
+
+    # cancelled bookings are left out
+    assert len(index) == 6
+    assert flights(index.window("2027-05-01", "2027-05-04")) == [(1, 1, "BA1"), (2, 1, "BA1"), (1, 2, "BA1")]
+    assert flights(index.window("2027-05-08", "2027-05-11", airport="LHR")) == [
+        (1, 1, "BA2"), (2, 1, "BA2"), (1, 2, "BA2")]
+    assert index.window("2027-05-08", "2027-05-11", airport="JFK") == []
+    # the end of the window is excluded
+    assert flights(index.window("2027-05-01T10:00:00", "2027-05-02T10:00:00")) == [(1, 1, "BA1")]
+
+
+def test_window_by_arrival_time():
+    index = FlightWindowIndex()
+    index.set_user(0, USERS[0])
+    assert flights(index.window("2027-05-01T20:00:00", "2027-05-02", airport="LHR", event="arrival")) == [
+        (1, 1, "BA1")]
+    assert index.window("2027-05-01T20:00:00", "2027-05-02", airport="JFK", event="arrival") == []
+
+
+def test_a_user_whose_bookings_change_is_reindexed():
+    index = FlightWindowIndex()
+    index.set_user(0, USERS[0])
+    index.set_user(0, dict(USERS[0], flights=[round_trip(1, 1, status="cancelled"), round_trip(2, 3)]))
+    assert flights(index.window("2027-05-01", "2027-06-01")) == [(1, 2, "BA1"), (1, 2, "BA2")]
+    index.remove_user(0)
+    assert len(index) == 0 and index.window("2027-05-01", "2027-06-01") == []
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_both_stores_answer_window_queries_alike(tmp_path, monkeypatch, backend):
+    if backend == "json":
+        path = tmp_path / "database.json"
+        path.write_text(json.dumps({"users": USERS}))
+        monkeypatch.setattr(db, "DATABASE_PATH", str(path))
+        store = db.JSONUserStore()
+    else:
+        store = SQLiteUserStore(str(tmp_path / "database.sqlite"))
+        store.write_all({"users": USERS})
+
+    assert flights(store.flights_in_window("2027-05-01", "2027-05-04", airport="JFK")) == [
+        (1, 1, "BA1"), (2, 1, "BA1"), (1, 2, "BA1")]
+    # a booking and a cancellation show up in the next query
+    assert store.add_flight(2, round_trip(3, 5))
+    assert store.cancel_flight(1, 2)
+    assert flights(store.flights_in_window("2027-05-01", "2027-05-06", airport="JFK")) == [
+        (1, 1, "BA1"), (2, 1, "BA1"), (2, 3, "BA1")]
+    assert flights(store.flights_in_window("2027-05-12T11:00:00", "2027-05-13", airport="JFK", event="arrival")) == [
+        (2, 3, "BA2")]
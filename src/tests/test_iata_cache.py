@@ -0,0 +1,13 @@
+import os
+
+from services.iata_cache import IATACache
+
+
+def test_sqlite_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "db" / "iata_cache.sqlite"
+    cache = IATACache(path=str(path))
+    assert not os.path.exists(tmp_path / "db")
+
+    cache.store("Nome", "OME")
+    assert path.exists()
+    assert IATACache(path=str(path)).lookup("nome") == (True, "OME")
@@ -0,0 +1,105 @@
+import asyncio
+
+from services.airport_index import airport_index, distance_km
+from services.flight_service import FlightService
+
+
+def raw_offer(origin, destination, number, total):
+    return {
+        "id": "1",
+        "price": {"total": total, "currency": "USD"},
+        "itineraries": [{"duration": "PT7H", "segments": [{
+            "departure": {"iataCode": origin, "at": "2027-05-01T10:00:00"},
+            "arrival": {"iataCode": destination, "at": "2027-05-01T22:00:00"},
+            "carrierCode": "BA", "number": str(number), "duration": "PT7H", "numberOfStops": 0,
+        }]}],
+        "validatingAirlineCodes": ["BA"],
+    }
+
+
+class Upstream:
+    """Amadeus answering each airport pair with the offers given for it"""
+
+    def __init__(self, offers=None, destinations=None):
+        self.offers = offers or {}
+        self.destinations = destinations or {}
+        self.searched = []
+
+    async def get_access_token_async(self):
+        return "token"
+
+    async def get_iata_code_async(self, location):
+        return {"new york": "NYC", "london": "LON", "jfk": "JFK", "madrid": "MAD"}.get(location.lower())
+
+    async def search_flight_offers_async(self, params):
+        pair = (params["originLocationCode"], params["destinationLocationCode"])
+        self.searched.append(pair)
+        return {"data": self.offers.get(pair, [])[:params["max"]]}
+
+    async def search_flight_destinations_async(self, params):
+        self.searched.append(params["origin"])
+        return {"data": self.destinations.get(params["origin"], [])}
+
+
+def service(upstream):
+    flight_service = FlightService()
+    flight_service.amadeus_service = upstream
+    return flight_service
+
+
+def test_airports_near_a_city_nearest_first():
+    assert airport_index.airports_near("NYC", 80) == ["LGA", "JFK", "EWR"]
+    assert airport_index.airports_near("NYC", 80, limit=2) == ["LGA", "JFK"]
+    assert airport_index.airports_near("MAD", 80) == ["MAD"]
+    assert airport_index.airports_near("XXX", 80) == []
+    assert round(distance_km(*airport_index.location("JFK"), *airport_index.location("LHR"))) in range(5530, 5560)
+
+
+def test_a_city_is_searched_at_each_airport_and_an_airport_only_there():
+    flight_service = FlightService()
+    assert flight_service._airports("New York", "NYC") == ["LGA", "JFK", "EWR"]
+    assert flight_service._airports("jfk", "JFK") == ["JFK"]
+    pairs = flight_service._airport_pairs("New York", "NYC", "London", "LON")
+    assert pairs == [("LGA", "LCY"), ("LGA", "LHR"), ("JFK", "LCY"), ("LGA", "LTN"), ("JFK", "LHR"), ("EWR", "LCY")]
+    assert flight_service._airport_pairs("JFK", "JFK", "Madrid", "MAD") == [("JFK", "MAD")]
+
+
+def test_offers_of_every_pair_are_merged_cheapest_first():
+    upstream = Upstream(offers={
+        ("LGA", "LCY"): [raw_offer("LGA", "LCY", 1, "500"), raw_offer("LGA", "LCY", 2, "520")],
+        ("JFK", "LHR"): [raw_offer("JFK", "LHR", 1, "450")],
+    })
+
+    result = asyncio.run(service(upstream).get_flight_offers_async("New York", "London", "2027-05-01", "1",
+                                                                   max_results=2))
+
+    assert len(upstream.searched) == 6
+    assert [(offer["itineraries"][0]["segments"][0]["departure"]["iataCode"], offer["price"]["total"], offer["id"])
+            for offer in result["data"]] == [("JFK", "450", "1"), ("LGA", "500", "2"), ("LGA", "520", "3")]
+    # only LGA-LCY filled the page asked for, so only it may have more
+    assert [(query["originLocationCode"], query["destinationLocationCode"]) for query in result["query"]] == [
+        ("LGA", "LCY")]
+    assert not result["exhausted"]
+
+
+def test_the_same_offer_from_two_searches_is_kept_once():
+    same = raw_offer("JFK", "LHR", 117, "450")
+    upstream = Upstream(offers={("JFK", "LHR"): [same], ("JFK", "LCY"): [dict(same, id="7")]})
+
+    result = asyncio.run(service(upstream).get_flight_offers_async("New York", "London", "2027-05-01", "1"))
+
+    assert [offer["price"]["total"] for offer in result["data"]] == ["450"]
+    assert result["exhausted"]
+
+
+def test_destinations_from_every_airport_keep_the_cheapest_per_trip():
+    def destination(origin, total):
+        return {"origin": origin, "destination": "MAD", "departureDate": "2027-05-01",
+                "returnDate": "2027-05-08", "price": {"total": total}}
+    upstream = Upstream(destinations={"LGA": [destination("LGA", "320")], "JFK": [destination("JFK", "290")],
+                                      "EWR": [dict(destination("EWR", "150"), destination="MIA")]})
+
+    result = asyncio.run(service(upstream).search_flights_async("New York"))
+
+    assert sorted(upstream.searched) == ["EWR", "JFK", "LGA"]
+    assert [(entry["origin"], entry["destination"]) for entry in result["data"]] == [("EWR", "MIA"), ("JFK", "MAD")]
@@ -0,0 +1,131 @@
+import asyncio
+
+from services import result_store as result_store_module
+from services.flight_models import FlightOffer
+from services.flight_service import FlightService
+from services.result_store import ResultPages, ResultStore, fetch_page
+
+
+def raw_offer(origin, number, total):
+    """A one-segment Amadeus flight offer from ``origin`` to LHR"""
+    return {
+        "id": "1",
+        "price": {"total": total, "currency": "USD"},
+        "itineraries": [{"duration": "PT7H", "segments": [{
+            "departure": {"iataCode": origin, "at": "2027-05-01T10:00:00"},
+            "arrival": {"iataCode": "LHR", "at": "2027-05-01T22:00:00"},
+            "carrierCode": "BA", "number": str(number), "duration": "PT7H", "numberOfStops": 0,
+        }]}],
+        "validatingAirlineCodes": ["BA"],
+    }
+
+
+class Upstream:
+    """flight-offers that returns the first ``max`` offers of each origin, cheapest first"""
+
+    def __init__(self, offers, failing=()):
+        self.offers = offers
+        self.failing = set(failing)
+        self.requests = []
+
+    async def search_flight_offers_async(self, params):
+        self.requests.append(dict(params))
+        origin = params["originLocationCode"]
+        if origin in self.failing:
+            return None
+        return {"data": self.offers[origin][:params["max"]]}
+
+
+def params(origin, size):
+    return {"originLocationCode": origin, "destinationLocationCode": "LHR", "max": size}
+
+
+def first_page(upstream, *origins, page_size=3):
+    """What the search stored: the first page and one more offer, per origin asked for"""
+    queries = [params(origin, page_size + 1) for origin in origins]
+    offers = [offer for query in queries for offer in upstream.offers[query["originLocationCode"]][:query["max"]]]
+    return ResultPages(FlightOffer.from_response(offers), page_size=page_size, query=queries, exhausted=False)
+
+
+def service(upstream):
+    flight_service = FlightService()
+    flight_service.amadeus_service = upstream
+    return flight_service
+
+
+def test_fetch_more_asks_for_one_more_page_and_keeps_only_new_offers():
+    upstream = Upstream({"JFK": [raw_offer("JFK", n, str(100 + n)) for n in range(8)]})
+    pages = first_page(upstream, "JFK")
+
+    assert asyncio.run(service(upstream).fetch_more_offers_async(pages))
+    assert upstream.requests[-1]["max"] == 8
+    assert [offer.total for offer in pages.items] == [100 + n for n in range(8)]
+    assert pages.query == [params("JFK", 8)] and not pages.exhausted
+
+    # upstream has nothing beyond the 8 offers
+    assert not asyncio.run(service(upstream).fetch_more_offers_async(pages))
+    assert upstream.requests[-1]["max"] == 12
+    assert len(pages.items) == 8 and pages.exhausted and pages.query == []
+
+
+def test_fetch_more_merges_airports_cheapest_first_and_renumbers_the_offers():
+    upstream = Upstream({
+        "JFK": [raw_offer("JFK", n, str(100 + 10 * n)) for n in range(6)],
+        "EWR": [raw_offer("EWR", n, str(105 + 10 * n)) for n in range(6)],
+    })
+    pages = first_page(upstream, "JFK", "EWR")
+    fetched = len(pages.items)
+
+    asyncio.run(service(upstream).fetch_more_offers_async(pages))
+
+    added = pages.items[fetched:]
+    assert [(offer.outbound.departure.departure_airport, offer.total) for offer in added] == [
+        ("JFK", 140), ("EWR", 145), ("JFK", 150), ("EWR", 155)]
+    # ids are numbered in the merged response, where the added offers came 9th to 12th
+    assert [offer.id for offer in added] == ["9", "10", "11", "12"]
+    # the same flight from another airport is a different offer; none came back twice
+    assert len({offer.key for offer in pages.items}) == len(pages.items) == 12
+
+
+def test_a_failed_search_is_retried_as_it_was():
+    upstream = Upstream({"JFK": [raw_offer("JFK", n, str(100 + n)) for n in range(8)],
+                         "EWR": [raw_offer("EWR", n, str(100 + n)) for n in range(8)]})
+    pages = first_page(upstream, "JFK", "EWR")
+    upstream.failing.add("EWR")
+
+    assert asyncio.run(service(upstream).fetch_more_offers_async(pages))
+    assert pages.query == [params("JFK", 8), params("EWR", 4)]
+
+
+def test_when_upstream_fails_the_pages_stay_as_they_were():
+    upstream = Upstream({"JFK": [raw_offer("JFK", n, str(100 + n)) for n in range(8)]}, failing=["JFK"])
+    pages = first_page(upstream, "JFK")
+
+    assert not asyncio.run(service(upstream).fetch_more_offers_async(pages))
+    assert len(pages.items) == 4 and pages.query == [params("JFK", 4)] and not pages.exhausted
+
+
+def test_fetch_page_fetches_until_the_page_and_the_next_offer_are_there(tmp_path, monkeypatch):
+    store = ResultStore(directory=str(tmp_path))
+    monkeypatch.setattr(result_store_module, "result_store", store)
+    upstream = Upstream({"JFK": [raw_offer("JFK", n, str(100 + n)) for n in range(30)]})
+    pages = first_page(upstream, "JFK")
+    handle = store.put("flight-offers", pages)
+
+    asyncio.run(fetch_page(handle, pages, 2, service(upstream).fetch_more_offers_async))
+
+    assert [request["max"] for request in upstream.requests] == [8, 12]
+    # saved as fetched, so another action server sees the new offers
+    assert len(ResultStore(directory=str(tmp_path)).get(handle).items) == 12
+
+
+def test_pages_render_once_complete():
+    pages = ResultPages(list(range(5)), page_size=3, exhausted=False)
+    render = lambda start, items: f"{start}:{items}"  # noqa: E731
+
+    assert pages.render(1, render) == "3:[3, 4]"
+    assert "1" not in pages.rendered  # more may still come for the last page
+    assert pages.render(0, render) == "0:[0, 1, 2]" and pages.rendered["0"] == "0:[0, 1, 2]"
+    assert pages.has_page(2) and pages.needs_fetch(1) and not pages.needs_fetch(0)
+    pages.exhausted = True
+    assert not pages.has_page(2) and not pages.needs_fetch(1)
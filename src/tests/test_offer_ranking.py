@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from services.offer_ranking import rank_offers, top_k
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 5])
+def test_top_k_keeps_original_order_among_ties(k):
+    scores = np.array([0.5, 0.1, 0.5, 0.5, 0.1])
+    assert list(top_k(scores, k)) == list(np.argsort(scores, kind="stable")[:k])
+
+
+def test_top_k_of_nothing():
+    assert list(top_k(np.array([0.3]), 0)) == []
+    assert list(top_k(np.array([]), 3)) == []
+
+
+def test_rank_offers_puts_the_best_first_and_keeps_the_rest_in_order(offers_priced):
+    offers = offers_priced("900", "300", "500", "700", "300")
+    ranked = rank_offers(offers, k=2)
+    assert [offer.id for offer in ranked] == ["2", "5", "1", "3", "4"]
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from services import amadeus_service as amadeus_service_module
+from services.amadeus_service import AmadeusService
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import RateLimitedError, RateLimiter, TokenBucket, is_retryable
+
+
+class Response:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+
+def test_a_wait_longer_than_allowed_takes_no_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.reserve(max_wait=0) == 0
+    assert bucket.reserve(max_wait=0.1) > 0.1
+    # the refused call left the next one where it was
+    assert 0.8 < bucket.reserve() <= 1.0
+
+    limiter = RateLimiter()
+    limiter.throttle("flight-offers", 30)
+    with pytest.raises(RateLimitedError) as error:
+        limiter.acquire("flight-offers", max_wait=1)
+    assert error.value.retry_after > 29
+    assert limiter.stats()["used"] == {}
+
+
+@pytest.fixture
+def amadeus(monkeypatch):
+    """AmadeusService with its own rate limiter and breaker, answering each GET from ``responses``"""
+    responses = []
+    gets = []
+
+    def get(url, **kwargs):
+        gets.append(url)
+        return responses.pop(0)
+
+    monkeypatch.setattr(amadeus_service_module.http_client, "get", get)
+    monkeypatch.setattr(amadeus_service_module, "amadeus_rate_limiter", RateLimiter())
+    monkeypatch.setattr(amadeus_service_module, "breaker",
+                        CircuitBreaker("test", failure_threshold=10, is_failure=is_retryable))
+    monkeypatch.setattr(AmadeusService, "SYNC_DEADLINE", 1.0)
+    service = AmadeusService()
+    monkeypatch.setattr(service, "get_access_token", lambda: "token")
+    return service, responses, gets
+
+
+def test_a_long_retry_after_falls_back_to_the_last_good_response_at_once(amadeus):
+    service, responses, gets = amadeus
+    responses += [Response(200, {"data": ["cached"]}), Response(429, headers={"Retry-After": "30"})]
+    assert service._get("https://test/v1/shopping/flight-offers", {"max": 1}) == {"data": ["cached"]}
+
+    # the same search again: Amadeus asks for 30s, more than a blocking call may wait
+    started = time.monotonic()
+    assert service._get("https://test/v1/shopping/flight-offers", {"max": 1}) == {"data": ["cached"]}
+    assert time.monotonic() - started < 0.5
+    assert len(gets) == 2
+
+
+def test_a_long_retry_after_without_a_fallback_fails_fast(amadeus):
+    service, responses, gets = amadeus
+    responses += [Response(429, headers={"Retry-After": "30"})]
+
+    started = time.monotonic()
+    with pytest.raises(RateLimitedError):
+        service._get("https://test/v1/shopping/flight-offers", {"max": 2})
+    assert time.monotonic() - started < 0.5
+    assert len(gets) == 1
+
+
+def test_a_short_retry_after_is_waited_for_within_the_deadline(amadeus):
+    service, responses, gets = amadeus
+    responses += [Response(429, headers={"Retry-After": "0.2"}), Response(200, {"data": ["fresh"]})]
+    assert service._get("https://test/v1/shopping/flight-offers", {"max": 3}) == {"data": ["fresh"]}
+    assert len(gets) == 2
@@ -0,0 +1,31 @@
+import threading
+
+from services.response_cache import ResponseCache
+
+
+def expired_cache():
+    cache = ResponseCache()
+    cache.ttls = {"flight-offers": -1, "flight-destinations": -1}
+    cache.put("flight-offers", {"origin": "JFK"}, {"data": ["old offer"]})
+    cache.put("flight-destinations", {"origin": "JFK"}, {"data": ["old destination"]})
+    return cache
+
+
+def test_expired_flight_offers_are_fetched_again():
+    cache = expired_cache()
+    assert cache.get_or_fetch("flight-offers", {"origin": "JFK"}, lambda: {"data": ["new offer"]}) == \
+        {"data": ["new offer"]}
+    assert cache.stale_hits == 0
+
+
+def test_expired_destinations_are_served_while_refreshed():
+    cache = expired_cache()
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return {"data": ["new destination"]}
+
+    assert cache.get_or_fetch("flight-destinations", {"origin": "JFK"}, fetch) == {"data": ["old destination"]}
+    assert cache.stale_hits == 1
+    assert refreshed.wait(5)
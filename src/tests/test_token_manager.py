@@ -0,0 +1,22 @@
+import requests
+
+from services import token_manager
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import is_retryable
+from services.token_manager import OAuthTokenManager
+
+
+def test_token_fetch_stops_once_the_circuit_opens(monkeypatch):
+    posts = []
+
+    def post(url, **kwargs):
+        posts.append(url)
+        raise requests.exceptions.ConnectTimeout("auth server unreachable")
+
+    monkeypatch.setattr(token_manager.http_client, "post", post)
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60, is_failure=is_retryable)
+    manager = OAuthTokenManager("https://auth.test/token", "id", "secret", breaker=breaker)
+
+    assert [manager.get_token() for _ in range(5)] == [None] * 5
+    assert len(posts) == 2
+    assert breaker.stats()["state"] == "open"
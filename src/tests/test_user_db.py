@@ -0,0 +1,157 @@
+import json
+import os
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("rasa")
+
+from actions import db
+from actions.db import Journal, _write_snapshot
+
+
+def test_snapshot_keeps_the_file_permissions(tmp_path):
+    path = tmp_path / "database.json"
+    path.write_text("{}")
+    os.chmod(path, 0o644)
+    _write_snapshot(str(path), {"users": []})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert json.loads(path.read_text()) == {"users": []}
+    assert os.listdir(tmp_path) == ["database.json"]
+
+
+def test_journal_counts_only_written_bytes(tmp_path):
+    journal = Journal(str(tmp_path / "database.json.journal"))
+    journal.append({"op": "add_flight", "user_id": 1}).result(5)
+    assert journal.size == os.path.getsize(journal.path)
+    assert Journal.read(journal.path) == [{"op": "add_flight", "user_id": 1}]
+
+    missing = Journal(str(tmp_path / "missing" / "database.json.journal"))
+    with pytest.raises(OSError):
+        missing.append({"op": "add_flight", "user_id": 1}).result(5)
+    assert missing.size == 0
+
+
+def make_store(tmp_path, monkeypatch):
+    """A JSON store over a database.json with two users, as another process would open it"""
+    path = tmp_path / "database.json"
+    if not path.exists():
+        path.write_text(json.dumps({"users": [
+            {"id": 1, "name": {"firstName": "Ada", "lastName": "Lovelace"}, "flights": []},
+            {"id": 2, "name": {"firstName": "Alan", "lastName": "Turing"}},
+        ]}))
+    monkeypatch.setattr(db, "DATABASE_PATH", str(path))
+    return db.JSONUserStore()
+
+
+def booking(flight_id):
+    return {"id": flight_id, "status": "confirmed",
+            "outboundFlight": {"departureTime": f"2027-05-0{flight_id}T10:00:00", "departureAirport": "JFK",
+                               "arrivalAirport": "LHR", "flightNumber": f"BA{flight_id}"}}
+
+
+def test_concurrent_appends_share_fsyncs(tmp_path, monkeypatch):
+    monkeypatch.setattr(Journal, "GROUP_COMMIT_WINDOW", 0.05)
+    journal = Journal(str(tmp_path / "database.json.journal"))
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        futures = list(pool.map(lambda i: journal.append({"op": "add_flight", "user_id": i}), range(20)))
+    assert all(future.result(5) for future in futures)
+    assert journal.records == 20 and journal.batches < 20
+    assert sorted(record["user_id"] for record in Journal.read(journal.path)) == list(range(20))
+
+
+def test_a_change_is_journaled_and_seen_by_another_process(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    assert store.add_flight(1, booking(1))
+    assert store.update_user(2, {"preferredDepartureCity": "London"})
+
+    # the snapshot is untouched; the changes are in the journal
+    assert json.loads((tmp_path / "database.json").read_text())["users"][0]["flights"] == []
+    assert [record["op"] for record in Journal.read(str(tmp_path / "database.json.journal"))] == [
+        "add_flight", "update_user"]
+
+    other = make_store(tmp_path, monkeypatch)
+    assert [flight["id"] for flight in other.by_id(1).to_dict()["flights"]] == [1]
+    assert other.by_id(2).preferred_departure_city == "London"
+    # and a process that had loaded before sees the journal grow
+    assert store.add_flight(1, booking(2)) and len(other.by_id(1).to_dict()["flights"]) == 2
+
+
+def test_replay_after_a_crash_skips_the_torn_record(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    assert store.add_flight(1, booking(1))
+    # the process died halfway through writing the next record
+    with open(tmp_path / "database.json.journal", "ab") as f:
+        f.write(b'{"op": "add_flight", "user_id": 1, "flight": {"id": 2')
+
+    restarted = make_store(tmp_path, monkeypatch)
+    assert [flight["id"] for flight in restarted.by_id(1).to_dict()["flights"]] == [1]
+    # the next record starts on a line of its own and survives another restart
+    assert restarted.add_flight(1, booking(3))
+    assert [flight["id"] for flight in make_store(tmp_path, monkeypatch).by_id(1).to_dict()["flights"]] == [1, 3]
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    for flight_id in (1, 2, 3):
+        assert store.add_flight(1, booking(flight_id))
+    store.compact()
+
+    assert not os.path.exists(tmp_path / "database.json.journal")
+    assert [flight["id"] for flight in json.loads((tmp_path / "database.json").read_text())["users"][0]["flights"]] == [
+        1, 2, 3]
+    assert store.add_flight(1, booking(4))
+    assert len(make_store(tmp_path, monkeypatch).by_id(1).to_dict()["flights"]) == 4
+
+
+def test_compaction_starts_in_the_background_once_the_journal_is_long(tmp_path, monkeypatch):
+    monkeypatch.setattr(db.JSONUserStore, "COMPACT_RECORDS", 3)
+    store = make_store(tmp_path, monkeypatch)
+    for flight_id in (1, 2, 3):
+        assert store.add_flight(1, booking(flight_id))
+    deadline = time.time() + 5
+    while store.compactions == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.compactions == 1
+    assert len(json.loads((tmp_path / "database.json").read_text())["users"][0]["flights"]) == 3
+
+
+def test_an_interrupted_compaction_loses_nothing(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    assert store.add_flight(1, booking(1))
+    # crashed after moving the journal aside, before writing the snapshot
+    os.replace(tmp_path / "database.json.journal", tmp_path / "database.json.journal.compacting")
+
+    restarted = make_store(tmp_path, monkeypatch)
+    assert restarted.add_flight(1, booking(2))
+    assert [flight["id"] for flight in restarted.by_id(1).to_dict()["flights"]] == [1, 2]
+    restarted.compact()
+    assert not os.path.exists(tmp_path / "database.json.journal.compacting")
+    # the journal kept its newer record, which the snapshot has too; replaying it again is harmless
+    assert [flight["id"] for flight in json.loads((tmp_path / "database.json").read_text())["users"][0]["flights"]] == [
+        1, 2]
+    assert [flight["id"] for flight in make_store(tmp_path, monkeypatch).by_id(1).to_dict()["flights"]] == [1, 2]
+
+
+def test_users_are_found_by_first_name_or_by_full_name(tmp_path, monkeypatch):
+    path = tmp_path / "database.json"
+    path.write_text(json.dumps({"users": [
+        {"id": 1, "name": {"firstName": "Ada", "lastName": "Lovelace"}},
+        {"id": 2, "name": {"firstName": "Ada", "lastName": "Yonath"}},
+        {"id": 3, "name": {"firstName": "Alan", "lastName": "Turing"}},
+    ]}))
+    store = make_store(tmp_path, monkeypatch)
+
+    assert store.by_name("ada").id == 1
+    assert store.by_name(" ADA ", "yonath").id == 2
+    assert store.by_name("Ada", "Turing") is None and store.by_name("Grace") is None
+    # the full-name index is the only one consulted for a last name
+    assert store._by_full_name[("ada", "yonath")] == [1]
+
+    assert store.update_user(2, {"name": {"lastName": "E. Yonath"}})
+    assert store.add_user({"id": 4, "name": {"firstName": "Ada", "lastName": "Yonath"}})
+    assert store.by_name("Ada", "e. yonath").id == 2
+    assert store.by_name("Ada", "Yonath").id == 4
+    assert make_store(tmp_path, monkeypatch).by_name("ada", "YONATH").id == 4
@@ -2,6 +2,8 @@ from flask import Flask, request, jsonify
 from src.services.amadeus_service import AmadeusService
 from src.services.flight_service import FlightService
 from src.services.ynab_service import YNABService
+from src.services.http_client import http_client
+from src.services.circuit_breaker import breaker_states
 from dotenv import load_dotenv
 import os
 
@@ -20,6 +22,26 @@ def health_check():
     """Simple health check endpoint"""
     return jsonify({"status": "healthy"})
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Upstream client counters (token fetches, caches, connection pools)"""
+    return jsonify({
+        "success": True,
+        "data": {
+            "token": amadeus_service.token_stats(),
+            "iata_cache": amadeus_service.iata_cache_stats(),
+            "response_cache": amadeus_service.response_cache_stats(),
+            "single_flight": amadeus_service.single_flight_stats(),
+            "rate_limit": amadeus_service.rate_limit_stats(),
+            "http": http_client.stats()
+        }
+    })
+
+@app.route('/api/circuit-breakers', methods=['GET'])
+def get_circuit_breakers():
+    """State of the circuit breaker for each upstream"""
+    return jsonify({"success": True, "data": breaker_states()})
+
 # Amadeus Service Endpoints
 @app.route('/api/iata-code', methods=['GET'])
 def get_iata_code():
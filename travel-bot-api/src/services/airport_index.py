@@ -0,0 +1,272 @@
+import csv
+import math
+import os
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Any, Tuple
+
+from .iata_cache import normalize_location
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "airports.csv")
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _deletes(key: str) -> List[str]:
+    """The key itself plus every string with one character removed"""
+    return [key] + [key[:i] + key[i + 1:] for i in range(len(key))]
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class AirportIndex:
+    """Offline airport/city lookup built once from the bundled airports.csv.
+
+    Names, city names and codes are normalized into one sorted key array with a
+    parallel array of IATA codes, so exact and prefix lookups are a binary search.
+    ``resolve`` only answers exact names and codes. The bundled list is far
+    from every place people fly from, so prefixes and typos are left to
+    ``suggest``, which callers ask only once Amadeus does not know the place
+    either. Otherwise "Nome" would be taken for Rome. ``correct`` is the one
+    guess trusted up front: a single slip in a name of ``CORRECT_MIN_LENGTH``
+    characters or more, such as "new yrok". Typos are matched
+    through a second sorted array of single-character deletions of every key
+    (symmetric delete), then confirmed with a bounded edit distance.
+    Airport rows are kept column-wise (parallel lists/arrays) rather than as dicts.
+
+    For "airports near here" the rows are also bucketed into a grid of
+    ``CELL_DEGREES`` cells; a radius query only measures the airports in the
+    cells the radius overlaps.
+    """
+
+    MIN_PREFIX = 4
+    CORRECT_MIN_LENGTH = 5
+    CELL_DEGREES = 1.0
+
+    def __init__(self, path: str = DATA_PATH):
+        self.iata = []
+        self.city_code = []
+        self.name = []
+        self.city = []
+        self.country = []
+        self.lat = array("d")
+        self.lon = array("d")
+        self._keys = []
+        self._codes = []
+        self._variants = []
+        self._variant_keys = array("I")
+        self._code_keys = set()
+        self._rows = {}
+        self._cells = {}
+        self._load(path)
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+        except OSError as e:
+            print(f"Error loading airport data from {path}: {e}")
+            return
+
+        entries = {}
+        for row in rows:
+            self.iata.append(row["iata"])
+            self.city_code.append(row["city_code"])
+            self.name.append(row["name"])
+            self.city.append(row["city"])
+            self.country.append(row["country"])
+            self.lat.append(float(row["lat"]))
+            self.lon.append(float(row["lon"]))
+            self._rows.setdefault(row["iata"], len(self.iata) - 1)
+            self._cells.setdefault(self._cell(self.lat[-1], self.lon[-1]), array("I")).append(len(self.iata) - 1)
+
+            # First occurrence wins, so list the main airport of a city first
+            for key, code in (
+                (row["iata"], row["iata"]),
+                (row["city_code"], row["city_code"]),
+                (row["city"], row["city_code"]),
+                (row["name"], row["iata"]),
+            ):
+                entries.setdefault(normalize_location(key), code)
+        names = {normalize_location(row[column]) for row in rows for column in ("city", "name")}
+        self._code_keys = {normalize_location(row[column]) for row in rows
+                           for column in ("iata", "city_code")} - names
+
+        for key in sorted(entries):
+            self._keys.append(key)
+            self._codes.append(entries[key])
+
+        variants = sorted(
+            (variant, i) for i, key in enumerate(self._keys) if len(key) >= self.MIN_PREFIX
+            for variant in set(_deletes(key))
+        )
+        self._variants = [variant for variant, _ in variants]
+        self._variant_keys = array("I", (i for _, i in variants))
+
+    def __len__(self) -> int:
+        return len(self.iata)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.CELL_DEGREES)), int(math.floor(lon / self.CELL_DEGREES))
+
+    def _exact(self, key: str) -> Optional[str]:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._codes[i]
+        return None
+
+    def complete(self, prefix: str, limit: int = 5) -> List[str]:
+        """IATA codes whose name, city or code starts with ``prefix``"""
+        key = normalize_location(prefix)
+        codes = []
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i].startswith(key) and len(codes) < limit:
+            if self._codes[i] not in codes:
+                codes.append(self._codes[i])
+            i += 1
+        return codes
+
+    def _fuzzy(self, key: str, limit: Optional[int] = None) -> Optional[str]:
+        if limit is None:
+            limit = 1 if len(key) < 7 else 2
+        candidates = set()
+        for variant in set(_deletes(key)):
+            i = bisect_left(self._variants, variant)
+            while i < len(self._variants) and self._variants[i] == variant:
+                candidates.add(self._variant_keys[i])
+                i += 1
+
+        best, best_codes = limit + 1, set()
+        for i in candidates:
+            distance = _edit_distance(key, self._keys[i], limit)
+            if distance < best:
+                best, best_codes = distance, {self._codes[i]}
+            elif distance == best:
+                best_codes.add(self._codes[i])
+        if best <= limit and len(best_codes) == 1:
+            return best_codes.pop()
+        return None
+
+    def resolve(self, location: str) -> Optional[str]:
+        """IATA code of a city, airport or code spelled as in the index (case and accents aside), or None.
+
+        A code counts only typed in one case ("JFK", "jfk"): "San" is a word, not San Diego.
+        """
+        key = normalize_location(location)
+        if not key:
+            return None
+        text = location.strip()
+        if key in self._code_keys and not (text.isupper() or text.islower()):
+            return None
+        return self._exact(key)
+
+    def correct(self, location: str) -> Optional[str]:
+        """IATA code of the one place a misspelling is a single edit away from, or None.
+
+        Only for CORRECT_MIN_LENGTH characters or more; close enough to trust before asking Amadeus.
+        """
+        key = normalize_location(location)
+        if len(key) < self.CORRECT_MIN_LENGTH:
+            return None
+        return self._fuzzy(key, limit=1)
+
+    def suggest(self, location: str) -> Optional[str]:
+        """IATA code of the one place a prefix or misspelling (of at least MIN_PREFIX characters) can mean, or None.
+
+        A guess: only for places that are not known otherwise.
+        """
+        key = normalize_location(location)
+        if len(key) < self.MIN_PREFIX:
+            return None
+
+        matches = self.complete(key, limit=2)
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            return None
+        return self._fuzzy(key)
+
+    def location(self, code: str) -> Optional[Tuple[float, float]]:
+        """(lat, lon) of an airport, or the middle of a city's airports for a city code"""
+        code = code.upper()
+        i = self._rows.get(code)
+        if i is not None:
+            return self.lat[i], self.lon[i]
+        rows = [i for i, city_code in enumerate(self.city_code) if city_code == code]
+        if not rows:
+            return None
+        return sum(self.lat[i] for i in rows) / len(rows), sum(self.lon[i] for i in rows) / len(rows)
+
+    def near(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(IATA code, distance in km) of the airports within ``radius_km``, nearest first"""
+        lat_cells = int(math.ceil(radius_km / 111.0 / self.CELL_DEGREES))
+        # a degree of longitude shrinks towards the poles
+        lon_span = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        lon_cells = min(int(math.ceil(lon_span / self.CELL_DEGREES)), int(180 / self.CELL_DEGREES))
+        center_lat, center_lon = self._cell(lat, lon)
+        lon_count = int(360 / self.CELL_DEGREES)
+        found = []
+        for cell_lat in range(center_lat - lat_cells, center_lat + lat_cells + 1):
+            for offset in range(-lon_cells, lon_cells + 1):
+                # wrap around the antimeridian
+                cell_lon = (center_lon + offset + lon_count // 2) % lon_count - lon_count // 2
+                for i in self._cells.get((cell_lat, cell_lon), ()):
+                    distance = distance_km(lat, lon, self.lat[i], self.lon[i])
+                    if distance <= radius_km:
+                        found.append((self.iata[i], distance))
+        found.sort(key=lambda airport: airport[1])
+        return found[:limit] if limit else found
+
+    def airports_near(self, code: str, radius_km: float, limit: Optional[int] = None) -> List[str]:
+        """IATA codes of the airports within ``radius_km`` of an airport or city code, nearest first"""
+        location = self.location(code)
+        if location is None:
+            return []
+        return [iata for iata, _ in self.near(location[0], location[1], radius_km, limit)]
+
+    def airport(self, iata_code: str) -> Optional[Dict[str, Any]]:
+        """Details for one airport row"""
+        i = self._rows.get(iata_code.upper())
+        if i is None:
+            return None
+        return {
+            "iataCode": self.iata[i],
+            "cityCode": self.city_code[i],
+            "name": self.name[i],
+            "city": self.city[i],
+            "country": self.country[i],
+            "latitude": self.lat[i],
+            "longitude": self.lon[i],
+        }
+
+
+# Built once when the services package is first imported
+airport_index = AirportIndex()
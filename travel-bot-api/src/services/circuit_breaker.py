@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one upstream.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and calls
+    fail immediately. Once ``recovery_timeout`` has passed, up to
+    ``half_open_max_calls`` trial calls go through: a success closes it again,
+    a failure re-opens it. The last good result per key is kept so callers can
+    fall back to it while the upstream is unavailable.
+    """
+
+    FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+    HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+    FALLBACK_ENTRIES = 256
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 recovery_timeout: float = RECOVERY_TIMEOUT, half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+                 is_failure: Callable[[BaseException], bool] = lambda e: True):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._last_good = OrderedDict()
+
+        self.rejected = 0
+        self.fallbacks = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state, self._trial_calls = HALF_OPEN, 0
+            return self._state
+
+    def _before_call(self) -> None:
+        state = self.state
+        with self._lock:
+            if state == OPEN or (state == HALF_OPEN and self._trial_calls >= self.half_open_max_calls):
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            if state == HALF_OPEN:
+                self._trial_calls += 1
+
+    def _on_success(self, key: Optional[Hashable], result: Any) -> None:
+        with self._lock:
+            self._state, self._failures = CLOSED, 0
+            if key is not None and result is not None:
+                self._last_good[key] = result
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > self.FALLBACK_ENTRIES:
+                    self._last_good.popitem(last=False)
+
+    def _on_error(self, error: BaseException) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                    print(f"Opening {self.name} circuit after {self._failures} failures: {error}")
+                self._state, self._opened_at = OPEN, time.monotonic()
+
+    def _fallback(self, key: Optional[Hashable], error: BaseException) -> Any:
+        with self._lock:
+            if key is not None and key in self._last_good:
+                self.fallbacks += 1
+                return self._last_good[key]
+        raise error
+
+    def call(self, fn: Callable[[], Any], key: Optional[Hashable] = None) -> Any:
+        """Run ``fn`` through the breaker, falling back to the last good result for ``key``"""
+        try:
+            self._before_call()
+        except CircuitOpenError as e:
+            return self._fallback(key, e)
+        try:
+            result = fn()
+        except Exception as e:
+            if not self.is_failure(e):
+                # the upstream answered, it just rejected this request
+                self._on_success(None, None)
+                raise
+            self._on_error(e)
+            return self._fallback(key, e)
+        self._on_success(key, result)
+        return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], key: Optional[Hashable] = None) -> Any:
+        """Coroutine variant of call"""
+        try:
+            self._before_call()
+        except CircuitOpenError as e:
+            return self._fallback(key, e)
+        try:
+            result = await fn()
+        except Exception as e:
+            if not self.is_failure(e):
+                # the upstream answered, it just rejected this request
+                self._on_success(None, None)
+                raise
+            self._on_error(e)
+            return self._fallback(key, e)
+        self._on_success(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state and counters"""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "fallbacks": self.fallbacks,
+                "retry_in": max(0.0, round(self.recovery_timeout - (time.monotonic() - self._opened_at), 1))
+                if state == OPEN else 0.0,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Process-wide breaker for an upstream, created on first use"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Stats for every breaker created so far"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
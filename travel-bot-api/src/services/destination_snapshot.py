@@ -0,0 +1,314 @@
+import calendar
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .flight_models import Destination, parse_date, parse_duration_range, parse_price
+
+# (origin, departure month as "YYYY-MM", trip length in days)
+Bucket = Tuple[str, str, int]
+
+
+def _bucket_name(bucket: Bucket) -> str:
+    return "|".join(map(str, bucket))
+
+
+def _parse_bucket(name: str) -> Optional[Bucket]:
+    try:
+        origin, month, length = name.split("|")
+        return origin, month, int(length)
+    except ValueError:
+        return None
+
+
+def month_range(month: str) -> Tuple[date, date]:
+    """First and last day of a "YYYY-MM" month"""
+    year, number = map(int, month.split("-"))
+    return date(year, number, 1), date(year, number, calendar.monthrange(year, number)[1])
+
+
+def _window(departure_date: Optional[str]) -> Optional[Tuple[date, date]]:
+    """First and last departure day of a travel_timeframe such as "2025-04-10" or "2025-04-01,2025-04-29" """
+    days = [parse_date(part.strip()) for part in (departure_date or "").split(",")]
+    if not days or days[0] is None:
+        return None
+    end = days[1] if len(days) > 1 and days[1] else days[0]
+    return (days[0], end) if days[0] <= end else None
+
+
+def _months(start: date, end: date) -> List[str]:
+    months = []
+    year, number = start.year, start.month
+    while (year, number) <= (end.year, end.month):
+        months.append(f"{year:04d}-{number:02d}")
+        year, number = (year + 1, 1) if number == 12 else (year, number + 1)
+    return months
+
+
+class DestinationSnapshot:
+    """Cheapest destinations per origin, departure month and trip length, precomputed so "anywhere" searches skip Amadeus.
+
+    The trip flow always asks for a travel window and a trip length before
+    searching, so the snapshot is kept in buckets of one origin, one
+    departure month and one trip length in days. Each bucket is one
+    flight-destinations response for that month and length viewed by date,
+    i.e. the cheapest fare to each destination for every departure day. A
+    search is answered when every bucket its window and lengths touch is
+    younger than ``MAX_AGE``: the fares departing inside the window are
+    filtered by price and the cheapest per destination kept, which is what
+    Amadeus returns for the same search. Otherwise the caller searches live.
+    One-way and unbounded searches always go live.
+
+    A background thread refreshes the buckets searched most in the last
+    ``QUERY_WINDOW`` seconds, and the same months and lengths from the
+    users' preferred departure cities, each every ``REFRESH_EVERY`` seconds
+    and ``MAX_BUCKETS`` at most. It only runs once started with ``start``,
+    and only when ``DESTINATION_SNAPSHOT=1``; otherwise the snapshot is
+    not consulted at all.
+
+    The buckets and the query counts are kept in a JSON file at ``PATH``,
+    so they survive restarts and are shared by the action servers on a
+    host; searches and refreshes reload the file when another process has
+    written it.
+    """
+
+    ENABLED = os.getenv("DESTINATION_SNAPSHOT", "0") == "1"
+    # Next to the user database in src/db, wherever the process was started from
+    PATH = os.getenv("DESTINATION_SNAPSHOT_PATH", os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db", "destination_snapshot.json")))
+    # Seconds a bucket is served before searches go to Amadeus again
+    MAX_AGE = int(os.getenv("DESTINATION_SNAPSHOT_MAX_AGE", str(6 * 3600)))
+    REFRESH_EVERY = int(os.getenv("DESTINATION_SNAPSHOT_REFRESH_EVERY", "3600"))
+    # Buckets refreshed at most, and how long a searched bucket stays hot
+    MAX_BUCKETS = int(os.getenv("DESTINATION_SNAPSHOT_BUCKETS", "60"))
+    QUERY_WINDOW = int(os.getenv("DESTINATION_SNAPSHOT_QUERY_WINDOW", str(7 * 24 * 3600)))
+
+    def __init__(self, path: str = PATH, max_age: int = MAX_AGE, refresh_every: int = REFRESH_EVERY,
+                 max_buckets: int = MAX_BUCKETS, enabled: bool = ENABLED):
+        self.path = path
+        self.max_age = max_age
+        self.refresh_every = refresh_every
+        self.max_buckets = max_buckets
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # bucket -> (fetched_at, raw Amadeus entries, the same parsed)
+        self._buckets = {}
+        # bucket -> [searches, last searched at]
+        self._queries = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._loaded_mtime = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+        if enabled:
+            self._load()
+
+    def _load(self) -> None:
+        """Merge in what other processes wrote to the file since we last read it"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._loaded_mtime:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._loaded_mtime = mtime
+            for name, entry in stored.get("buckets", {}).items():
+                bucket = _parse_bucket(name)
+                current = self._buckets.get(bucket)
+                if bucket and (current is None or current[0] < entry["fetched_at"]):
+                    self._buckets[bucket] = (entry["fetched_at"], entry["data"], Destination.from_response(entry["data"]))
+            for name, (count, last) in stored.get("queries", {}).items():
+                bucket = _parse_bucket(name)
+                current = self._queries.get(bucket)
+                if bucket and (current is None or current[1] < last):
+                    self._queries[bucket] = [count, last]
+
+    def _save(self) -> None:
+        with self._lock:
+            stored = {
+                "buckets": {_bucket_name(bucket): {"fetched_at": fetched_at, "data": data}
+                            for bucket, (fetched_at, data, _) in self._buckets.items()},
+                "queries": {_bucket_name(bucket): entry for bucket, entry in self._queries.items()},
+            }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(stored, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            print(f"Error writing destination snapshot: {e}")
+
+    @staticmethod
+    def buckets(origin: str, duration: Optional[str], departure_date: Optional[str]) -> List[Bucket]:
+        """The buckets a search touches, none when it has no travel window or trip length"""
+        window = _window(departure_date)
+        lengths = parse_duration_range(duration)
+        if window is None or not lengths:
+            return []
+        return [(origin.upper(), month, length) for month in _months(*window) for length in lengths]
+
+    def record_query(self, origin: str, duration: Optional[str] = None,
+                     departure_date: Optional[str] = None) -> None:
+        """Count a destination search towards making its buckets hot"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            for bucket in self.buckets(origin, duration, departure_date):
+                entry = self._queries.setdefault(bucket, [0, 0])
+                entry[0] += 1
+                entry[1] = now
+
+    def age(self, bucket: Bucket) -> Optional[float]:
+        """Seconds since the bucket was fetched, or None if it never was"""
+        entry = self._buckets.get(bucket)
+        return time.time() - entry[0] if entry else None
+
+    def search(self, origin: str, duration: Optional[str] = None, max_price: Optional[str] = None,
+               one_way: Optional[bool] = None, departure_date: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """The cheapest flight-destinations entry per destination matching a search, or None to search live.
+
+        None when the snapshot is disabled, for one-way searches (it holds
+        return fares), for searches without a travel window or trip length,
+        when any bucket the search touches is missing or older than
+        MAX_AGE, and when nothing in them matches.
+        """
+        if not self.enabled:
+            return None
+        self._load()
+        buckets = [] if one_way else self.buckets(origin, duration, departure_date)
+        entries = [self._buckets.get(bucket) for bucket in buckets]
+        now = time.time()
+        if not entries or any(entry is None or now - entry[0] > self.max_age for entry in entries):
+            self.misses += 1
+            return None
+        start, end = _window(departure_date)
+        limit = parse_price(max_price) if max_price else None
+        cheapest = {}
+        for _, data, destinations in entries:
+            for raw, destination in zip(data, destinations):
+                if destination.total is None or destination.departure_date is None:
+                    continue
+                if not start <= destination.departure_date <= end or (limit is not None and destination.total > limit):
+                    continue
+                best = cheapest.get(destination.destination)
+                if best is None or destination.total < best[1].total:
+                    cheapest[destination.destination] = (raw, destination)
+        if not cheapest:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [raw for raw, _ in sorted(cheapest.values(), key=lambda match: match[1].total)]
+
+    def hot_buckets(self, preferred: Iterable[str]) -> List[Bucket]:
+        """The buckets searched most, then their months and lengths from the ``preferred`` origins, up to MAX_BUCKETS.
+
+        Buckets for months already over are dropped.
+        """
+        cutoff = time.time() - self.QUERY_WINDOW
+        this_month = date.today().strftime("%Y-%m")
+        with self._lock:
+            for bucket in [bucket for bucket, (_, last) in self._queries.items()
+                           if last < cutoff or bucket[1] < this_month]:
+                del self._queries[bucket]
+            searched = sorted(self._queries, key=lambda bucket: self._queries[bucket][0], reverse=True)
+        buckets = list(searched)
+        for origin in preferred:
+            for _, month, length in searched if origin else ():
+                bucket = (origin.upper(), month, length)
+                if bucket not in buckets:
+                    buckets.append(bucket)
+        return buckets[:self.max_buckets]
+
+    def refresh(self, buckets: Iterable[Bucket],
+                fetch: Callable[[str, str, int], Optional[Dict[str, Any]]]) -> int:
+        """Fetch each bucket not refreshed in the last REFRESH_EVERY seconds; returns how many were"""
+        self._load()
+        refreshed = 0
+        for bucket in buckets:
+            age = self.age(bucket)
+            if age is not None and age < self.refresh_every:
+                continue
+            origin, month, length = bucket
+            first, last = month_range(month)
+            first = max(first, date.today())
+            if first > last:
+                continue
+            try:
+                response_data = fetch(origin, f"{first.isoformat()},{last.isoformat()}", length)
+            except Exception as e:
+                print(f"Error refreshing destinations from {origin} in {month}: {e}")
+                response_data = None
+            if response_data is None:
+                self.refresh_errors += 1
+                continue
+            # an empty list is an answer too: nothing to fly to that month
+            data = response_data.get("data") or []
+            with self._lock:
+                self._buckets[bucket] = (time.time(), data, Destination.from_response(data))
+            self.refreshes += 1
+            refreshed += 1
+        self._save()
+        return refreshed
+
+    def _run(self, preferred: Callable[[], Iterable[str]],
+             fetch: Callable[[str, str, int], Optional[Dict[str, Any]]]) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh(self.hot_buckets(preferred()), fetch)
+            except Exception as e:
+                print(f"Error refreshing destination snapshot: {e}")
+            # wake up often enough to refresh each bucket close to when it is due
+            self._stop.wait(max(min(self.refresh_every, self.max_age) / 4, 1))
+
+    def start(self, preferred: Callable[[], Iterable[str]],
+              fetch: Callable[[str, str, int], Optional[Dict[str, Any]]]) -> bool:
+        """Start the background refresh unless it is disabled or running already; returns whether it runs.
+
+        ``preferred()`` returns the origins (IATA codes) to keep warm and
+        ``fetch(origin, departure_date, duration)`` the flight-destinations
+        response for one bucket, viewed by date.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, args=(preferred, fetch),
+                                                name="destination-snapshot", daemon=True)
+                self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and refresh counters"""
+        now = time.time()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "buckets": {_bucket_name(bucket): round(now - fetched_at)
+                        for bucket, (fetched_at, _, _) in self._buckets.items()},
+        }
+
+
+# Shared by the flight service
+destination_snapshot = DestinationSnapshot()
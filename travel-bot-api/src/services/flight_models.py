@@ -0,0 +1,291 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+# ISO 8601 durations as Amadeus sends them, e.g. PT7H5M or P1DT2H
+DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?")
+
+
+def parse_duration(value: Optional[str]) -> Optional[int]:
+    """Minutes in an ISO 8601 duration, or None if it is missing or malformed"""
+    match = DURATION_PATTERN.fullmatch(value or "")
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return (days * 24 + hours) * 60 + minutes
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def parse_price(value: Any) -> Optional[Decimal]:
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def parse_duration_range(duration: Optional[str]) -> List[int]:
+    """Trip lengths in days from the duration slot, e.g. "5" or a range "3,7" """
+    try:
+        bounds = [int(float(part)) for part in (duration or "").split(",") if part.strip()]
+    except ValueError:
+        return []
+    if not bounds:
+        return []
+    return list(range(max(min(bounds), 0), max(bounds) + 1))
+
+
+class Segment:
+    """One flight of an itinerary.
+
+    ``duration`` is kept as Amadeus sent it (shown and stored as is), and parsed into ``duration_minutes``.
+    """
+
+    __slots__ = ("departure_airport", "departure_terminal", "departure_at", "arrival_airport",
+                 "arrival_terminal", "arrival_at", "carrier", "number", "duration", "duration_minutes", "stops")
+
+    def __init__(self, departure_airport: Optional[str], departure_terminal: Optional[str],
+                 departure_at: Optional[datetime], arrival_airport: Optional[str], arrival_terminal: Optional[str],
+                 arrival_at: Optional[datetime], carrier: Optional[str], number: Optional[str],
+                 duration: Optional[str], stops: int = 0):
+        self.departure_airport = departure_airport
+        self.departure_terminal = departure_terminal
+        self.departure_at = departure_at
+        self.arrival_airport = arrival_airport
+        self.arrival_terminal = arrival_terminal
+        self.arrival_at = arrival_at
+        self.carrier = carrier
+        self.number = number
+        self.duration = duration
+        self.duration_minutes = parse_duration(duration)
+        self.stops = stops
+
+    @property
+    def flight_number(self) -> str:
+        return f"{self.carrier}{self.number}"
+
+    @classmethod
+    def from_json(cls, segment: Dict[str, Any]) -> "Segment":
+        departure, arrival = segment.get("departure", {}), segment.get("arrival", {})
+        return cls(departure.get("iataCode"), departure.get("terminal"), parse_datetime(departure.get("at")),
+                   arrival.get("iataCode"), arrival.get("terminal"), parse_datetime(arrival.get("at")),
+                   segment.get("carrierCode"), segment.get("number"), segment.get("duration"),
+                   segment.get("numberOfStops", 0))
+
+    def to_json(self) -> Dict[str, Any]:
+        departure = {"iataCode": self.departure_airport, "at": self.departure_at and self.departure_at.isoformat()}
+        arrival = {"iataCode": self.arrival_airport, "at": self.arrival_at and self.arrival_at.isoformat()}
+        if self.departure_terminal:
+            departure["terminal"] = self.departure_terminal
+        if self.arrival_terminal:
+            arrival["terminal"] = self.arrival_terminal
+        return {"departure": departure, "arrival": arrival, "carrierCode": self.carrier, "number": self.number,
+                "duration": self.duration, "numberOfStops": self.stops}
+
+
+class Itinerary:
+    """The outbound or return journey of an offer; ``duration`` as in Segment"""
+
+    __slots__ = ("duration", "duration_minutes", "segments")
+
+    def __init__(self, duration: Optional[str], segments: Tuple[Segment, ...]):
+        self.duration = duration
+        self.duration_minutes = parse_duration(duration)
+        self.segments = segments
+
+    @property
+    def departure(self) -> Optional[Segment]:
+        return self.segments[0] if self.segments else None
+
+    @property
+    def arrival(self) -> Optional[Segment]:
+        return self.segments[-1] if self.segments else None
+
+    @property
+    def stops(self) -> int:
+        return max(len(self.segments) - 1, 0)
+
+    @classmethod
+    def from_json(cls, itinerary: Dict[str, Any]) -> "Itinerary":
+        return cls(itinerary.get("duration"),
+                   tuple(Segment.from_json(segment) for segment in itinerary.get("segments", [])))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"duration": self.duration,
+                "segments": [segment.to_json() for segment in self.segments]}
+
+
+class FlightOffer:
+    """The parts of an Amadeus flight offer the bot shows, books and stores.
+
+    Built once per response; everything else in the offer (fare details per
+    traveler, pricing options, links) is dropped.
+    """
+
+    __slots__ = ("id", "total", "currency", "itineraries", "validating_airlines")
+
+    def __init__(self, id: Optional[str], total: Optional[Decimal], currency: str,
+                 itineraries: Tuple[Itinerary, ...], validating_airlines: Tuple[str, ...]):
+        self.id = id
+        self.total = total
+        self.currency = currency
+        self.itineraries = itineraries
+        self.validating_airlines = validating_airlines
+
+    def __repr__(self) -> str:
+        route = " / ".join(f"{itinerary.departure.departure_airport}-{itinerary.arrival.arrival_airport}"
+                           for itinerary in self.itineraries if itinerary.segments)
+        return f"FlightOffer(id={self.id!r}, {route}, {self.currency} {self.total})"
+
+    @property
+    def outbound(self) -> Optional[Itinerary]:
+        return self.itineraries[0] if self.itineraries else None
+
+    @property
+    def inbound(self) -> Optional[Itinerary]:
+        return self.itineraries[1] if len(self.itineraries) > 1 else None
+
+    @property
+    def airline(self) -> str:
+        return self.validating_airlines[0] if self.validating_airlines else ""
+
+    @property
+    def key(self) -> Tuple[Tuple[str, Optional[str], Optional[datetime]], ...]:
+        """The flights flown, the same for an offer returned again by a larger search"""
+        return tuple((segment.flight_number, segment.departure_airport, segment.departure_at)
+                     for itinerary in self.itineraries for segment in itinerary.segments)
+
+    @classmethod
+    def from_json(cls, offer: Dict[str, Any]) -> "FlightOffer":
+        price = offer.get("price", {})
+        return cls(offer.get("id"), parse_price(price.get("total")), price.get("currency", "USD"),
+                   tuple(Itinerary.from_json(itinerary) for itinerary in offer.get("itineraries", [])),
+                   tuple(offer.get("validatingAirlineCodes", [])))
+
+    @classmethod
+    def from_response(cls, offers: List[Dict[str, Any]]) -> List["FlightOffer"]:
+        return [cls.from_json(offer) for offer in offers]
+
+    def to_json(self) -> Dict[str, Any]:
+        """Amadeus layout of the fields kept, enough to rebuild the model"""
+        return {
+            "id": self.id,
+            "price": {"total": None if self.total is None else str(self.total), "currency": self.currency},
+            "itineraries": [itinerary.to_json() for itinerary in self.itineraries],
+            "validatingAirlineCodes": list(self.validating_airlines),
+        }
+
+
+class Destination:
+    """One entry of an Amadeus flight-destinations (inspiration search) response"""
+
+    __slots__ = ("origin", "destination", "departure_date", "return_date", "total")
+
+    def __init__(self, origin: Optional[str], destination: Optional[str], departure_date: Optional[date],
+                 return_date: Optional[date], total: Optional[Decimal]):
+        self.origin = origin
+        self.destination = destination
+        self.departure_date = departure_date
+        self.return_date = return_date
+        self.total = total
+
+    @classmethod
+    def from_json(cls, destination: Dict[str, Any]) -> "Destination":
+        return cls(destination.get("origin"), destination.get("destination"),
+                   parse_date(destination.get("departureDate")), parse_date(destination.get("returnDate")),
+                   parse_price(destination.get("price", {}).get("total")))
+
+    @classmethod
+    def from_response(cls, destinations: List[Dict[str, Any]]) -> List["Destination"]:
+        return [cls.from_json(destination) for destination in destinations]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "departureDate": self.departure_date and self.departure_date.isoformat(),
+            "returnDate": self.return_date and self.return_date.isoformat(),
+            "price": {"total": None if self.total is None else str(self.total)},
+        }
+
+
+class CalendarDay:
+    """The cheapest offer found departing on one day"""
+
+    __slots__ = ("departure_date", "return_date", "offer")
+
+    def __init__(self, departure_date: date, return_date: Optional[date], offer: FlightOffer):
+        self.departure_date = departure_date
+        self.return_date = return_date
+        self.offer = offer
+
+    @property
+    def total(self) -> Decimal:
+        return self.offer.total
+
+
+class PriceCalendar:
+    """Cheapest offer per departure day, merged from searches over several date pairs.
+
+    ``planned`` is the number of date pairs meant to be searched and
+    ``searched`` the number that were; the calendar is partial when a
+    search ran out of time before all of them answered.
+    """
+
+    __slots__ = ("days", "planned", "searched")
+
+    def __init__(self, planned: int = 0):
+        self.days = {}
+        self.planned = planned
+        self.searched = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.searched >= self.planned
+
+    def add(self, departure_date: date, return_date: Optional[date], offers: List[FlightOffer]) -> None:
+        """Merge the offers found for one date pair"""
+        self.searched += 1
+        for offer in offers:
+            if offer.total is None:
+                continue
+            current = self.days.get(departure_date)
+            if current is None or offer.total < current.total:
+                self.days[departure_date] = CalendarDay(departure_date, return_date, offer)
+
+    def sorted_days(self) -> List[CalendarDay]:
+        """Days by departure date"""
+        return [self.days[day] for day in sorted(self.days)]
+
+    def cheapest(self) -> Optional[CalendarDay]:
+        return min(self.days.values(), key=lambda day: day.total, default=None)
+
+    def offers(self) -> List[FlightOffer]:
+        """The offer of each day, cheapest first"""
+        return [day.offer for day in sorted(self.days.values(), key=lambda day: (day.total, day.departure_date))]
+
+
+# Result store kinds whose results are lists of these models
+MODELS = {
+    "flight-offers": FlightOffer,
+    "flight-destinations": Destination,
+}
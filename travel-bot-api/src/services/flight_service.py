@@ -1,5 +1,15 @@
-from typing import Dict, List, Optional, Any
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import product
+from typing import Dict, List, Optional, Any, Tuple
+from .airport_index import airport_index
 from .amadeus_service import AmadeusService
+from .destination_snapshot import destination_snapshot
+from .flight_models import Destination, FlightOffer, PriceCalendar, parse_date, parse_duration_range, parse_price
+from .result_store import ResultPages
 
 TRAVEL_CLASS_MAP = {
     "economy": "ECONOMY",
@@ -8,6 +18,99 @@ TRAVEL_CLASS_MAP = {
     "first": "FIRST"
 }
 
+# Offers asked for when a search does not say, and the most Amadeus returns
+DEFAULT_OFFERS = 5
+MAX_OFFERS = 250
+
+# Flexible-date searches: date pairs searched at most, searches in flight at once
+# and seconds before answering with the days found so far
+FLEX_MAX_DATE_PAIRS = int(os.getenv("FLEX_MAX_DATE_PAIRS", "40"))
+FLEX_CONCURRENCY = int(os.getenv("FLEX_SEARCH_CONCURRENCY", "4"))
+FLEX_BUDGET = float(os.getenv("FLEX_SEARCH_BUDGET", "8"))
+
+# Airports searched for a city: those within MULTI_AIRPORT_RADIUS_KM, at most
+# MULTI_AIRPORT_LIMIT per end of the trip and MULTI_AIRPORT_MAX_PAIRS (origin, destination) pairs
+MULTI_AIRPORT_RADIUS_KM = float(os.getenv("MULTI_AIRPORT_RADIUS_KM", "80"))
+MULTI_AIRPORT_LIMIT = int(os.getenv("MULTI_AIRPORT_LIMIT", "3"))
+MULTI_AIRPORT_MAX_PAIRS = int(os.getenv("MULTI_AIRPORT_MAX_PAIRS", "6"))
+
+# Bounded pool for independent upstream calls (token, IATA lookups) made during one search
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("FLIGHT_SERVICE_WORKERS", "8")),
+                               thread_name_prefix="flight-service")
+
+
+# Flexible-date searches still running after their caller stopped waiting
+_flex_searches = set()
+
+
+def flexible_date_pairs(timeframe: Optional[str], duration: Optional[str],
+                        limit: int = FLEX_MAX_DATE_PAIRS) -> List[Tuple[date, date]]:
+    """(departure, return) pairs for a travel window such as "2025-04-01,2025-04-29" and a duration range.
+
+    Every departure day is paired with the shortest trip length before a
+    longer one is tried, so a capped list still covers the whole window.
+    Days already past are skipped.
+    """
+    window = [parse_date(part.strip()) for part in (timeframe or "").split(",")]
+    durations = parse_duration_range(duration)
+    if not window or window[0] is None or not durations:
+        return []
+    start, end = window[0], (window[1] if len(window) > 1 and window[1] else window[0])
+    start = max(start, date.today())
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    pairs = [(day, day + timedelta(days=length)) for length in durations for day in days]
+    return pairs[:limit]
+
+
+def _price(entry: Dict[str, Any]) -> Decimal:
+    price = parse_price(entry.get("price", {}).get("total"))
+    return Decimal("Infinity") if price is None else price
+
+
+def _offer_key(offer: Dict[str, Any]) -> Tuple[Tuple[str, Optional[str], Optional[str]], ...]:
+    """FlightOffer.key for a raw offer: the same flights can come back from the searches of several airport pairs"""
+    return tuple((f"{segment.get('carrierCode')}{segment.get('number')}", segment.get("departure", {}).get("iataCode"),
+                  segment.get("departure", {}).get("at"))
+                 for itinerary in offer.get("itineraries", []) for segment in itinerary.get("segments", []))
+
+
+def _has_more(response_data: Optional[Dict[str, Any]], params: Dict[str, Any]) -> bool:
+    """Whether a flight-offers search may have more offers than it was asked for"""
+    return (response_data is not None and len(response_data.get("data") or []) >= params["max"]
+            and params["max"] < MAX_OFFERS)
+
+
+def _merge_offers(responses: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """One flight-offers response out of those of several airport pairs: deduplicated, cheapest first"""
+    if len(responses) == 1:
+        return responses[0]
+    found = [response for response in responses if response is not None]
+    if not found:
+        return None
+    offers = {}
+    for response in found:
+        for offer in response.get("data") or []:
+            offers.setdefault(_offer_key(offer), offer)
+    # ids are only unique within one response
+    data = [dict(offer, id=str(i + 1)) for i, offer in enumerate(sorted(offers.values(), key=_price))]
+    return dict(found[0], data=data)
+
+
+def _merge_destinations(responses: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """One flight-destinations/flight-dates response out of those of several origins: the cheapest per trip"""
+    if len(responses) == 1:
+        return responses[0]
+    found = [response for response in responses if response is not None]
+    if not found:
+        return None
+    cheapest = {}
+    for response in found:
+        for entry in response.get("data") or []:
+            key = (entry.get("destination"), entry.get("departureDate"), entry.get("returnDate"))
+            if key not in cheapest or _price(entry) < _price(cheapest[key]):
+                cheapest[key] = entry
+    return dict(found[0], data=sorted(cheapest.values(), key=_price))
+
 
 class FlightService:
     def __init__(self):
@@ -16,28 +119,79 @@ class FlightService:
     def get_location_iata(self, location: str) -> Optional[str]:
         """Get IATA code for a location"""
         return self.amadeus_service.get_iata_code(location)
-    
-    def search_flights(self, departure: str, destination: Optional[str] = None, 
-                      duration: Optional[str] = None, max_price: Optional[str] = None, 
-                      one_way: Optional[bool] = None, departure_date: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Search for flights based on parameters
-        Returns a dictionary with success status and data/error message
-        """
-        result = {"success": False, "data": None, "message": None}
-        
-        # Get access token
-        access_token = self.amadeus_service.get_access_token()
+
+    def _check_codes(self, departure: str, destination: Optional[str], access_token: Optional[str],
+                     dep_iata_code: Optional[str], dest_iata_code: Optional[str],
+                     result: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
         if not access_token:
             result["message"] = "Failed to connect to flight database"
-            return result
-        
-        # Get departure IATA code
-        dep_iata_code = self.get_location_iata(departure)
+            return None
         if not dep_iata_code:
             result["message"] = f"Couldn't find an IATA airport code for {departure}"
-            return result
-        
+            return None
+        if destination and not dest_iata_code:
+            result["message"] = f"Couldn't find an IATA airport code for {destination}"
+            return None
+        return dep_iata_code, dest_iata_code
+
+    def _prepare_search(self, departure: str, destination: Optional[str],
+                        result: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Fetch the token and resolve both ends of the trip concurrently.
+        Returns (departure IATA, destination IATA) or None after filling result["message"]
+        """
+        token_future = _executor.submit(self.amadeus_service.get_access_token)
+        dep_future = _executor.submit(self.get_location_iata, departure)
+        dest_future = _executor.submit(self.get_location_iata, destination) if destination else None
+
+        try:
+            access_token = token_future.result()
+            dep_iata_code = dep_future.result()
+            dest_iata_code = dest_future.result() if dest_future else None
+        except Exception as e:
+            print(f"Error preparing flight search: {e}")
+            result["message"] = "Failed to connect to flight database"
+            return None
+
+        return self._check_codes(departure, destination, access_token, dep_iata_code, dest_iata_code, result)
+
+    async def _prepare_search_async(self, departure: str, destination: Optional[str],
+                                    result: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+        """Coroutine variant of _prepare_search"""
+        calls = [
+            self.amadeus_service.get_access_token_async(),
+            self.amadeus_service.get_iata_code_async(departure),
+        ]
+        if destination:
+            calls.append(self.amadeus_service.get_iata_code_async(destination))
+
+        try:
+            access_token, dep_iata_code, *rest = await asyncio.gather(*calls)
+        except Exception as e:
+            print(f"Error preparing flight search: {e}")
+            result["message"] = "Failed to connect to flight database"
+            return None
+
+        dest_iata_code = rest[0] if rest else None
+        return self._check_codes(departure, destination, access_token, dep_iata_code, dest_iata_code, result)
+
+    def _airports(self, location: str, iata_code: str) -> List[str]:
+        """The airports to search for a place: those around it, unless an airport code was asked for"""
+        if location.strip().upper() == iata_code.upper() and airport_index.airport(iata_code) is not None:
+            return [iata_code.upper()]
+        return airport_index.airports_near(iata_code, MULTI_AIRPORT_RADIUS_KM, MULTI_AIRPORT_LIMIT) or [iata_code.upper()]
+
+    def _airport_pairs(self, departure: str, dep_iata_code: str, destination: str,
+                       dest_iata_code: str) -> List[Tuple[str, str]]:
+        """(origin, destination) airports to search, the pairs of the nearest airports first"""
+        origins = self._airports(departure, dep_iata_code)
+        destinations = self._airports(destination, dest_iata_code)
+        nearest = sorted(product(range(len(origins)), range(len(destinations))), key=sum)
+        pairs = [(origins[i], destinations[j]) for i, j in nearest if origins[i] != destinations[j]]
+        return pairs[:MULTI_AIRPORT_MAX_PAIRS] or [(dep_iata_code, dest_iata_code)]
+
+    def _search_params(self, dep_iata_code: str, duration: Optional[str], max_price: Optional[str],
+                       one_way: Optional[bool], departure_date: Optional[str]) -> Dict[str, Any]:
         # Build API request parameters
         params = {"origin": dep_iata_code.upper()}
         
@@ -52,20 +206,29 @@ class FlightService:
             params["departureDate"] = departure_date
         # if return_date:
         #     params["returnDate"] = return_date
+        return params
 
-        # Determine which API to use based on whether destination is provided
-        if destination:
-            # Get destination IATA code
-            arr_iata_code = self.get_location_iata(destination)
-            if not arr_iata_code:
-                result["message"] = f"Couldn't find an IATA airport code for {destination}"
-                return result
-                
-            params["destination"] = arr_iata_code
-            response_data = self.amadeus_service.search_destinations(params)
-        else:
-            response_data = self.amadeus_service.search_flight_destinations(params)
-    
+    def _from_snapshot(self, dep_iata_code: str, duration: Optional[str], max_price: Optional[str],
+                       one_way: Optional[bool], departure_date: Optional[str],
+                       result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Answer an any-destination search from the precomputed snapshot, if it is fresh enough"""
+        destination_snapshot.record_query(dep_iata_code, duration, departure_date)
+        data = destination_snapshot.search(dep_iata_code, duration, max_price, one_way, departure_date)
+        if data is None:
+            return None
+        result["success"] = True
+        result["data"] = data
+        result["source"] = "snapshot"
+        return result
+
+    def fetch_destinations_snapshot(self, origin: str, departure_date: str, duration: int) -> Optional[Dict[str, Any]]:
+        """Flight-destinations by date from an origin and the airports around it, fetched live for a snapshot bucket"""
+        params = {"departureDate": departure_date, "duration": str(duration), "viewBy": "DATE"}
+        return _merge_destinations(list(_executor.map(
+            lambda airport: self.amadeus_service.search_flight_destinations(dict(params, origin=airport), refresh=True),
+            self._airports(origin, origin))))
+
+    def _to_result(self, response_data: Optional[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, Any]:
         if not response_data or "data" not in response_data or not response_data["data"]:
             result["message"] = "No flights found matching your criteria"
             return result
@@ -74,11 +237,70 @@ class FlightService:
         result["data"] = response_data["data"]
         return result
     
-    def format_flight_suggestions(self, flights: List[Dict[str, Any]], start_idx: int = 0, count: int = 3) -> str:
+    def search_flights(self, departure: str, destination: Optional[str] = None, 
+                      duration: Optional[str] = None, max_price: Optional[str] = None, 
+                      one_way: Optional[bool] = None, departure_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search for flights based on parameters
+        Returns a dictionary with success status and data/error message
+        """
+        result = {"success": False, "data": None, "message": None}
+        
+        # Get access token and IATA codes for departure (and destination) in parallel
+        codes = self._prepare_search(departure, destination, result)
+        if not codes:
+            return result
+        dep_iata_code, arr_iata_code = codes
+        params = self._search_params(dep_iata_code, duration, max_price, one_way, departure_date)
+
+        # Determine which API to use based on whether destination is provided;
+        # every airport of a multi-airport city is searched, in parallel
+        if destination:
+            queries = [dict(params, origin=origin, destination=dest)
+                       for origin, dest in self._airport_pairs(departure, dep_iata_code, destination, arr_iata_code)]
+            search = self.amadeus_service.search_destinations
+        else:
+            snapshot = self._from_snapshot(dep_iata_code, duration, max_price, one_way, departure_date, result)
+            if snapshot:
+                return snapshot
+            queries = [dict(params, origin=origin) for origin in self._airports(departure, dep_iata_code)]
+            search = self.amadeus_service.search_flight_destinations
+        response_data = _merge_destinations(list(_executor.map(search, queries)))
+        return self._to_result(response_data, result)
+
+    async def search_flights_async(self, departure: str, destination: Optional[str] = None,
+                                   duration: Optional[str] = None, max_price: Optional[str] = None,
+                                   one_way: Optional[bool] = None,
+                                   departure_date: Optional[str] = None) -> Dict[str, Any]:
+        """Coroutine variant of search_flights"""
+        result = {"success": False, "data": None, "message": None}
+
+        codes = await self._prepare_search_async(departure, destination, result)
+        if not codes:
+            return result
+        dep_iata_code, arr_iata_code = codes
+        params = self._search_params(dep_iata_code, duration, max_price, one_way, departure_date)
+
+        if destination:
+            queries = [dict(params, origin=origin, destination=dest)
+                       for origin, dest in self._airport_pairs(departure, dep_iata_code, destination, arr_iata_code)]
+            search = self.amadeus_service.search_destinations_async
+        else:
+            snapshot = self._from_snapshot(dep_iata_code, duration, max_price, one_way, departure_date, result)
+            if snapshot:
+                return snapshot
+            queries = [dict(params, origin=origin) for origin in self._airports(departure, dep_iata_code)]
+            search = self.amadeus_service.search_flight_destinations_async
+        response_data = _merge_destinations(list(await asyncio.gather(*(search(query) for query in queries))))
+        return self._to_result(response_data, result)
+    
+    def format_flight_suggestions(self, flights: List[Destination], start_idx: int = 0, count: int = 3) -> str:
         """Format flight suggestions into a readable message"""
         end_idx = min(start_idx + count, len(flights))
-        flights_to_show = flights[start_idx:end_idx]
-        
+        return self.format_suggestions_page(start_idx, flights[start_idx:end_idx])
+
+    def format_suggestions_page(self, start_idx: int, flights_to_show: List[Destination]) -> str:
+        """Format one page of flight suggestions, numbered from start_idx + 1"""
         if not flights_to_show:
             return "No more flight suggestions available."
             
@@ -86,42 +308,21 @@ class FlightService:
         
         for i, flight in enumerate(flights_to_show):
             flight_text = (
-                f"✈️ **Flight {start_idx + i + 1}** {flight['origin']} to {flight['destination']}\n"
-                #f"🛫 From: {flight['origin']}\n"
-                #f"🛬 To: {flight['destination']}\n"
-                f"📅 Depart: {flight['departureDate']}\n"
-                f"📅 Return: {flight['returnDate']}\n"
-               # f"💰 Price: ${flight['price'].get('total', 'Unavailable')}"
+                f"✈️ **Flight {start_idx + i + 1}** {flight.origin} to {flight.destination}\n"
+                #f"🛫 From: {flight.origin}\n"
+                #f"🛬 To: {flight.destination}\n"
+                f"📅 Depart: {flight.departure_date}\n"
+                f"📅 Return: {flight.return_date}\n"
+               # f"💰 Price: ${flight.total or 'Unavailable'}"
             )
             response_message += flight_text + "\n\n"
             
         return response_message
 
-    def get_flight_offers(self, departure: str, destination: str, departure_date: str, 
-                        num_adults: str, return_date: Optional[str] = None, 
-                        num_children: Optional[str] = None, num_infants: Optional[str] = None, 
-                        travel_class: Optional[str] = None, one_way: Optional[bool] = None,
-                        max_price: Optional[str] = None) -> Dict[str, Any]:
-        """Get flight offers based on given parameters"""
-        result = {"success": False, "data": None, "message": None}
-        
-        # Get access token
-        access_token = self.amadeus_service.get_access_token()
-        if not access_token:
-            result["message"] = "Failed to connect to flight database"
-            return result
-        
-        # Get IATA codes for departure and destination
-        dep_iata_code = self.get_location_iata(departure)
-        if not dep_iata_code:
-            result["message"] = f"Couldn't find an IATA airport code for {departure}"
-            return result
-            
-        dest_iata_code = self.get_location_iata(destination)
-        if not dest_iata_code:
-            result["message"] = f"Couldn't find an IATA airport code for {destination}"
-            return result
-        
+    def _offer_params(self, dep_iata_code: str, dest_iata_code: str, departure_date: str,
+                      num_adults: str, return_date: Optional[str], num_children: Optional[str],
+                      num_infants: Optional[str], travel_class: Optional[str],
+                      max_price: Optional[str], max_results: Optional[int] = None) -> Dict[str, Any]:
         # Build API request parameters
         params = {
             "originLocationCode": dep_iata_code.upper(),
@@ -129,7 +330,7 @@ class FlightService:
             "departureDate": departure_date,
             "adults": num_adults,
             "currencyCode": "USD",
-            "max": 5  # Limit to 5 results
+            "max": min(max_results or DEFAULT_OFFERS, MAX_OFFERS)
         }
 
         # Add optional parameters
@@ -143,14 +344,149 @@ class FlightService:
             params["travelClass"] = TRAVEL_CLASS_MAP[travel_class]
         if max_price:
             params["maxPrice"] = max_price
+        return params
+
+    def _offer_queries(self, departure: str, destination: str, codes: Tuple[str, str], departure_date: str,
+                       num_adults: str, return_date: Optional[str], num_children: Optional[str],
+                       num_infants: Optional[str], travel_class: Optional[str], max_price: Optional[str],
+                       max_results: Optional[int]) -> List[Dict[str, Any]]:
+        """Request parameters for each (origin, destination) airport pair of a search"""
+        return [self._offer_params(origin, dest, departure_date, num_adults, return_date, num_children,
+                                   num_infants, travel_class, max_price, max_results)
+                for origin, dest in self._airport_pairs(departure, codes[0], destination, codes[1])]
+
+    def _offers_result(self, queries: List[Dict[str, Any]], responses: List[Optional[Dict[str, Any]]],
+                       result: Dict[str, Any]) -> Dict[str, Any]:
+        result["query"] = [params for params, response_data in zip(queries, responses)
+                           if _has_more(response_data, params)]
+        result["exhausted"] = not result["query"]
+        return self._to_result(_merge_offers(responses), result)
+
+    def get_flight_offers(self, departure: str, destination: str, departure_date: str, 
+                        num_adults: str, return_date: Optional[str] = None, 
+                        num_children: Optional[str] = None, num_infants: Optional[str] = None, 
+                        travel_class: Optional[str] = None, one_way: Optional[bool] = None,
+                        max_price: Optional[str] = None, max_results: Optional[int] = None) -> Dict[str, Any]:
+        """Get flight offers based on given parameters
+
+        A city with several airports (New York: JFK, LGA, EWR) is searched
+        at each of them, in parallel, and the offers are merged cheapest
+        first. ``result["query"]`` holds the request parameters of the
+        searches that may have more offers, for fetching more of them later,
+        and ``result["exhausted"]`` is set if none may.
+        """
+        result = {"success": False, "data": None, "message": None}
         
-        # Call Amadeus API to get flight offers
-        response_data = self.amadeus_service.search_flight_offers(params)
+        # Get access token and IATA codes for departure and destination in parallel
+        codes = self._prepare_search(departure, destination, result)
+        if not codes:
+            return result
+        queries = self._offer_queries(departure, destination, codes, departure_date, num_adults, return_date,
+                                      num_children, num_infants, travel_class, max_price, max_results)
         
-        if not response_data or "data" not in response_data or not response_data["data"]:
+        # Call Amadeus API to get flight offers
+        responses = list(_executor.map(self.amadeus_service.search_flight_offers, queries))
+        return self._offers_result(queries, responses, result)
+
+    async def get_flight_offers_async(self, departure: str, destination: str, departure_date: str,
+                                      num_adults: str, return_date: Optional[str] = None,
+                                      num_children: Optional[str] = None, num_infants: Optional[str] = None,
+                                      travel_class: Optional[str] = None, one_way: Optional[bool] = None,
+                                      max_price: Optional[str] = None,
+                                      max_results: Optional[int] = None) -> Dict[str, Any]:
+        """Coroutine variant of get_flight_offers"""
+        result = {"success": False, "data": None, "message": None}
+
+        codes = await self._prepare_search_async(departure, destination, result)
+        if not codes:
+            return result
+        queries = self._offer_queries(departure, destination, codes, departure_date, num_adults, return_date,
+                                      num_children, num_infants, travel_class, max_price, max_results)
+
+        responses = await asyncio.gather(*(self.amadeus_service.search_flight_offers_async(query)
+                                           for query in queries))
+        return self._offers_result(queries, list(responses), result)
+
+    async def fetch_more_offers_async(self, pages: ResultPages) -> bool:
+        """Fetch the next page of a flight-offers search into ``pages``.
+
+        Amadeus has no cursor for flight offers, so each search (one per
+        airport pair) is repeated with a larger ``max`` and the offers
+        already fetched are dropped. A search is dropped from ``pages.query``
+        once upstream returns fewer offers than asked for or the maximum it
+        allows; ``pages.exhausted`` is set once none is left or nothing new
+        came back. Returns whether any offers were added.
+        """
+        if pages.exhausted or not pages.query:
+            return False
+        # searches stored before multi-airport search hold a single query
+        queries = pages.query if isinstance(pages.query, list) else [pages.query]
+        requests = [dict(query, max=min(query["max"] + pages.page_size + 1, MAX_OFFERS)) for query in queries]
+        responses = list(await asyncio.gather(*(self.amadeus_service.search_flight_offers_async(params)
+                                                for params in requests)))
+        if all(response_data is None for response_data in responses):
+            # upstream failed; leave the pages as they are so the next click retries
+            return False
+        offers = FlightOffer.from_response(_merge_offers(responses).get("data") or [])
+        added = pages.extend(offers, key=lambda offer: offer.key)
+        # a search that failed is retried as it was with the next fetch
+        pages.query = [params if response_data is not None else query
+                       for query, params, response_data in zip(queries, requests, responses)
+                       if response_data is None or _has_more(response_data, params)]
+        if not pages.query or not added:
+            pages.exhausted = True
+        return added > 0
+
+    async def search_flexible_dates_async(self, departure: str, destination: str,
+                                          date_pairs: List[Tuple[date, date]], num_adults: str,
+                                          travel_class: Optional[str] = None, max_price: Optional[str] = None,
+                                          budget: float = FLEX_BUDGET) -> Dict[str, Any]:
+        """Search flight offers for each (departure, return) pair and merge them into a PriceCalendar.
+
+        At most FLEX_CONCURRENCY searches are in flight at once; each goes
+        through the rate limiter and the response cache, so pairs searched
+        recently cost no upstream call. After ``budget`` seconds the
+        calendar is returned with the days found so far; searches already
+        sent finish in the background and are cached for the next time.
+        """
+        result = {"success": False, "data": None, "message": None}
+
+        codes = await self._prepare_search_async(departure, destination, result)
+        if not codes:
+            return result
+        dep_iata_code, dest_iata_code = codes
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        calendar = PriceCalendar(len(date_pairs))
+        semaphore = asyncio.Semaphore(FLEX_CONCURRENCY)
+
+        async def search(departure_date: date, return_date: date) -> None:
+            async with semaphore:
+                if loop.time() >= deadline:
+                    return
+                params = self._offer_params(dep_iata_code, dest_iata_code, departure_date.isoformat(), num_adults,
+                                            return_date.isoformat(), None, None, travel_class, max_price)
+                try:
+                    response_data = await self.amadeus_service.search_flight_offers_async(params)
+                except Exception as e:
+                    print(f"Error searching flights on {departure_date}: {e}")
+                    return
+            if response_data is not None and loop.time() < deadline:
+                calendar.add(departure_date, return_date,
+                             FlightOffer.from_response(response_data.get("data") or []))
+
+        tasks = [loop.create_task(search(*pair)) for pair in date_pairs]
+        for task in tasks:
+            _flex_searches.add(task)
+            task.add_done_callback(_flex_searches.discard)
+        if tasks:
+            await asyncio.wait(tasks, timeout=budget)
+
+        if not calendar.days:
             result["message"] = "No flights found matching your criteria"
             return result
-            
         result["success"] = True
-        result["data"] = response_data["data"]
+        result["data"] = calendar
         return result
+
@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .flight_models import FlightOffer
+
+# How much each criterion counts; every criterion is scaled to 0 (best) .. 1 (worst) first
+DEFAULT_WEIGHTS = {
+    "price": 0.5,
+    "duration": 0.2,
+    "stops": 0.15,
+    "departure_time": 0.1,
+    "airline": 0.05,
+}
+
+# Hours of the day (start, end) a preferred departure time stands for; night wraps past midnight
+DEPARTURE_TIMES = {
+    "morning": (5.0, 12.0),
+    "afternoon": (12.0, 17.0),
+    "evening": (17.0, 22.0),
+    "night": (22.0, 5.0),
+}
+
+
+class OfferFeatures:
+    """The ranking criteria of a list of offers as arrays, one entry per offer.
+
+    Extracting them is the only per-offer Python loop; scoring and
+    selection work on the arrays.
+    """
+
+    __slots__ = ("price", "duration", "stops", "departure_hour", "airline")
+
+    def __init__(self, offers: Sequence[FlightOffer]):
+        nan = float("nan")
+        price, duration, stops, departure_hour, airline = [], [], [], [], []
+        for offer in offers:
+            total = offer.total
+            price.append(nan if total is None else float(total))
+            minutes, legs = 0, 0
+            for itinerary in offer.itineraries:
+                if minutes is not None:
+                    minutes = None if itinerary.duration_minutes is None else minutes + itinerary.duration_minutes
+                legs += len(itinerary.segments) - 1 if itinerary.segments else 0
+            duration.append(nan if minutes is None or not offer.itineraries else minutes)
+            stops.append(legs)
+            itineraries = offer.itineraries
+            departure_at = itineraries[0].segments[0].departure_at if itineraries and itineraries[0].segments else None
+            departure_hour.append(nan if departure_at is None else departure_at.hour + departure_at.minute / 60)
+            airline.append(offer.validating_airlines[0] if offer.validating_airlines else "")
+        self.price = np.array(price, dtype=float)
+        self.duration = np.array(duration, dtype=float)
+        self.stops = np.array(stops, dtype=float)
+        self.departure_hour = np.array(departure_hour, dtype=float)
+        self.airline = airline
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+
+def _scaled(values: np.ndarray) -> np.ndarray:
+    """Min-max scale to 0..1; missing values count as the worst"""
+    # fmin/fmax skip NaN; both are NaN only if every value is missing
+    low, high = np.fmin.reduce(values), np.fmax.reduce(values)
+    if np.isnan(low):
+        return np.zeros(len(values))
+    scaled = (values - low) / (high - low) if high > low else values * 0.0
+    return np.where(np.isnan(scaled), 1.0, scaled)
+
+
+def _departure_misfit(hours: np.ndarray, departure_time: Optional[str]) -> np.ndarray:
+    """Hours outside the preferred departure window, as 0 (inside) .. 1 (12 hours away)"""
+    window = DEPARTURE_TIMES.get((departure_time or "").strip().lower())
+    if window is None:
+        return np.zeros(len(hours))
+    start, end = window
+    # hours since the window opened, around the clock
+    offset = (hours - start) % 24
+    length = (end - start) % 24
+    # past the end of the window, or before its start, whichever is nearer
+    distance = np.minimum(offset - length, 24 - offset)
+    misfit = np.where(offset < length, 0.0, np.minimum(distance / 12, 1.0))
+    return np.where(np.isnan(hours), 1.0, misfit)
+
+
+def score_offers(features: OfferFeatures, airlines: Iterable[str] = (), departure_time: Optional[str] = None,
+                 weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Weighted score per offer, lower is better"""
+    weights = weights or DEFAULT_WEIGHTS
+    preferred = {code.upper() for code in airlines if code}
+    scores = weights.get("price", 0) * _scaled(features.price)
+    scores += weights.get("duration", 0) * _scaled(features.duration)
+    scores += weights.get("stops", 0) * _scaled(features.stops)
+    scores += weights.get("departure_time", 0) * _departure_misfit(features.departure_hour, departure_time)
+    if preferred:
+        other_airline = np.fromiter((code not in preferred for code in features.airline), bool, len(features))
+        scores += weights.get("airline", 0) * other_airline
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` lowest scores, best first; ties keep the original order.
+
+    Selects with argpartition (linear) and only sorts the ``k`` selected,
+    instead of sorting every score.
+    """
+    count = len(scores)
+    if k <= 0 or count == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < count:
+        selected = np.argpartition(scores, k - 1)[:k]
+        # argpartition breaks ties at the k-th score arbitrarily; take the earliest offers among them
+        threshold = scores[selected].max()
+        tied = np.flatnonzero(scores == threshold)
+        if len(tied) > 1:
+            selected = np.concatenate([np.flatnonzero(scores < threshold), tied])[:k]
+    else:
+        selected = np.arange(count)
+    return selected[np.lexsort((selected, scores[selected]))]
+
+
+def rank_offers(offers: List[FlightOffer], k: Optional[int] = None, airlines: Iterable[str] = (),
+                departure_time: Optional[str] = None,
+                weights: Optional[Dict[str, float]] = None) -> List[FlightOffer]:
+    """Reorder offers so the best ``k`` (all if None) come first, best first.
+
+    The offers after the first ``k`` keep their original order.
+    """
+    if not offers:
+        return []
+    scores = score_offers(OfferFeatures(offers), airlines, departure_time, weights)
+    best = top_k(scores, len(offers) if k is None else k)
+    rest = np.ones(len(offers), dtype=bool)
+    rest[best] = False
+    order = np.concatenate([best, np.flatnonzero(rest)])
+    return [offers[i] for i in order]
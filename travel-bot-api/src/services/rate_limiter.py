@@ -0,0 +1,192 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+from .http_client import httpx
+
+# Status codes worth retrying after a pause
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitedError(requests.exceptions.HTTPError):
+    """Upstream answered 429; ``retry_after`` is the delay it asked for, in seconds"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, response: Any = None):
+        super().__init__(message, response=response)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429s, 5xx answers and connection problems are retried; other errors are not"""
+    if isinstance(error, RateLimitedError):
+        return True
+    response = getattr(error, "response", None)
+    if response is not None:
+        return response.status_code in RETRY_STATUSES
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None, base: float = 0.25, cap: float = 8.0) -> float:
+    """Full-jitter exponential backoff, never shorter than a Retry-After the upstream sent"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap * 4))
+    return delay
+
+
+def wait_for_retry(retry_state: Any) -> float:
+    """tenacity ``wait`` callback using backoff_delay"""
+    return backoff_delay(retry_state.attempt_number - 1, retry_state.outcome.exception())
+
+
+class TokenBucket:
+    """Token bucket that makes callers wait for capacity instead of failing"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """Take one token, returning how long the caller has to wait before using it.
+
+        With ``max_wait``, no token is taken if the wait would be longer.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            tokens = self._tokens - 1
+            wait = 0.0 if tokens >= 0 else -tokens / self.rate
+            wait = max(wait, self._blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                return wait
+            self._tokens = tokens
+            self.waited += wait
+            return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for ``seconds`` (after a 429)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """Per-endpoint token buckets plus a count of quota used this month"""
+
+    # Requests per second per endpoint, below the Amadeus test tier limits
+    RATES = {
+        "flight-offers": float(os.getenv("AMADEUS_FLIGHT_OFFERS_RPS", "5")),
+        "flight-destinations": float(os.getenv("AMADEUS_FLIGHT_DESTINATIONS_RPS", "5")),
+        "flight-dates": float(os.getenv("AMADEUS_FLIGHT_DATES_RPS", "5")),
+        "locations": float(os.getenv("AMADEUS_LOCATIONS_RPS", "10")),
+    }
+    DEFAULT_RATE = float(os.getenv("AMADEUS_DEFAULT_RPS", "10"))
+    # Free monthly calls per endpoint; 0 means untracked
+    MONTHLY_QUOTAS = {
+        "flight-offers": int(os.getenv("AMADEUS_FLIGHT_OFFERS_QUOTA", "2000")),
+        "flight-destinations": int(os.getenv("AMADEUS_FLIGHT_DESTINATIONS_QUOTA", "2000")),
+        "flight-dates": int(os.getenv("AMADEUS_FLIGHT_DATES_QUOTA", "2000")),
+        "locations": int(os.getenv("AMADEUS_LOCATIONS_QUOTA", "2000")),
+    }
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._month = self._current_month()
+        self.used = {}
+        self.throttled = {}
+
+    @staticmethod
+    def _current_month() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = TokenBucket(self.RATES.get(endpoint, self.DEFAULT_RATE))
+            return bucket
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            month = self._current_month()
+            if month != self._month:
+                self._month, self.used = month, {}
+            self.used[endpoint] = self.used.get(endpoint, 0) + 1
+            quota = self.MONTHLY_QUOTAS.get(endpoint, 0)
+            if quota and self.used[endpoint] == quota:
+                print(f"Amadeus monthly quota for {endpoint} reached ({quota} calls)")
+
+    def acquire(self, endpoint: str, max_wait: Optional[float] = None) -> None:
+        """Block until a call to ``endpoint`` is allowed.
+
+        Raises RateLimitedError instead of blocking for more than ``max_wait`` seconds.
+        """
+        wait = self._bucket(endpoint).reserve(max_wait)
+        if max_wait is not None and wait > max_wait:
+            raise RateLimitedError(f"{endpoint} calls held back for {wait:.1f}s", retry_after=wait)
+        if wait > 0:
+            time.sleep(wait)
+        self._count(endpoint)
+
+    async def acquire_async(self, endpoint: str) -> None:
+        """Coroutine variant of acquire"""
+        wait = self._bucket(endpoint).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._count(endpoint)
+
+    def throttle(self, endpoint: str, retry_after: Optional[float]) -> None:
+        """Record a 429 and hold back further calls to the endpoint"""
+        with self._lock:
+            self.throttled[endpoint] = self.throttled.get(endpoint, 0) + 1
+        self._bucket(endpoint).pause(retry_after if retry_after is not None else 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Quota used this month, 429s received and time spent waiting, per endpoint"""
+        with self._lock:
+            return {
+                "month": self._month,
+                "used": dict(self.used),
+                "remaining": {
+                    endpoint: max(0, quota - self.used.get(endpoint, 0))
+                    for endpoint, quota in self.MONTHLY_QUOTAS.items() if quota
+                },
+                "throttled": dict(self.throttled),
+                "waited_seconds": {
+                    endpoint: round(bucket.waited, 3) for endpoint, bucket in self._buckets.items()
+                },
+            }
+
+
+# All Amadeus calls in this process share one set of buckets
+amadeus_rate_limiter = RateLimiter()
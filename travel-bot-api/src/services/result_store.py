@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .flight_models import MODELS
+from .single_flight import single_flight
+
+# "<kind>.<token>", checked before a handle taken from a slot is used as a file name
+HANDLE_PATTERN = re.compile(r"[a-z-]+\.[A-Za-z0-9_-]{8,32}")
+# Results shown per message
+PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "3"))
+
+
+class ResultPages:
+    """A result the user pages through, fetched from upstream only as far as they get.
+
+    ``items`` holds what has been fetched so far and ``query`` what is needed
+    to fetch more (for flight offers, the request parameters of each search); ``exhausted`` is set once upstream has nothing more. Pages
+    are formatted once and kept in ``rendered``; a page is only kept once it
+    is complete, since a fetch may still add to the last one.
+    """
+
+    def __init__(self, items: List[Any], page_size: int = PAGE_SIZE, query: Any = None,
+                 exhausted: bool = True, rendered: Optional[Dict[str, Any]] = None):
+        self.items = items
+        self.page_size = page_size
+        self.query = query
+        self.exhausted = exhausted
+        self.rendered = rendered or {}
+
+    def start(self, number: int) -> int:
+        return number * self.page_size
+
+    def page(self, number: int) -> List[Any]:
+        return self.items[self.start(number):self.start(number + 1)] if number >= 0 else []
+
+    def has_page(self, number: int) -> bool:
+        """Whether page ``number`` has items, or may have once more are fetched"""
+        return number >= 0 and (self.start(number) < len(self.items) or not self.exhausted)
+
+    def needs_fetch(self, number: int) -> bool:
+        """Whether page ``number`` and the item after it (to know if there is a next page) are still missing"""
+        return not self.exhausted and len(self.items) <= self.start(number + 1)
+
+    def extend(self, items: List[Any], key: Callable[[Any], Hashable]) -> int:
+        """Append the items not fetched before; returns how many were new"""
+        seen = {key(item) for item in self.items}
+        added = [item for item in items if key(item) not in seen]
+        self.items.extend(added)
+        return len(added)
+
+    def render(self, number: int, format_page: Callable[[int, List[Any]], Any]) -> Any:
+        """``format_page(start index, items)`` for a page, formatted only the first time"""
+        rendered = self.rendered.get(str(number))
+        if rendered is None:
+            items = self.page(number)
+            rendered = format_page(self.start(number), items)
+            if len(items) == self.page_size or self.exhausted:
+                self.rendered[str(number)] = rendered
+        return rendered
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"pages": {"items": self.items, "page_size": self.page_size, "query": self.query,
+                          "exhausted": self.exhausted, "rendered": self.rendered}}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], model: Any = None) -> "ResultPages":
+        pages = data["pages"]
+        items = [model.from_json(item) for item in pages["items"]] if model else pages["items"]
+        return cls(items, pages["page_size"], pages["query"], pages["exhausted"], pages["rendered"])
+
+
+class ResultStore:
+    """Search results kept server-side, so slots carry a short handle instead of the payload.
+
+    Slots are copied into every tracker event, serialized on every turn and
+    persisted by the tracker store; a list of flight offers there costs
+    hundreds of KiB per conversation. ``put`` returns a handle such as
+    ``flight-offers.Zq3x9V0bT1cY`` to put in the slot and ``get`` turns it
+    back into the result. Results of the kinds in ``flight_models.MODELS``
+    are ResultPages or lists of those models; they are kept as is in memory
+    and written to disk in their JSON form.
+
+    Results live in an LRU bounded by entry count and approximate JSON size,
+    each with a per-kind TTL. With ``RESULT_STORE_DIR`` set they are written
+    there as well, so they survive an action server restart and are shared by
+    action servers on the same host: a memory miss falls back to the file.
+    Expired files are pruned every ``PRUNE_EVERY`` seconds.
+    """
+
+    # Seconds a result can be fetched by its handle, per kind
+    TTLS = {
+        "flight-offers": int(os.getenv("FLIGHT_OFFERS_RESULT_TTL", "1800")),
+        "flight-destinations": int(os.getenv("FLIGHT_DESTINATIONS_RESULT_TTL", "3600")),
+    }
+    DEFAULT_TTL = 1800
+    MAX_ENTRIES = int(os.getenv("RESULT_STORE_SIZE", "5000"))
+    MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+    DIRECTORY = os.getenv("RESULT_STORE_DIR", "")
+    PRUNE_EVERY = 600
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES, directory: str = DIRECTORY):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.ttls = dict(self.TTLS)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, handle + ".json")
+
+    def _remember(self, handle: str, value: Any, expires_at: float, size: int) -> None:
+        with self._lock:
+            old = self._entries.pop(handle, None)
+            if old:
+                self._bytes -= old[2]
+            self._entries[handle] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _save(self, handle: str, value: Any, expires_at: float) -> None:
+        encoded = json.dumps({"expires_at": expires_at, "value": value}, separators=(",", ":"),
+                             default=lambda model: model.to_json())
+        if len(encoded) <= self.max_bytes:
+            self._remember(handle, value, expires_at, len(encoded))
+        if self.directory:
+            self._write(handle, encoded)
+
+    def put(self, kind: str, value: Any) -> str:
+        """Store a result and return its handle"""
+        handle = f"{kind}.{secrets.token_urlsafe(9)}"
+        self._save(handle, value, time.time() + self.ttls.get(kind, self.DEFAULT_TTL))
+        return handle
+
+    def update(self, handle: str, value: Any) -> None:
+        """Store a result that changed (e.g. fetched further) under its handle, keeping its expiry"""
+        with self._lock:
+            entry = self._entries.get(handle)
+        kind = handle.partition(".")[0]
+        self._save(handle, value, entry[1] if entry else time.time() + self.ttls.get(kind, self.DEFAULT_TTL))
+
+    def _write(self, handle: str, encoded: str) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(encoded)
+            os.replace(tmp_path, self._path(handle))
+        except OSError as e:
+            print(f"Error writing result {handle} to disk: {e}")
+        if time.time() - self._pruned_at > self.PRUNE_EVERY:
+            self._pruned_at = time.time()
+            threading.Thread(target=self.prune, name="result-store-prune", daemon=True).start()
+
+    def _read(self, handle: str) -> Tuple[Optional[Any], Optional[float], int]:
+        try:
+            with open(self._path(handle), encoding="utf-8") as f:
+                encoded = f.read()
+            stored = json.loads(encoded)
+        except (OSError, ValueError):
+            return None, None, 0
+        value = stored["value"]
+        model = MODELS.get(handle.partition(".")[0])
+        if isinstance(value, dict) and "pages" in value:
+            value = ResultPages.from_json(value, model)
+        elif model is not None and isinstance(value, list):
+            value = [model.from_json(item) for item in value]
+        return value, stored["expires_at"], len(encoded)
+
+    def get(self, handle: Any) -> Optional[Any]:
+        """The result stored under a handle, or None if it is unknown or expired"""
+        if not isinstance(handle, str) or not HANDLE_PATTERN.fullmatch(handle):
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(handle)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[handle]
+                self._bytes -= entry[2]
+                self.expired += 1
+                return None
+        if self.directory:
+            value, expires_at, size = self._read(handle)
+            if expires_at is not None and expires_at > now:
+                self._remember(handle, value, expires_at, size)
+                self.disk_hits += 1
+                return value
+            if expires_at is not None:
+                self.expired += 1
+                self.discard(handle)
+                return None
+        self.misses += 1
+        return None
+
+    def discard(self, handle: Any) -> None:
+        """Forget a result, e.g. once it has been booked"""
+        if not isinstance(handle, str) or not HANDLE_PATTERN.fullmatch(handle):
+            return
+        with self._lock:
+            entry = self._entries.pop(handle, None)
+            if entry:
+                self._bytes -= entry[2]
+        if self.directory:
+            try:
+                os.remove(self._path(handle))
+            except OSError:
+                pass
+
+    def prune(self) -> int:
+        """Remove expired result files; returns how many were removed"""
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            handle = name[:-len(".json")]
+            if not name.endswith(".json") or not HANDLE_PATTERN.fullmatch(handle):
+                # also skips temporary files of writes in progress
+                continue
+            _, expires_at, _ = self._read(handle)
+            if expires_at is not None and expires_at <= now:
+                try:
+                    os.remove(self._path(handle))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and size counters"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+# Shared by the Rasa actions
+result_store = ResultStore()
+
+
+_fetches = set()
+
+
+async def fetch_page(handle: str, pages: ResultPages, number: int,
+                     fetch_more: Callable[[ResultPages], Awaitable[bool]]) -> None:
+    """Fetch more results until page ``number`` is complete or upstream runs out.
+
+    ``fetch_more(pages)`` extends the pages and returns False if it could not
+    make progress. Fetches for the same result are collapsed, so a click
+    waits for a prefetch already under way instead of starting another.
+    """
+    while pages.needs_fetch(number):
+        if not await single_flight.do_async(("result-pages", handle), lambda: fetch_more(pages)):
+            break
+        result_store.update(handle, pages)
+
+
+def prefetch_page(handle: str, pages: ResultPages, number: int,
+                  fetch_more: Callable[[ResultPages], Awaitable[bool]]) -> None:
+    """Start fetching page ``number`` in the background, if it is not there yet"""
+    if not pages.needs_fetch(number):
+        return
+
+    async def prefetch():
+        try:
+            await fetch_page(handle, pages, number, fetch_more)
+        except Exception as e:
+            print(f"Error prefetching results for {handle}: {e}")
+
+    task = asyncio.get_running_loop().create_task(prefetch())
+    _fetches.add(task)
+    task.add_done_callback(_fetches.discard)
+
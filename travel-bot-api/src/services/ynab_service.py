@@ -1,7 +1,13 @@
 import os
-import requests
 from typing import Dict, Any, Tuple, Optional
 
+from .circuit_breaker import get_breaker
+from .http_client import HTTP_ERRORS, http_client, async_http_client
+from .rate_limiter import is_retryable
+from .single_flight import single_flight
+
+breaker = get_breaker("ynab", is_failure=is_retryable)
+
 class YNABService:
     """Service class for interacting with the YNAB API"""
     
@@ -9,7 +15,7 @@ class YNABService:
         self.access_token = os.environ.get("YNAB_ACCESS_TOKEN")
         self.budget_id = os.environ.get("YNAB_BUDGET_ID")
         self.travel_category = os.environ.get("YNAB_TRAVEL_CATEGORY")
-        self.base_url = "https://api.youneedabudget.com/v1"
+        self.base_url = os.environ.get("YNAB_BASE_URL", "https://api.youneedabudget.com/v1").rstrip("/")
         
     def get_headers(self) -> Dict[str, str]:
         """Get the authorization headers for YNAB API requests"""
@@ -25,19 +31,42 @@ class YNABService:
         if not self.access_token or not self.budget_id or not self.travel_category:
             return None
             
+        url = self.get_category_url()
         try:
-            url = f"{self.base_url}/budgets/{self.budget_id}/categories/{self.travel_category}"
-            print(url)
-            response = requests.get(url, headers=self.get_headers())
-            response.raise_for_status()
-            
-            data = response.json()
-            travel_category = data['data']['category']
-            
-            # YNAB amounts are in milliunits
-            budgeted = travel_category['balance'] / 1000
-            
-            return budgeted
-            
-        except (requests.exceptions.RequestException, KeyError, ValueError):
+            return single_flight.do(url, lambda: breaker.call(lambda: self._fetch_budget(url), key=url))
+        except (*HTTP_ERRORS, KeyError, ValueError):
+            return None
+
+    async def get_travel_budget_async(self) -> Optional[float]:
+        """Coroutine variant of get_travel_budget"""
+        if not self.access_token or not self.budget_id or not self.travel_category:
             return None
+
+        url = self.get_category_url()
+        try:
+            return await single_flight.do_async(
+                url, lambda: breaker.call_async(lambda: self._fetch_budget_async(url), key=url))
+        except (*HTTP_ERRORS, KeyError, ValueError):
+            return None
+
+    def _fetch_budget(self, url: str) -> float:
+        response = http_client.get(url, headers=self.get_headers())
+        response.raise_for_status()
+        return self._parse_budget(response.json())
+
+    async def _fetch_budget_async(self, url: str) -> float:
+        response = await async_http_client.get(url, headers=self.get_headers())
+        response.raise_for_status()
+        return self._parse_budget(response.json())
+
+    def get_category_url(self) -> str:
+        """URL of the configured travel category"""
+        return f"{self.base_url}/budgets/{self.budget_id}/categories/{self.travel_category}"
+
+    def _parse_budget(self, data: Dict[str, Any]) -> float:
+        travel_category = data['data']['category']
+        
+        # YNAB amounts are in milliunits
+        budgeted = travel_category['balance'] / 1000
+        
+        return budgeted
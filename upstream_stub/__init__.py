@@ -0,0 +1,3 @@
+from .server import StubConfig, StubServer, start_stub
+
+__all__ = ["StubConfig", "StubServer", "start_stub"]
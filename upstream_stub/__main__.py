@@ -0,0 +1,45 @@
+"""Run the upstream stub in the foreground.
+
+    python -m upstream_stub --port 8089 --latency-ms 150 --jitter 0.4 --throttle-rate 0.05
+"""
+import argparse
+
+from .server import StubConfig, StubServer
+
+
+def _route_latency(value: str):
+    route, _, ms = value.partition("=")
+    return route, float(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="median answer delay")
+    parser.add_argument("--jitter", type=float, default=0.0, help="log-normal sigma of the delay, 0 for fixed")
+    parser.add_argument("--route-latency", type=_route_latency, action="append", default=[], metavar="ROUTE=MS",
+                        help="median delay for one route, e.g. amadeus-flight-offers=800")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms, jitter=args.jitter, route_latency_ms=dict(args.route_latency),
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                        retry_after=args.retry_after, seed=args.seed)
+    server = StubServer((args.host, args.port), config)
+    for name, value in server.environment().items():
+        print(f"export {name}={value}")
+    print("# any AMADEUS_CLIENT_ID/SECRET, YNAB_* and OPENAI_API_KEY values are accepted", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
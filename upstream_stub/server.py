@@ -0,0 +1,392 @@
+"""Local stand-in for the Amadeus, YNAB and OpenAI APIs.
+
+Serves recorded payloads from ``fixtures/`` on the same paths as the real
+APIs, reshaped to match the request (origin, destination, dates, ``max``), so
+the services and actions can be run and measured offline. Latency, 5xx errors
+and 429s are injected according to a ``StubConfig``. Every upstream is served
+from one port:
+
+    AMADEUS_BASE_URL=http://127.0.0.1:8089
+    YNAB_BASE_URL=http://127.0.0.1:8089/v1
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+
+``GET /_stub/stats`` returns call counts per route and ``POST /_stub/config``
+changes the injected behaviour of a running stub.
+"""
+import copy
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+AIRPORTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "services", "data", "airports.csv")
+
+STUB_TOKEN = "stub-access-token"
+
+
+@dataclass
+class StubConfig:
+    """What the stub injects into its answers.
+
+    Latency is log-normal around ``latency_ms`` (the median) with spread
+    ``jitter`` (sigma; 0 gives a fixed delay). ``route_latency_ms`` overrides
+    the median per route name. ``error_rate`` and ``throttle_rate`` are the
+    fractions of calls answered with 503 and 429.
+    """
+
+    latency_ms: float = 0.0
+    jitter: float = 0.0
+    route_latency_ms: Dict[str, float] = field(default_factory=dict)
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+    def delay(self, route: str, rng: random.Random) -> float:
+        median = self.route_latency_ms.get(route, self.latency_ms) / 1000
+        if median <= 0:
+            return 0.0
+        return median * rng.lognormvariate(0, self.jitter) if self.jitter else median
+
+
+def _load_fixture(name: str) -> Dict[str, Any]:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_airports() -> List[Dict[str, str]]:
+    try:
+        with open(AIRPORTS_CSV, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except OSError:
+        return []
+
+
+def _shift(timestamp: str, days: int) -> str:
+    return (datetime.fromisoformat(timestamp) + timedelta(days=days)).isoformat()
+
+
+def _days_between(recorded: str, requested: Optional[str]) -> int:
+    if not requested:
+        return 0
+    try:
+        return (date.fromisoformat(requested[:10]) - date.fromisoformat(recorded[:10])).days
+    except ValueError:
+        return 0
+
+
+class Fixtures:
+    """Recorded payloads, reshaped per request"""
+
+    def __init__(self):
+        self.token = _load_fixture("oauth_token.json")
+        self.locations = _load_fixture("locations.json")
+        self.flight_offers = _load_fixture("flight_offers.json")
+        self.flight_destinations = _load_fixture("flight_destinations.json")
+        self.flight_dates = _load_fixture("flight_dates.json")
+        self.category = _load_fixture("ynab_category.json")
+        self.chat_completion = _load_fixture("chat_completion.json")
+        self.airports = _load_airports()
+
+    def oauth_token(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        if query.get("grant_type") != "client_credentials":
+            return 400, {"error": "unsupported_grant_type", "code": 38187,
+                         "error_description": "Only client_credentials value is allowed for the body parameter grant_type"}
+        return 200, self.token
+
+    def reference_locations(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        keyword = query.get("keyword", "").strip().upper()
+        if not keyword:
+            return 400, {"errors": [{"status": 400, "code": 32171, "title": "MANDATORY DATA MISSING",
+                                     "detail": "Missing mandatory query parameter", "source": {"parameter": "keyword"}}]}
+        city_template, airport_template = self.locations["data"]
+        data = []
+        for airport in self.airports:
+            if keyword not in (airport["iata"], airport["city_code"]) and not airport["city"].upper().startswith(keyword):
+                continue
+            entry = copy.deepcopy(airport_template)
+            entry.update(name=airport["name"].upper(), iataCode=airport["iata"], id=f"A{airport['iata']}",
+                         detailedName=f"{airport['city'].upper()}/{airport['country']}:{airport['name'].upper()}",
+                         geoCode={"latitude": float(airport["lat"]), "longitude": float(airport["lon"])})
+            entry["address"].update(cityName=airport["city"].upper(), cityCode=airport["city_code"],
+                                    countryCode=airport["country"])
+            if airport["city_code"] != airport["iata"] and not any(e["iataCode"] == airport["city_code"] for e in data):
+                city = copy.deepcopy(city_template)
+                city.update(name=airport["city"].upper(), iataCode=airport["city_code"], id=f"C{airport['city_code']}",
+                            detailedName=f"{airport['city'].upper()}/{airport['country']}")
+                city["address"].update(cityName=airport["city"].upper(), cityCode=airport["city_code"],
+                                       countryCode=airport["country"])
+                data.append(city)
+            data.append(entry)
+        limit = int(query.get("page[limit]", 10))
+        return 200, {"meta": {"count": len(data), "links": self.locations["meta"]["links"]}, "data": data[:limit]}
+
+    def flight_offers_search(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        origin = query.get("originLocationCode", "").upper()
+        destination = query.get("destinationLocationCode", "").upper()
+        if not origin or not destination or not query.get("departureDate"):
+            return 400, {"errors": [{"status": 400, "code": 32171, "title": "MANDATORY DATA MISSING",
+                                     "detail": "originLocationCode, destinationLocationCode and departureDate are required"}]}
+        recorded = self.flight_offers["data"]
+        outbound_shift = _days_between(recorded[0]["itineraries"][0]["segments"][0]["departure"]["at"],
+                                       query["departureDate"])
+        return_shift = _days_between(recorded[0]["itineraries"][1]["segments"][0]["departure"]["at"],
+                                     query.get("returnDate")) if query.get("returnDate") else outbound_shift
+        max_price = float(query["maxPrice"]) if query.get("maxPrice") else None
+
+        offers = []
+        for recorded_offer in recorded:
+            if max_price is not None and float(recorded_offer["price"]["grandTotal"]) > max_price:
+                continue
+            offer = copy.deepcopy(recorded_offer)
+            if not query.get("returnDate"):
+                offer["itineraries"] = offer["itineraries"][:1]
+                offer["oneWay"] = True
+            for leg, itinerary in enumerate(offer["itineraries"]):
+                days = outbound_shift if leg == 0 else return_shift
+                segments = itinerary["segments"]
+                for segment in segments:
+                    segment["departure"]["at"] = _shift(segment["departure"]["at"], days)
+                    segment["arrival"]["at"] = _shift(segment["arrival"]["at"], days)
+                start, end = (origin, destination) if leg == 0 else (destination, origin)
+                segments[0]["departure"]["iataCode"] = start
+                segments[-1]["arrival"]["iataCode"] = end
+            offers.append(offer)
+            offer["id"] = str(len(offers))
+
+        offers = offers[:int(query.get("max", 250))]
+        body = copy.deepcopy(self.flight_offers)
+        body["data"] = offers
+        body["meta"]["count"] = len(offers)
+        return 200, body
+
+    def _priced_list(self, recorded: Dict[str, Any], query: Dict[str, str],
+                     origin: str, destination: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+        if not origin:
+            return 400, {"errors": [{"status": 400, "code": 32171, "title": "MANDATORY DATA MISSING",
+                                     "detail": "origin is required", "source": {"parameter": "origin"}}]}
+        body = copy.deepcopy(recorded)
+        max_price = float(query["maxPrice"]) if query.get("maxPrice") else None
+        shift = _days_between(body["data"][0]["departureDate"], query.get("departureDate", "").split(",")[0])
+        data = []
+        for entry in body["data"]:
+            if max_price is not None and float(entry["price"]["total"]) > max_price:
+                continue
+            entry["origin"] = origin
+            if destination:
+                entry["destination"] = destination
+            if entry["destination"] == origin:
+                continue
+            for key in ("departureDate", "returnDate"):
+                entry[key] = (date.fromisoformat(entry[key]) + timedelta(days=shift)).isoformat()
+            if query.get("oneWay") == "true":
+                entry.pop("returnDate")
+            data.append(entry)
+        body["data"] = data
+        if not data:
+            return 404, {"errors": [{"status": 404, "code": 6003, "title": "ITEM/DATA NOT FOUND OR DATA NOT EXISTING",
+                                     "detail": "No response found for this query parameter"}]}
+        return 200, body
+
+    def flight_destinations_search(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        return self._priced_list(self.flight_destinations, query, query.get("origin", "").upper(), None)
+
+    def flight_dates_search(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        return self._priced_list(self.flight_dates, query, query.get("origin", "").upper(),
+                                 query.get("destination", "").upper() or None)
+
+    def ynab_category(self, query: Dict[str, str], budget_id: str, category_id: str) -> Tuple[int, Dict[str, Any]]:
+        body = copy.deepcopy(self.category)
+        body["data"]["category"]["id"] = category_id
+        return 200, body
+
+    def chat_completions(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if not body.get("messages"):
+            return 400, {"error": {"message": "'messages' is a required property", "type": "invalid_request_error",
+                                   "param": None, "code": None}}
+        answer = copy.deepcopy(self.chat_completion)
+        answer["model"] = body.get("model", answer["model"])
+        answer["created"] = int(time.time())
+        return 200, answer
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the stdlib default backlog of 5 drops connections under benchmark load
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], config: StubConfig):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.fixtures = Fixtures()
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.statuses = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self) -> Dict[str, str]:
+        """Environment variables pointing the services at this stub"""
+        return {
+            "AMADEUS_BASE_URL": self.base_url,
+            "YNAB_BASE_URL": f"{self.base_url}/v1",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+        }
+
+    def decide(self, route: str) -> Tuple[float, Optional[int]]:
+        """Delay before answering, and the status to inject (None for a normal answer)"""
+        with self.lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+            delay = self.config.delay(route, self.rng)
+            roll = self.rng.random()
+        if roll < self.config.throttle_rate:
+            return delay, 429
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            return delay, 503
+        return delay, None
+
+    def record(self, route: str, status: int) -> None:
+        with self.lock:
+            statuses = self.statuses.setdefault(route, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"calls": dict(self.calls), "statuses": copy.deepcopy(self.statuses), "config": asdict(self.config)}
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.calls, self.statuses = {}, {}
+
+
+# (method, path pattern, route name, handler name)
+ROUTES = [
+    ("POST", re.compile(r"^/v1/security/oauth2/token$"), "amadeus-token", "oauth_token"),
+    ("GET", re.compile(r"^/v1/reference-data/locations$"), "amadeus-locations", "reference_locations"),
+    ("GET", re.compile(r"^/v2/shopping/flight-offers$"), "amadeus-flight-offers", "flight_offers_search"),
+    ("GET", re.compile(r"^/v1/shopping/flight-destinations$"), "amadeus-flight-destinations", "flight_destinations_search"),
+    ("GET", re.compile(r"^/v1/shopping/flight-dates$"), "amadeus-flight-dates", "flight_dates_search"),
+    ("GET", re.compile(r"^/v1/budgets/([^/]+)/categories/([^/]+)$"), "ynab-category", "ynab_category"),
+    ("POST", re.compile(r"^/v1/chat/completions$"), "openai-chat", "chat_completions"),
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes; with Nagle on, keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+    server: StubServer
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+    def _control(self, method: str, path: str) -> bool:
+        """Handle ``/_stub/*`` requests; returns False for anything else"""
+        if not path.startswith("/_stub/"):
+            return False
+        if method == "GET" and path == "/_stub/stats":
+            self._send(200, self.server.stats())
+        elif method == "POST" and path == "/_stub/reset":
+            self._read_body()
+            self.server.reset_stats()
+            self._send(200, self.server.stats())
+        elif method == "POST" and path == "/_stub/config":
+            changes = json.loads(self._read_body() or b"{}")
+            with self.server.lock:
+                for name, value in changes.items():
+                    if hasattr(self.server.config, name):
+                        setattr(self.server.config, name, value)
+            self._send(200, self.server.stats())
+        else:
+            self._send(404, {"error": f"unknown stub control {path}"})
+        return True
+
+    def _authorized(self, route: str) -> bool:
+        if route == "amadeus-token":
+            return True
+        if route.startswith("amadeus"):
+            if self.headers.get("Authorization") != f"Bearer {STUB_TOKEN}":
+                self._send(401, {"errors": [{"code": 38191, "title": "Invalid access token",
+                                             "detail": "The access token provided in the Authorization header is invalid",
+                                             "status": 401}]})
+                return False
+        elif not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            self._send(401, {"error": {"message": "Missing bearer authentication", "type": "invalid_request_error"}})
+            return False
+        return True
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        if self._control(method, url.path):
+            return
+        for route_method, pattern, route, handler_name in ROUTES:
+            match = pattern.match(url.path)
+            if route_method != method or not match:
+                continue
+            raw_body = self._read_body() if method == "POST" else b""
+            delay, injected = self.server.decide(route)
+            if delay:
+                time.sleep(delay)
+            if injected == 429:
+                status, body = 429, {"errors": [{"code": 38194, "title": "Too many requests", "status": 429,
+                                                 "detail": "The network rate limit is exceeded, please try again later"}]}
+                self._send(status, body, {"Retry-After": f"{self.server.config.retry_after:g}"})
+            elif injected == 503:
+                status, body = 503, {"errors": [{"code": 38189, "title": "Internal error", "status": 503,
+                                                 "detail": "An internal error occurred, please contact your administrator"}]}
+                self._send(status, body)
+            elif not self._authorized(route):
+                status = 401
+            else:
+                handler: Callable[..., Tuple[int, Dict[str, Any]]] = getattr(self.server.fixtures, handler_name)
+                if route == "openai-chat":
+                    status, body = handler(json.loads(raw_body or b"{}"))
+                elif route == "amadeus-token":
+                    status, body = handler({k: v[-1] for k, v in parse_qs(raw_body.decode()).items()})
+                else:
+                    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    status, body = handler(query, *match.groups())
+                self._send(status, body)
+            self.server.record(route, status)
+            return
+        self._read_body()
+        self._send(404, {"error": f"no stub for {method} {url.path}"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Start a stub on a background thread; ``port=0`` picks a free port"""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, name="upstream-stub", daemon=True).start()
+    return server